@@ -1,7 +1,10 @@
-from flask import request, url_for, jsonify, session
+# Must come first: importing the app package monkey-patches for ASYNC_MODE (app/green.py)
 from app import create_app
+from flask import request, url_for, jsonify, session
 from config import Config
-from app.db import get_db
+from app.db import get_db, get_pool_stats
+from app import matcher, answer_ingest, round_timer, stats_worker
+from app.game_events import user_room, game_room, snapshot_payload, GAME_SNAPSHOT
 from app import socketio
 from flask_socketio import join_room, leave_room, emit
 app, socketio = create_app()
@@ -27,8 +30,19 @@ def handle_game_connect():
     """Handle new client connection for the game namespace (default)"""
     user_id = session.get('user_id')
     if user_id:
+        join_room(user_room(user_id))
         print(f"User {user_id} connected to game namespace")
 
+@socketio.on('join_user')
+def on_join_user(data):
+    """Join the personal room that receives match_found / game_started (only the session's own)"""
+    user_id = session.get('user_id')
+    requested = data.get('user_id') if data else None
+    if not user_id or (requested is not None and str(requested) != str(user_id)):
+        emit('game_error', {'error': 'Not logged in as this user'})
+        return
+    join_room(user_room(user_id))
+
 @socketio.on('disconnect')
 def handle_game_disconnect():
     """Handle client disconnection for the game namespace (default)"""
@@ -37,22 +51,33 @@ def handle_game_disconnect():
         print(f"User {user_id} disconnected from game namespace")
 
 # Game socket handlers
+def send_game_snapshot(game_id):
+    """Send the current game state only to the requesting socket"""
+    from app.routes.games import get_game_state_entry
+    entry = get_game_state_entry(game_id)
+    if entry:
+        emit(GAME_SNAPSHOT, snapshot_payload(game_id, entry))
+    else:
+        emit('game_error', {'error': f'Game {game_id} not found'})
+
 @socketio.on('join_game')
 def on_join_game(data):
-    game_id = data['game_id']
-    room = f'game_{game_id}'
+    game_id = int(data['game_id'])
+    room = game_room(game_id)
+    # Join before reading the snapshot so no update falls between the two
     join_room(room)
     print(f"Client joined game room: {room}")
-    # Send current game state to the newly joined client
-    from app.routes.games import get_full_game_state_data
-    game_state = get_full_game_state_data(int(game_id))
-    if game_state:
-        socketio.emit('game_update', game_state, room=room)
+    send_game_snapshot(game_id)
+
+@socketio.on('request_resync')
+def on_request_resync(data):
+    """A client missed a game_update version and needs a fresh snapshot"""
+    send_game_snapshot(int(data['game_id']))
 
 @socketio.on('leave_game')
 def on_leave_game(data):
     game_id = data['game_id']
-    room = f'game_{game_id}'
+    room = game_room(game_id)
     leave_room(room)
     print(f"Client left game room: {room}")
 
@@ -86,7 +111,12 @@ def health_check():
         cur.execute('SELECT 1')
         cur.fetchone()
         cur.close()
-        return jsonify({'status': 'ok', 'database': 'connected'}), 200
+        return jsonify({
+            'status': 'ok', 'database': 'connected', 'pool': get_pool_stats(), 'matchmaker': matcher.get_stats(),
+            'answer_ingest': ingest.stats() if (ingest := answer_ingest.get_ingest()) else None,
+            'round_timer': timer.stats() if (timer := round_timer.get_timer()) else None,
+            'stats_worker': worker.stats() if (worker := stats_worker.get_worker()) else None
+        }), 200
     except Exception as e:
         return jsonify({'status': 'error', 'database': 'disconnected', 'error': str(e)}), 500
 
@@ -1,7 +1,11 @@
+# Must run before flask / psycopg2 are imported (no-op unless ASYNC_MODE is eventlet or gevent)
+from . import green
+green.patch()
+
 from flask import Flask
 from flask_cors import CORS
 from config import Config
-from . import db
+from . import db, migrations, serialization, matcher, answer_ingest, round_timer, stats_worker
 from flask_login import LoginManager
 from flask_socketio import SocketIO
 # from app.models.user import User
@@ -42,13 +46,27 @@ def create_app(config_class=Config):
     
     # Initialize extensions
     db.init_app(app)
+    migrations.init_app(app)
+    serialization.init_app(app)
     login_manager.init_app(app)
-    socketio.init_app(app, cors_allowed_origins="*")
+    socketio.init_app(
+        app,
+        cors_allowed_origins="*",
+        async_mode=app.config.get("ASYNC_MODE"),
+        json=serialization.SocketIOJSON,
+    )
+    matcher.init_app(app, socketio)
+    answer_ingest.init_app(app, socketio)
+    round_timer.init_app(app, socketio)
+    stats_worker.init_app(app, socketio)
    
-    # Always initialize schema on app start
+    # Apply pending migrations only when asked to; otherwise just check the version
     with app.app_context():
         try:
-            db.init_db()
+            if app.config.get("DB_AUTO_MIGRATE"):
+                db.init_db()
+            else:
+                migrations.check_schema_version()
         except Exception as e:
             print(f"Schema initialization error: {e}")
 
@@ -0,0 +1,511 @@
+"""
+Optional write-behind ingest of round answers (``ANSWER_INGEST_ENABLED``).
+
+By default every answer is its own transaction (fn_submit_answer). At
+tournament peaks thousands of answers land within the same seconds, and each
+one pays a commit, the stats triggers and a score UPDATE. With the ingest
+enabled, an answer takes this path instead:
+
+1. It is validated in memory against a per-round context: round, choices,
+   participants and answers given. The context is loaded with a few queries
+   the first time a worker sees the round.
+2. It is appended to a local append-only log segment and fsynced, then
+   acknowledged.
+3. A background flusher seals the segment every ``ANSWER_INGEST_FLUSH_SECONDS``
+   (or once ``ANSWER_INGEST_BATCH_SIZE`` answers are buffered). It COPYs the
+   answers into a temporary staging table. A single statement then inserts
+   them (``ON CONFLICT DO NOTHING``), adds the points per participant with one
+   set-based UPDATE and bumps each game's state_version. Then it pushes
+   game_update score ops and deletes the segment.
+
+Crash recovery: every worker holds an exclusive ``flock`` on its segments
+until they are flushed. On start, segments nobody holds (left by a crashed
+worker) are replayed. The replay is idempotent: answers already in
+round_answers are skipped, and only inserted answers add points.
+
+Trade-offs: scores lag by up to one flush interval. complete_round flushes
+the local buffer before counting answers. A duplicate accepted by two
+workers at the same moment keeps the first answer only.
+
+Rounds completed elsewhere: another worker (or the round timer) may complete a
+round while this worker still buffers answers to it. Under the game locks, the
+flush drops staged answers whose round or game is no longer active and logs
+them as rejected, so scores never change after a round was counted or the
+winner chosen. Every flusher tick also drops the cached contexts of rounds
+that were completed since they were loaded.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from flask import current_app
+
+try:
+    import fcntl
+except ImportError:  # Windows: the ingest is unavailable, the default answer path still works
+    fcntl = None
+
+from .db import get_db, transaction, copy_rows
+from .game_events import send_game_update, score_op
+
+Answer = namedtuple(
+    'Answer',
+    'game_id user_id game_round_question_id choice_id is_correct points_earned response_time_ms answer_time'
+)
+
+# Everything needed to validate an answer to one round without a query
+RoundContext = namedtuple(
+    'RoundContext',
+    'round_id status points_possible start_time time_limit_seconds participants questions answered loaded_at'
+)
+
+STAGING_COLUMNS = (
+    'game_round_question_id', 'user_id', 'choice_id', 'is_correct', 'points_earned', 'response_time_ms', 'answer_time'
+)
+
+CREATE_STAGING = """
+    CREATE TEMP TABLE IF NOT EXISTS answer_ingest_staging (
+        game_round_question_id BIGINT,
+        user_id BIGINT,
+        choice_id BIGINT,
+        is_correct BOOLEAN,
+        points_earned INTEGER,
+        response_time_ms INTEGER,
+        answer_time TIMESTAMP
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Insert the staged answers, then add the points of the inserted ones only and
+# bump the version of every game that changed: one statement per batch
+APPLY_STAGED = """
+    WITH inserted AS (
+        INSERT INTO round_answers
+          (game_round_question_id, user_id, choice_id, is_correct, points_earned, response_time_ms, answer_time)
+        SELECT DISTINCT ON (game_round_question_id, user_id)
+               game_round_question_id, user_id, choice_id, is_correct, points_earned, response_time_ms, answer_time
+        FROM answer_ingest_staging
+        ORDER BY game_round_question_id, user_id, answer_time
+        ON CONFLICT (game_round_question_id, user_id) DO NOTHING
+        RETURNING game_round_question_id, user_id, points_earned
+    ), per_player AS (
+        SELECT gr.game_id, i.user_id, SUM(i.points_earned) AS points
+        FROM inserted i
+        JOIN game_round_questions grq ON grq.id = i.game_round_question_id
+        JOIN game_rounds gr ON gr.id = grq.game_round_id
+        GROUP BY gr.game_id, i.user_id
+    ), scored AS (
+        UPDATE game_participants gp
+        SET score = gp.score + p.points
+        FROM per_player p
+        WHERE gp.game_id = p.game_id AND gp.user_id = p.user_id
+        RETURNING gp.game_id, gp.user_id, gp.score
+    ), bumped AS (
+        UPDATE games g
+        SET state_version = g.state_version + 1
+        WHERE g.id IN (SELECT game_id FROM per_player)
+        RETURNING g.id, g.state_version
+    )
+    SELECT s.game_id, s.user_id, s.score, b.state_version
+    FROM scored s
+    JOIN bumped b ON b.id = s.game_id
+"""
+
+# Game rows first, in id order, like every game transition (app/game_engine.py);
+# the answer counter trigger writes round rows before APPLY_STAGED bumps the games
+LOCK_STAGED_GAMES = """
+    SELECT id FROM games
+    WHERE id IN (
+        SELECT gr.game_id
+        FROM answer_ingest_staging s
+        JOIN game_round_questions grq ON grq.id = s.game_round_question_id
+        JOIN game_rounds gr ON gr.id = grq.game_round_id
+    )
+    ORDER BY id
+    FOR UPDATE
+"""
+
+# Answers to a round or game completed since they were accepted: taken out of
+# the batch under the game locks, so they are neither inserted nor scored
+REJECT_STAGED = """
+    DELETE FROM answer_ingest_staging s
+    USING game_round_questions grq, game_rounds gr, games g
+    WHERE grq.id = s.game_round_question_id
+      AND gr.id = grq.game_round_id
+      AND g.id = gr.game_id
+      AND (gr.status <> 'active' OR g.status <> 'active')
+    RETURNING gr.game_id, gr.round_number, s.user_id, s.game_round_question_id
+"""
+
+CLOSED_ROUNDS = """
+    SELECT gr.id
+    FROM game_rounds gr
+    JOIN games g ON g.id = gr.game_id
+    WHERE gr.id = ANY(%s) AND (gr.status <> 'active' OR g.status <> 'active')
+"""
+
+
+def check_answer(ctx, user_id, question_id, choice_id, now, grace_seconds, pending_keys=frozenset()):
+    """
+    Validate an answer against a ``RoundContext``. Returns the fn_submit_answer
+    result shape: ``{'status': <error code>}``, or ``status='ok'`` with
+    is_correct, points_earned, correct_choice_id and game_round_question_id.
+    """
+    if ctx.status != 'active':
+        return {'status': 'round_not_active'}
+    if ctx.time_limit_seconds is not None and ctx.start_time is not None:
+        if (now - ctx.start_time).total_seconds() > ctx.time_limit_seconds + grace_seconds:
+            return {'status': 'time_limit_exceeded'}
+    if user_id not in ctx.participants:
+        return {'status': 'not_participant'}
+    question = ctx.questions.get(question_id)
+    if question is None:
+        return {'status': 'question_not_in_round'}
+    grq_id, choices, correct_choice_id = question
+    if choice_id not in choices:
+        return {'status': 'invalid_choice'}
+    if (grq_id, user_id) in ctx.answered or (grq_id, user_id) in pending_keys:
+        return {'status': 'already_answered'}
+    is_correct = choices[choice_id]
+    return {
+        'status': 'ok',
+        'is_correct': is_correct,
+        'points_earned': ctx.points_possible if is_correct else 0,
+        'correct_choice_id': correct_choice_id,
+        'game_round_question_id': grq_id,
+    }
+
+
+def load_round_context(cur, game_id, round_number):
+    """A RoundContext for the round, or an error code (game_not_found, ...) as a string"""
+    cur.execute("""
+        SELECT g.status AS game_status, gr.id, gr.status, gr.points_possible, gr.start_time, gr.time_limit_seconds
+        FROM games g
+        LEFT JOIN game_rounds gr ON gr.game_id = g.id AND gr.round_number = %s
+        WHERE g.id = %s
+    """, (round_number, game_id))
+    row = cur.fetchone()
+    if row is None:
+        return 'game_not_found'
+    if row['game_status'] != 'active':
+        return 'game_not_active'
+    if row['id'] is None:
+        return 'round_not_found'
+    round_id = row['id']
+
+    cur.execute(
+        "SELECT user_id FROM game_participants WHERE game_id = %s AND status = 'active'", (game_id,)
+    )
+    participants = frozenset(r['user_id'] for r in cur.fetchall())
+
+    cur.execute("""
+        SELECT grq.id AS grq_id, grq.question_id, qc.id AS choice_id, qc.is_correct
+        FROM game_round_questions grq
+        JOIN question_choices qc ON qc.question_id = grq.question_id
+        WHERE grq.game_round_id = %s
+        ORDER BY qc.id
+    """, (round_id,))
+    questions = {}
+    for r in cur.fetchall():
+        grq_id, choices, correct = questions.get(r['question_id'], (r['grq_id'], {}, None))
+        choices[r['choice_id']] = r['is_correct']
+        if r['is_correct'] and correct is None:
+            correct = r['choice_id']
+        questions[r['question_id']] = (grq_id, choices, correct)
+
+    cur.execute("""
+        SELECT ra.game_round_question_id, ra.user_id
+        FROM round_answers ra
+        JOIN game_round_questions grq ON grq.id = ra.game_round_question_id
+        WHERE grq.game_round_id = %s
+    """, (round_id,))
+    answered = {(r['game_round_question_id'], r['user_id']) for r in cur.fetchall()}
+
+    return RoundContext(
+        round_id, row['status'], row['points_possible'], row['start_time'], row['time_limit_seconds'],
+        participants, questions, answered, time.monotonic()
+    )
+
+
+class AnswerLog:
+    """
+    Append-only JSONL segments in ``directory``. The writer holds an exclusive
+    flock on every segment it owns until the segment is flushed and removed,
+    so recovery only ever picks up segments of dead processes.
+    """
+
+    def __init__(self, directory, fsync=True):
+        if fcntl is None:
+            raise RuntimeError("The answer ingest log needs fcntl (POSIX)")
+        self.directory = directory
+        self.fsync = fsync
+        self._current = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, f'answers-{time.time_ns()}-{os.getpid()}.jsonl')
+        f = open(path, 'a', encoding='utf-8')
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return path, f
+
+    def append(self, answer):
+        if self._current is None:
+            self._current = self._open_segment()
+        _, f = self._current
+        record = answer._replace(answer_time=answer.answer_time.isoformat())._asdict()
+        f.write(json.dumps(record, separators=(',', ':')) + '\n')
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def seal(self):
+        """Stop appending to the current segment and return ``(path, file)``, or None if empty"""
+        sealed, self._current = self._current, None
+        return sealed
+
+    @staticmethod
+    def read(path):
+        """Answers of a segment; a torn last line (crash mid-write) is skipped"""
+        answers = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                record['answer_time'] = datetime.fromisoformat(record['answer_time'])
+                answers.append(Answer(**record))
+        return answers
+
+    @staticmethod
+    def release(segment):
+        """Delete a flushed segment and drop its lock"""
+        path, f = segment
+        os.remove(path)
+        f.close()
+
+    def orphaned(self):
+        """``(path, file)`` of every segment no live process holds, locked for the caller"""
+        segments = []
+        for path in sorted(glob.glob(os.path.join(self.directory, 'answers-*.jsonl'))):
+            f = open(path, 'a', encoding='utf-8')
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                continue
+            if not os.path.exists(path):
+                # Flushed and removed by its writer between glob and lock
+                f.close()
+                continue
+            segments.append((path, f))
+        return segments
+
+
+def apply_answers(cur, answers):
+    """
+    Write a batch of answers: COPY into the staging table, then insert, score
+    and bump versions in one statement. Returns ``(changed, rejected)``:
+    ``{game_id: (version, [(user_id, score), ...])}`` and the rows of the
+    answers dropped because their round or game is no longer active.
+    """
+    cur.execute(CREATE_STAGING)
+    copy_rows(cur, 'answer_ingest_staging', STAGING_COLUMNS, [
+        (a.game_round_question_id, a.user_id, a.choice_id, a.is_correct, a.points_earned,
+         a.response_time_ms, a.answer_time)
+        for a in answers
+    ])
+    cur.execute(LOCK_STAGED_GAMES)
+    cur.execute(REJECT_STAGED)
+    rejected = cur.fetchall()
+    cur.execute(APPLY_STAGED)
+    changed = {}
+    for row in cur.fetchall():
+        version, scores = changed.setdefault(row['game_id'], (row['state_version'], []))
+        scores.append((row['user_id'], row['score']))
+    return changed, rejected
+
+
+class AnswerIngest:
+
+    def __init__(self, log, socketio=None, batch_size=500, context_ttl=5.0):
+        self.log = log
+        self.socketio = socketio
+        self.batch_size = batch_size
+        self.context_ttl = context_ttl
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer = []
+        self._pending_keys = set()       # (game_round_question_id, user_id) accepted but not flushed
+        self._contexts = {}              # (game_id, round_number) -> RoundContext
+        self._unflushed = []             # (segment, answers) whose flush failed; retried first
+        self.wakeup = threading.Event()
+        self.flushed_total = 0
+        self.last_flush = None
+
+    def round_context(self, cur, game_id, round_number):
+        key = (game_id, round_number)
+        ctx = self._contexts.get(key)
+        if ctx is None or time.monotonic() - ctx.loaded_at > self.context_ttl:
+            ctx = load_round_context(cur, game_id, round_number)
+            if isinstance(ctx, str) or ctx.status != 'active':
+                # Only active rounds are cached: a pending round gets its questions with the pick
+                self._contexts.pop(key, None)
+                return ctx
+            self._contexts[key] = ctx
+        return ctx
+
+    def forget_round(self, game_id, round_number):
+        self._contexts.pop((game_id, round_number), None)
+
+    def drop_closed_rounds(self, cur):
+        """Forget the cached contexts of rounds completed since they were loaded; returns how many"""
+        with self._lock:
+            round_ids = [ctx.round_id for ctx in self._contexts.values()]
+        if not round_ids:
+            return 0
+        cur.execute(CLOSED_ROUNDS, (round_ids,))
+        closed = {row['id'] for row in cur.fetchall()}
+        with self._lock:
+            keys = [key for key, ctx in self._contexts.items() if ctx.round_id in closed]
+            for key in keys:
+                del self._contexts[key]
+        return len(keys)
+
+    def submit(self, cur, game_id, round_number, user_id, question_id, choice_id,
+               response_time_ms=None, grace_seconds=5, now=None):
+        """Validate and durably log one answer; returns the fn_submit_answer result shape"""
+        now = now or datetime.now()
+        ctx = self.round_context(cur, game_id, round_number)
+        if isinstance(ctx, str):
+            return {'status': ctx}
+        with self._lock:
+            result = check_answer(ctx, user_id, question_id, choice_id, now, grace_seconds, self._pending_keys)
+            if result['status'] != 'ok':
+                return result
+            answer = Answer(game_id, user_id, result['game_round_question_id'], choice_id,
+                            result['is_correct'], result['points_earned'], response_time_ms, now)
+            self.log.append(answer)
+            self._buffer.append(answer)
+            self._pending_keys.add((answer.game_round_question_id, user_id))
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.wakeup.set()
+        return result
+
+    def flush(self):
+        """Write every logged answer of this worker to the database. Returns the number flushed."""
+        with self._flush_lock:
+            with self._lock:
+                segment = self.log.seal()
+                if segment is not None:
+                    self._unflushed.append((segment, self._buffer))
+                self._buffer = []
+            flushed = 0
+            while self._unflushed:
+                segment, answers = self._unflushed[0]
+                self._write(answers)
+                self.log.release(segment)
+                self._unflushed.pop(0)
+                with self._lock:
+                    # Keys move from pending to the cached contexts (other rounds never see these keys)
+                    for a in answers:
+                        key = (a.game_round_question_id, a.user_id)
+                        self._pending_keys.discard(key)
+                        for (game_id, _), ctx in self._contexts.items():
+                            if game_id == a.game_id:
+                                ctx.answered.add(key)
+                flushed += len(answers)
+            self.flushed_total += flushed
+            self.last_flush = time.time()
+            return flushed
+
+    def recover(self):
+        """Replay the segments of crashed workers. Returns the number of answers replayed."""
+        replayed = 0
+        for segment in self.log.orphaned():
+            answers = self.log.read(segment[0])
+            if answers:
+                self._write(answers)
+            self.log.release(segment)
+            replayed += len(answers)
+        return replayed
+
+    def _write(self, answers):
+        with transaction(get_db()) as cur:
+            changed, rejected = apply_answers(cur, answers)
+        if rejected:
+            current_app.logger.warning(
+                f"Answer ingest: rejected {len(rejected)} answers to completed rounds: "
+                + ', '.join(f"game {r['game_id']} round {r['round_number']} user {r['user_id']}" for r in rejected)
+            )
+            for row in rejected:
+                self.forget_round(row['game_id'], row['round_number'])
+        if self.socketio is not None:
+            for game_id, (version, scores) in changed.items():
+                send_game_update(self.socketio, game_id, version, [score_op(uid, score) for uid, score in scores])
+
+    def stats(self):
+        with self._lock:
+            buffered = len(self._buffer) + sum(len(a) for _, a in self._unflushed)
+        return {'buffered': buffered, 'flushed_total': self.flushed_total, 'last_flush': self.last_flush}
+
+
+def get_ingest():
+    """The answer ingest of the current app, or None when ANSWER_INGEST_ENABLED is off"""
+    return current_app.extensions.get('answer_ingest')
+
+
+def _run(app, ingest, interval):
+    with app.app_context():
+        try:
+            replayed = ingest.recover()
+            if replayed:
+                app.logger.info(f"Answer ingest: replayed {replayed} answers from an earlier run")
+        except Exception as e:
+            app.logger.error(f"Answer ingest recovery failed: {e}")
+    while True:
+        ingest.wakeup.wait(interval)
+        ingest.wakeup.clear()
+        with app.app_context():
+            try:
+                ingest.flush()
+            except Exception as e:
+                # The segments stay on disk and in memory; the next flush retries them
+                app.logger.error(f"Answer ingest flush failed: {e}")
+            try:
+                if ingest._contexts:
+                    # Rounds completed by other workers or the round timer stop accepting answers here too
+                    with transaction(get_db()) as cur:
+                        ingest.drop_closed_rounds(cur)
+            except Exception as e:
+                app.logger.error(f"Answer ingest context refresh failed: {e}")
+
+
+def init_app(app, socketio):
+    """Create the ingest and start its flusher with the first request (when ANSWER_INGEST_ENABLED)"""
+    if not app.config.get('ANSWER_INGEST_ENABLED'):
+        return
+    ingest = AnswerIngest(
+        AnswerLog(app.config['ANSWER_INGEST_DIR'], fsync=app.config.get('ANSWER_INGEST_FSYNC', True)),
+        socketio,
+        batch_size=app.config.get('ANSWER_INGEST_BATCH_SIZE', 500),
+    )
+    app.extensions['answer_ingest'] = ingest
+    started = threading.Event()
+    start_lock = threading.Lock()
+
+    @app.before_request
+    def _start_answer_flusher():
+        if started.is_set():
+            return
+        with start_lock:
+            if not started.is_set():
+                started.set()
+                socketio.start_background_task(
+                    _run, app, ingest, app.config.get('ANSWER_INGEST_FLUSH_SECONDS', 0.2)
+                )
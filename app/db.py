@@ -1,56 +1,605 @@
+import io
+import itertools
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime
+
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from flask import current_app, g
+import psycopg2.extensions
+from psycopg2 import sql as pgsql
+from psycopg2.extras import RealDictCursor, execute_values
+from flask import current_app, g, session, request, has_app_context, has_request_context
 import click
 from flask.cli import with_appcontext
 
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no pooled connection becomes free within the checkout timeout."""
+
+
+_FP_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_FP_STRING = re.compile(r"'(?:[^']|'')*'")
+_FP_NUMBER = re.compile(r'(?<![\w$])-?\d+(?:\.\d+)?')
+_FP_PARAM = re.compile(r'%\([^)]*\)s|%s')
+_FP_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_FP_SPACE = re.compile(r'\s+')
+
+def fingerprint(sql):
+    """Normalise a statement so that calls differing only in literals/parameters compare equal"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf8', 'replace')
+    sql = _FP_COMMENT.sub(' ', str(sql))
+    sql = _FP_STRING.sub('?', sql)
+    sql = _FP_PARAM.sub('?', sql)
+    sql = _FP_NUMBER.sub('?', sql)
+    sql = _FP_LIST.sub('(...)', sql)
+    return _FP_SPACE.sub(' ', sql).strip().rstrip(';').strip()
+
+
+class QueryStats:
+    """Statement count, DB time and per-fingerprint totals for one request or socket event"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.fingerprints = {}   # fingerprint -> [calls, total_ms, max_ms]
+
+    def record(self, sql, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        entry = self.fingerprints.setdefault(fingerprint(sql), [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed_ms
+        entry[2] = max(entry[2], elapsed_ms)
+
+    def slowest(self, n=3):
+        """[(fingerprint, calls, total_ms, max_ms)] ordered by total time"""
+        rows = [(fp, calls, total, peak) for fp, (calls, total, peak) in self.fingerprints.items()]
+        return sorted(rows, key=lambda r: r[2], reverse=True)[:n]
+
+    def repeated(self, threshold):
+        """Fingerprints executed at least ``threshold`` times: suspected N+1 queries"""
+        return [(fp, calls) for fp, (calls, _, _) in self.fingerprints.items() if calls >= threshold]
+
+
+def get_query_stats():
+    """QueryStats of the current request / socket event (None outside an app context)"""
+    if not has_app_context():
+        return None
+    if 'db_stats' not in g:
+        g.db_stats = QueryStats()
+    return g.db_stats
+
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor that times every statement into the current request's QueryStats"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._record(query, started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self._record(query, started)
+
+    def _record(self, query, started):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        stats = get_query_stats()
+        if stats is None:
+            return
+        stats.record(query, elapsed_ms)
+        slow_ms = current_app.config.get('DB_SLOW_QUERY_MS')
+        if slow_ms is not None and elapsed_ms >= slow_ms:
+            current_app.logger.warning("Slow query (%.1f ms): %s", elapsed_ms, fingerprint(query))
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers which named statements it has prepared"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+    def commit(self):
+        # Any commit on the request's primary connection may have written,
+        # including raw cur.execute() + conn.commit() outside the helpers
+        super().commit()
+        if has_app_context() and g.get('db') is self:
+            mark_primary()
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of psycopg2 connections.
+
+    Connections are created lazily up to ``maxconn``. When every connection is
+    checked out, callers wait up to ``timeout`` seconds for one to be
+    returned. Connections that sat idle longer than ``validate_after`` seconds
+    are pinged with ``SELECT 1`` before being handed out again.
+    """
+
+    def __init__(self, connect_kwargs, minconn=0, maxconn=10, timeout=5.0,
+                 validate_after=30.0, statement_timeout_ms=None):
+        self._connect_kwargs = dict(connect_kwargs)
+        if statement_timeout_ms:
+            options = self._connect_kwargs.get('options', '')
+            self._connect_kwargs['options'] = (
+                f"{options} -c statement_timeout={int(statement_timeout_ms)}".strip()
+            )
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.validate_after = validate_after
+
+        self._lock = threading.Condition()
+        self._idle = deque()          # (connection, returned_at)
+        self._in_use = set()
+        self._waiters = 0
+
+        # Counters exposed through stats()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        return psycopg2.connect(
+            connection_factory=PooledConnection, cursor_factory=InstrumentedCursor, **self._connect_kwargs
+        )
+
+    def _size(self):
+        return len(self._idle) + len(self._in_use)
+
+    def _is_alive(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.validate_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Check out a connection, waiting up to ``timeout`` seconds if the pool is exhausted."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            with self._lock:
+                self._waiters += 1
+                try:
+                    while not self._idle and self._size() >= self.maxconn:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise PoolTimeout(
+                                f"Timed out after {self.timeout}s waiting for a database connection"
+                            )
+                        self._lock.wait(remaining)
+                finally:
+                    self._waiters -= 1
+                # Most recently returned first, so hot connections stay hot
+                conn, returned_at = self._idle.pop() if self._idle else (None, None)
+                slot = conn if conn is not None else object()
+                self._in_use.add(slot)
+
+            # Connecting and pinging happen outside the lock
+            try:
+                if conn is None:
+                    conn = self._connect()
+                elif not self._is_alive(conn, returned_at):
+                    self._release_slot(slot, discard=True)
+                    continue
+            except Exception:
+                self._release_slot(slot)
+                raise
+
+            with self._lock:
+                if slot is not conn:
+                    self._in_use.discard(slot)
+                    self._in_use.add(conn)
+                waited = time.monotonic() - started
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return conn
+
+    def _release_slot(self, slot, discard=False):
+        with self._lock:
+            self._in_use.discard(slot)
+            if discard:
+                self._close_quietly(slot)
+            self._lock.notify()
+
+    def putconn(self, conn):
+        """Return a connection to the pool, discarding it if it is broken or mid-transaction."""
+        reusable = not conn.closed
+        if reusable and conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                reusable = False
+        with self._lock:
+            self._in_use.discard(conn)
+            if reusable:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._close_quietly(conn)
+            self._lock.notify()
+
+    def _close_quietly(self, conn):
+        self._discarded += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def closeall(self):
+        with self._lock:
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_size': self.maxconn,
+                'size': self._size(),
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'waiting': self._waiters,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'discarded': self._discarded,
+                'wait_time_total_ms': round(self._wait_total * 1000, 3),
+                'wait_time_avg_ms': round(self._wait_total * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                'wait_time_max_ms': round(self._wait_max * 1000, 3),
+            }
+
+
+_pool_init_lock = threading.Lock()
+
+
+def _new_pool(connect_kwargs):
+    config = current_app.config
+    return ConnectionPool(
+        connect_kwargs,
+        minconn=config.get('DB_POOL_MIN_SIZE', 0),
+        maxconn=config.get('DB_POOL_MAX_SIZE', 10),
+        timeout=config.get('DB_POOL_TIMEOUT', 5.0),
+        validate_after=config.get('DB_POOL_VALIDATE_AFTER', 30.0),
+        statement_timeout_ms=config.get('DB_STATEMENT_TIMEOUT_MS'),
+    )
+
+
+def get_pool():
+    """Return the connection pool of the current app, creating it on first use"""
+    pool = current_app.extensions.get('db_pool')
+    if pool is not None:
+        return pool
+    with _pool_init_lock:
+        pool = current_app.extensions.get('db_pool')
+        if pool is not None:
+            return pool
+        config = current_app.config
+        pool = _new_pool({
+            'host': config['DB_HOST'],
+            'port': config['DB_PORT'],
+            'dbname': config['DB_NAME'],
+            'user': config['DB_USER'],
+            'password': config['DB_PASSWORD'],
+        })
+        current_app.extensions['db_pool'] = pool
+    return pool
+
+
+def get_replica_pools():
+    """One pool per DSN in DB_REPLICA_DSNS (empty list when no replicas are configured)"""
+    pools = current_app.extensions.get('db_replica_pools')
+    if pools is not None:
+        return pools
+    with _pool_init_lock:
+        pools = current_app.extensions.get('db_replica_pools')
+        if pools is None:
+            dsns = current_app.config.get('DB_REPLICA_DSNS') or []
+            pools = [_new_pool({'dsn': dsn}) for dsn in dsns]
+            current_app.extensions['db_replica_pools'] = pools
+    return pools
+
+
+def get_pool_stats():
+    """Pool statistics (in-use, waiting, wait time...) for the current app"""
+    return get_pool().stats()
+
+
 def get_db():
-    
-    """Get database connection"""
+    """
+    Get database connection.
+    A pooled connection is checked out once per request (or Socket.IO event)
+    and handed back to the pool when the app context is torn down.
+    Inside a read-only blueprint this is the replica connection instead.
+    """
+    if g.get('db_read_only'):
+        return get_read_db()
+    return _get_primary_db()
+
+def _get_primary_db():
     if 'db' not in g:
-        g.db = psycopg2.connect(
-            host=current_app.config['DB_HOST'],
-            port=current_app.config['DB_PORT'],
-            dbname=current_app.config['DB_NAME'],
-            user=current_app.config['DB_USER'],
-            password=current_app.config['DB_PASSWORD'],
-            cursor_factory=RealDictCursor
-        )
-        
-        # print(g.db.info.dbname)
+        g.db = get_pool().getconn()
     return g.db
 
+# Statements that are safe to send to a replica: plain SELECT / WITH ... SELECT
+_READ_ONLY_START = re.compile(r'^\s*(\(\s*)*(SELECT|WITH|SHOW|VALUES)\b', re.IGNORECASE)
+_WRITE_KEYWORD = re.compile(
+    r'\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|CREATE|ALTER|DROP|GRANT|LOCK|NEXTVAL|SETVAL|FOR\s+(NO\s+KEY\s+)?UPDATE|FOR\s+(KEY\s+)?SHARE)\b',
+    re.IGNORECASE
+)
+_SQL_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+
+def is_read_only_query(query):
+    """True when the statement only reads and may be served by a replica"""
+    sql = _SQL_COMMENT.sub(' ', query)
+    return bool(_READ_ONLY_START.match(sql)) and not _WRITE_KEYWORD.search(sql)
+
+def _primary_pinned():
+    """Reads must stay on the primary after a write in this request or, for a while, this session"""
+    if g.get('db_wrote'):
+        return True
+    if has_request_context():
+        return session.get('_db_primary_until', 0) > time.time()
+    return False
+
+def mark_primary():
+    """Record a write so that following reads see it (read-your-writes)"""
+    if has_app_context():
+        g.db_wrote = True
+
+def get_read_db():
+    """
+    Connection for read-only queries: a replica when one is configured and the
+    caller has not written recently, otherwise the primary connection.
+    A replica connection taken before a write in the same request is returned
+    to its pool so that the following reads see the write.
+    """
+    pools = get_replica_pools()
+    if not pools or _primary_pinned():
+        read_db = g.pop('read_db', None)
+        if read_db is not None:
+            g.pop('read_db_pool').putconn(read_db)
+        return _get_primary_db()
+    if 'read_db' in g:
+        return g.read_db
+
+    counter = current_app.extensions.setdefault('db_replica_counter', itertools.count())
+    start = next(counter)
+    for i in range(len(pools)):
+        pool = pools[(start + i) % len(pools)]
+        try:
+            g.read_db = pool.getconn()
+        except psycopg2.OperationalError as e:
+            current_app.logger.warning("Replica unavailable, trying next: %s", e)
+            continue
+        g.read_db_pool = pool
+        return g.read_db
+    # Every replica is down: serve the read from the primary
+    return _get_primary_db()
+
+def read_only_blueprint(bp):
+    """Serve every get_db() call of the blueprint from a replica"""
+    @bp.before_request
+    def _use_replica():
+        g.db_read_only = True
+    return bp
+
+def _stick_to_primary(response):
+    """Keep the session on the primary for DB_REPLICA_STICKY_SECONDS after a write"""
+    wrote = g.get('db_wrote') or ('db' in g and request.method not in ('GET', 'HEAD', 'OPTIONS'))
+    if wrote and current_app.config.get('DB_REPLICA_DSNS'):
+        session['_db_primary_until'] = time.time() + current_app.config.get('DB_REPLICA_STICKY_SECONDS', 5)
+    return response
+
+def _server_timing(response):
+    """Expose the request's DB time as a Server-Timing header"""
+    stats = g.get('db_stats')
+    if stats is not None and stats.count:
+        metrics = [f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries"']
+        slowest = stats.slowest(1)
+        if slowest:
+            metrics.append(f'db-slowest;dur={slowest[0][3]:.2f}')
+        response.headers.add('Server-Timing', ', '.join(metrics))
+    return response
+
+def _report_query_stats(e=None):
+    """Log suspected N+1 patterns for the finished request or socket event"""
+    stats = g.pop('db_stats', None)
+    if stats is None or not stats.count:
+        return
+    threshold = current_app.config.get('DB_N_PLUS_ONE_THRESHOLD', 5)
+    repeated = stats.repeated(threshold) if threshold else []
+    if not repeated:
+        return
+    event = getattr(request, 'event', None)
+    where = f"socket event {event['message']}" if event else f"{request.method} {request.path}"
+    for fp, calls in repeated:
+        current_app.logger.warning(
+            "Possible N+1 in %s: %d executions of %s (%d queries, %.1f ms total)",
+            where, calls, fp, stats.count, stats.total_ms
+        )
+
 def close_db(e=None):
-    """Close database connection"""
+    """Return the database connections to their pools"""
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        get_pool().putconn(db)
+    read_db = g.pop('read_db', None)
+    if read_db is not None:
+        g.pop('read_db_pool').putconn(read_db)
 
 def init_db():
-    """Initialize database with schema"""
-    
-    db = get_db()
-    with current_app.open_resource('sql/schema.sql') as f:
-        with db.cursor() as cur:
-            cur.execute(f.read().decode('utf8'))
-        db.commit()
+    """Bring the database schema up to date by applying pending migrations"""
+    from .migrations import upgrade
+
+    return upgrade(get_db())
 
 @click.command('init-db')
 @with_appcontext
 def init_db_command():
-    """Clear existing data and create new tables."""
-    init_db()
-    click.echo('Initialized the database.')
+    """Apply pending schema migrations (alias of 'flask db upgrade')."""
+    applied = init_db()
+    click.echo(f'Initialized the database ({len(applied)} migration(s) applied).')
 
 def init_app(app):
     """Register database functions with the Flask app"""
     
     app.teardown_appcontext(close_db)
+    app.after_request(_stick_to_primary)
+    app.after_request(_server_timing)
+    app.teardown_request(_report_query_stats)
     app.cli.add_command(init_db_command)
 
+# name -> SQL text using $1, $2 ... placeholders
+_prepared_statements = {}
+_PLACEHOLDER = re.compile(r'\$(\d+)')
+
+def prepare_statement(name, sql):
+    """
+    Register a named server-side prepared statement.
+    The SQL uses $1, $2 ... placeholders; it is PREPAREd the first time each
+    pooled connection executes it and then only EXECUTEd by name.
+    """
+    if _prepared_statements.get(name, sql) != sql:
+        raise ValueError(f"Prepared statement {name!r} already registered with different SQL")
+    _prepared_statements[name] = sql
+    return name
+
+def execute_prepared(cur, name, args=()):
+    """Execute a registered statement on ``cur``, preparing it on this connection if needed"""
+    sql = _prepared_statements[name]
+    conn = cur.connection
+    prepared = getattr(conn, 'prepared', None)
+
+    if prepared is None or not current_app.config.get('DB_PREPARED_STATEMENTS', True):
+        # Plain execution, e.g. behind a transaction-pooling proxy
+        params = {f'p{i}': value for i, value in enumerate(args, 1)}
+        cur.execute(_PLACEHOLDER.sub(r'%(p\1)s', sql.replace('%', '%%')), params)
+        return cur
+
+    if name not in prepared:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        prepared.add(name)
+    if args:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(args))})", tuple(args))
+    else:
+        cur.execute(f"EXECUTE {name}")
+    return cur
+
+# serialization_failure, deadlock_detected
+RETRYABLE_PGCODES = frozenset({'40001', '40P01'})
+
+@contextmanager
+def transaction(conn=None):
+    """
+    Run a block in one transaction and yield its cursor:
+    commit on success, roll back on any exception, always close the cursor.
+
+        with transaction() as cur:
+            cur.execute(...)
+    """
+    # Mark first: inside a read-only blueprint the writes still go to the primary
+    mark_primary()
+    if conn is None:
+        conn = _get_primary_db()
+    cur = conn.cursor()
+    try:
+        yield cur
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def run_in_transaction(fn, retries=3, conn=None, backoff=0.05):
+    """
+    Call ``fn(cur)`` inside ``transaction()`` and return its result, retrying
+    the whole transaction on serialization failures and deadlocks.
+    ``fn`` must be safe to re-run (no side effects outside the database).
+    """
+    for attempt in range(retries + 1):
+        try:
+            with transaction(conn) as cur:
+                return fn(cur)
+        except psycopg2.Error as e:
+            if e.pgcode not in RETRYABLE_PGCODES or attempt == retries:
+                raise
+            # Jittered exponential backoff so the competing transactions do not collide again
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+def insert_many(cur, table, columns, rows, returning=None, page_size=500):
+    """
+    Insert ``rows`` with multi-row VALUES statements (execute_values) instead of
+    one INSERT per row. With ``returning`` (e.g. "id") the returned rows are fetched.
+    """
+    if not rows:
+        return [] if returning else None
+    query = pgsql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+        pgsql.Identifier(table), pgsql.SQL(', ').join(map(pgsql.Identifier, columns))
+    ).as_string(cur)
+    if returning:
+        query += f" RETURNING {returning}"
+    return execute_values(cur, query, rows, page_size=page_size, fetch=bool(returning))
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+def copy_rows(cur, table, columns, rows):
+    """
+    Bulk-load ``rows`` with COPY FROM STDIN, the fastest path for large batches
+    (no RETURNING / ON CONFLICT; constraints and triggers still apply).
+    """
+    buf = io.StringIO()
+    for row in rows:
+        buf.write('\t'.join(_copy_value(v) for v in row))
+        buf.write('\n')
+    buf.seek(0)
+    query = pgsql.SQL("COPY {} ({}) FROM STDIN").format(
+        pgsql.Identifier(table), pgsql.SQL(', ').join(map(pgsql.Identifier, columns))
+    ).as_string(cur)
+    cur.copy_expert(query, buf)
+    return cur.rowcount
+
 def query_db(query, args=(), one=False):
-    """Query helper function"""
-    cur = get_db().cursor()
+    """Query helper function (read-only statements may be routed to a replica)"""
+    if is_read_only_query(query):
+        conn = get_read_db()
+    else:
+        mark_primary()
+        conn = _get_primary_db()
+    cur = conn.cursor()
     cur.execute(query, args)
     rv = cur.fetchall()
     cur.close()
@@ -58,7 +607,8 @@ def query_db(query, args=(), one=False):
 
 def modify_db(query, args=()):
 
-    db = get_db()
+    mark_primary()
+    db = _get_primary_db()
     cur = db.cursor()
     cur.execute(query, args)
 
@@ -0,0 +1,121 @@
+"""
+In-process cache of built game states.
+
+Every state-changing endpoint bumps ``games.state_version`` in its
+transaction, so a reader needs one primary-key lookup to know whether the
+cached state is current. The state is built (3-5 queries) and serialized once
+per ``(game_id, version)`` and shared by every reader. Concurrent misses for
+the same version wait for a single rebuild (single flight). Memory is bounded:
+beyond ``GAME_STATE_CACHE_SIZE`` entries, finished games are evicted first,
+least recently used first.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+from flask import current_app
+
+from .serialization import dumps_bytes
+
+# ``state`` is shared by all readers and must not be mutated; ``payload`` is its JSON
+CachedState = namedtuple('CachedState', 'version state payload')
+
+FINISHED_STATUSES = ('completed', 'cancelled')
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+
+
+class GameStateCache:
+
+    def __init__(self, max_entries=1000, wait_timeout=10.0):
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # game_id -> CachedState, least recently used first
+        self._flights = {}              # (game_id, version) -> _Flight
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, game_id, version, build):
+        """
+        The cached state of ``game_id`` at ``version``, calling ``build()`` on a miss.
+        Returns None when ``build()`` does (the game does not exist).
+        """
+        key = (game_id, version)
+        with self._lock:
+            entry = self._entries.get(game_id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(game_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if flight.done.wait(self.wait_timeout) and flight.entry is not None:
+                return flight.entry
+            # The rebuild failed or is stuck: build for ourselves
+            return self._build(game_id, version, build)
+
+        try:
+            flight.entry = self._build(game_id, version, build)
+            return flight.entry
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _build(self, game_id, version, build):
+        state = build()
+        if state is None:
+            return None
+        entry = CachedState(version, state, dumps_bytes(state))
+        with self._lock:
+            current = self._entries.get(game_id)
+            # Never replace a newer version with an older one built concurrently
+            if current is None or current.version <= version:
+                self._entries[game_id] = entry
+                self._entries.move_to_end(game_id)
+                self._evict()
+        return entry
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            victim = next(
+                (gid for gid, e in self._entries.items() if e.state.get('game_status') in FINISHED_STATUSES),
+                next(iter(self._entries))
+            )
+            del self._entries[victim]
+            self.evictions += 1
+
+    def invalidate(self, game_id):
+        with self._lock:
+            self._entries.pop(game_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+def get_cache():
+    """The game state cache of the current app, created on first use"""
+    cache = current_app.extensions.get('game_state_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            'game_state_cache', GameStateCache(current_app.config.get('GAME_STATE_CACHE_SIZE', 1000))
+        )
+    return cache
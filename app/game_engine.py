@@ -0,0 +1,375 @@
+"""
+Game state machine: completing rounds, opening the next round and finishing games.
+
+Every transition runs in one transaction that starts by locking the game's
+row (``lock_game``). Answers (fn_submit_answer, the answer ingest) and category
+picks lock it first as well, so the changes to one game never interleave and
+never deadlock on each other's round rows. Two players completing the same
+round at the same moment are serialized: the second one finds the round
+completed and changes nothing.
+
+A completed round moves the game on in the same transaction: the next round is
+opened or, after the last round, the game is finished (winner, XP, ratings).
+Whether a round is fully answered and whether rounds are left comes from
+counters that triggers keep on the rows (migrations 0011, 0014):
+``games.participant_count`` / ``open_rounds`` and
+``game_rounds.question_count`` / ``answer_count``.
+
+A duel round waiting for its category does not wait forever either: once the
+pick time has passed, ``expire_round`` picks the first offered category for
+the picker and activates the round, which then runs on its own time limit.
+
+Transitions return a ``Transition``. After the commit the caller sends its
+``ops`` as one ``game_update`` with ``version``; ``version`` is None when the
+call changed nothing.
+"""
+
+from collections import namedtuple
+
+from flask import current_app
+
+from . import rating
+from .db import prepare_statement, execute_prepared, insert_many
+from .game_events import round_op, status_op
+from .question_sampler import sample_questions
+
+Transition = namedtuple('Transition', 'game_id round_id version ops winner_id winner_score')
+
+
+class TransitionError(Exception):
+    """A transition that the game's current state does not allow; ``details`` fill the error message"""
+
+    def __init__(self, code, **details):
+        super().__init__(code)
+        self.code = code
+        self.details = details
+
+
+LOCK_GAME = prepare_statement("engine_lock_game", """
+    SELECT id, status, participant_count, open_rounds, rated, winner_id
+    FROM games
+    WHERE id = $1
+    FOR UPDATE
+""")
+ROUND_BY_NUMBER = prepare_statement("engine_round_by_number", """
+    SELECT id, status, category_id, question_count, answer_count
+    FROM game_rounds
+    WHERE game_id = $1 AND round_number = $2
+""")
+ROUND_GAME = prepare_statement(
+    "engine_round_game", "SELECT game_id, round_number, status FROM game_rounds WHERE id = $1"
+)
+ROUND_DUE = prepare_statement("engine_round_due", """
+    SELECT LOCALTIMESTAMP >= start_time + make_interval(secs => time_limit_seconds + $2) AS due
+    FROM game_rounds
+    WHERE id = $1 AND time_limit_seconds IS NOT NULL
+""")
+PICK_DUE = prepare_statement("engine_pick_due", """
+    SELECT LOCALTIMESTAMP >= start_time + make_interval(secs => $2) AS due
+    FROM game_rounds
+    WHERE id = $1
+""")
+ANY_CATEGORY = prepare_statement("engine_any_category", "SELECT (fn_category_offer(1))[1] AS id")
+AUTO_PICK_CATEGORY = prepare_statement("engine_auto_pick_category", """
+    UPDATE game_rounds SET category_id = $1, status = 'active', start_time = NOW()
+    WHERE id = $2 AND category_id IS NULL
+    RETURNING id
+""")
+COMPLETE_ROUND_UPDATE = prepare_statement("complete_round_update", """
+    UPDATE game_rounds
+    SET status = 'completed', end_time = NOW()
+    WHERE id = $1
+""")
+# All rounds of a group game are active at once; in a duel the next one is pending
+NEXT_OPEN_ROUND = prepare_statement("next_open_round", """
+    SELECT id, round_number, category_id, category_picker_id, status, category_options, time_limit_seconds
+    FROM game_rounds
+    WHERE game_id = $1 AND status IN ('pending', 'active')
+    ORDER BY round_number
+    LIMIT 1
+""")
+OPEN_NEXT_ROUND = prepare_statement("open_next_round", """
+    UPDATE game_rounds
+    SET status = 'pending', start_time = NOW()
+    WHERE id = $1
+""")
+BUMP_STATE_VERSION = prepare_statement(
+    "bump_state_version",
+    "UPDATE games SET state_version = state_version + 1 WHERE id = $1 RETURNING state_version"
+)
+# Winner, game row and every participant's XP in one statement; the trigger on
+# games queues the game for the stats worker (app/stats_worker.py)
+FINISH_GAME = prepare_statement("finish_game", """
+    WITH winner AS (
+        SELECT user_id, score
+        FROM game_participants
+        WHERE game_id = $1
+        ORDER BY score DESC, join_time ASC
+        LIMIT 1
+    ), finished AS (
+        UPDATE games
+        SET status = 'completed', end_time = NOW(), state_version = state_version + 1,
+            winner_id = (SELECT user_id FROM winner)
+        WHERE id = $1
+        RETURNING id, winner_id, state_version
+    ), xp AS (
+        -- The score as XP, +20% for the winner
+        UPDATE users u
+        SET total_xp = COALESCE(u.total_xp, 0) + gp.score
+                       + CASE WHEN gp.user_id = (SELECT user_id FROM winner) THEN gp.score * 2 / 10 ELSE 0 END
+        FROM game_participants gp
+        WHERE gp.game_id = $1 AND u.id = gp.user_id
+        RETURNING u.id AS user_id, gp.score, u.rating
+    )
+    SELECT f.id, f.winner_id, f.state_version, (SELECT score FROM winner) AS winner_score,
+           (SELECT COALESCE(json_agg(xp), '[]') FROM xp) AS participants
+    FROM finished f
+""")
+PARTICIPANT_SCORE = prepare_statement(
+    "participant_score", "SELECT score FROM game_participants WHERE game_id = $1 AND user_id = $2"
+)
+ROUND_CATEGORY_OPTIONS = prepare_statement("game_state_category_options", """
+    SELECT c.id, c.name, c.description
+    FROM unnest($1::int[]) WITH ORDINALITY AS o(id, ord)
+    JOIN categories c ON c.id = o.id
+    ORDER BY o.ord
+""")
+ROUND_QUESTIONS = prepare_statement("game_state_questions", """
+    SELECT grq.question_id, q.text, qc.id as choice_id, qc.choice_text
+    FROM game_round_questions grq
+    JOIN questions q ON grq.question_id = q.id
+    JOIN question_choices qc ON q.id = qc.question_id
+    WHERE grq.game_round_id = $1
+    ORDER BY grq.question_id, qc.id
+""")
+
+
+def lock_game(cur, game_id):
+    """Lock the game row for the rest of the transaction; returns it, or None if there is no such game"""
+    execute_prepared(cur, LOCK_GAME, (game_id,))
+    return cur.fetchone()
+
+
+def bump_state_version(cur, game_id):
+    """
+    Mark the cached game state as stale and return the new version. Call it in
+    the transaction of every change that shows up in get_full_game_state_data(),
+    and send the matching game_update with that version after the commit.
+    """
+    execute_prepared(cur, BUMP_STATE_VERSION, (game_id,))
+    return cur.fetchone()['state_version']
+
+
+def round_state(cur, rnd):
+    """
+    The ``current_round`` part of the game state for a game_rounds row (id,
+    round_number, status, category_id, category_picker_id, category_options,
+    time_limit_seconds): the stored category offer while no category is
+    picked, otherwise the questions with their choices.
+    """
+    category_id = rnd['category_id']
+
+    category_options = []
+    if not category_id and rnd.get('category_options'):
+        execute_prepared(cur, ROUND_CATEGORY_OPTIONS, (rnd['category_options'],))
+        category_options = [dict(row) for row in cur.fetchall()]
+
+    questions = []
+    if category_id:
+        execute_prepared(cur, ROUND_QUESTIONS, (rnd['id'],))
+
+        question_map = {}
+        for row in cur.fetchall():
+            qid = row['question_id']
+            if qid not in question_map:
+                question_map[qid] = {'question_id': qid, 'text': row['text'], 'choices': []}
+            question_map[qid]['choices'].append({'choice_id': row['choice_id'], 'choice_text': row['choice_text']})
+        questions = list(question_map.values())
+
+    return {
+        "round_number": rnd['round_number'],
+        "status": rnd['status'],
+        "category_id": category_id,
+        "category_picker_id": rnd['category_picker_id'],
+        "category_options": category_options,
+        "questions": questions,
+        "time_limit_seconds": rnd.get('time_limit_seconds')
+    }
+
+
+def complete_round(cur, game_id, round_number, expired_after=None):
+    """
+    Complete a round and move the game on: open the next round, or finish the
+    game after the last one.
+
+    Normally every participant must have answered every question of the round.
+    With ``expired_after`` (grace seconds) the round of an active game is
+    completed as it is once its time limit plus the grace period has passed.
+    Completing a completed round changes nothing.
+    """
+    game = lock_game(cur, game_id)
+    if game is None:
+        raise TransitionError('round_not_found')
+    execute_prepared(cur, ROUND_BY_NUMBER, (game_id, round_number))
+    rnd = cur.fetchone()
+    if rnd is None:
+        raise TransitionError('round_not_found')
+    if rnd['status'] == 'completed':
+        return Transition(game_id, rnd['id'], None, [], None, None)
+    if rnd['status'] != 'active':
+        raise TransitionError('round_not_active', status=rnd['status'])
+
+    if expired_after is not None:
+        if game['status'] != 'active':
+            raise TransitionError('game_not_active', status=game['status'])
+        execute_prepared(cur, ROUND_DUE, (rnd['id'], expired_after))
+        due = cur.fetchone()
+        if not due or not due['due']:
+            raise TransitionError('round_not_due')
+    else:
+        if not rnd['category_id']:
+            raise TransitionError('no_category')
+        expected = game['participant_count'] * rnd['question_count']
+        if rnd['answer_count'] < expected:
+            raise TransitionError('answers_missing', expected=expected, submitted=rnd['answer_count'])
+
+    execute_prepared(cur, COMPLETE_ROUND_UPDATE, (rnd['id'],))
+    open_rounds = game['open_rounds'] - 1
+
+    if open_rounds <= 0 and game['status'] == 'active':
+        finished = finish_game(cur, game_id, game['rated'])
+        return Transition(game_id, rnd['id'], finished['state_version'], [round_op(None), status_op('completed')],
+                          finished['winner_id'], finished['winner_score'])
+
+    next_state = None
+    if open_rounds > 0:
+        execute_prepared(cur, NEXT_OPEN_ROUND, (game_id,))
+        next_round = cur.fetchone()
+        if next_round:
+            if next_round['status'] == 'pending':
+                # Starts the pick of the next round
+                execute_prepared(cur, OPEN_NEXT_ROUND, (next_round['id'],))
+            next_state = round_state(cur, next_round)
+    version = bump_state_version(cur, game_id)
+    # The next round (or none after the last one) replaces the finished round
+    return Transition(game_id, rnd['id'], version, [round_op(next_state)], None, None)
+
+
+def expire_round(cur, round_id, grace_seconds, pick_seconds=None):
+    """
+    Complete a round whose time limit plus ``grace_seconds`` has passed, answered
+    or not (app/round_timer.py). A round still waiting for its category gets one
+    picked once ``pick_seconds`` have passed (``pick_timed_out``). Returns the
+    ``Transition``, or None if the round is not due or its game is not active.
+    """
+    execute_prepared(cur, ROUND_GAME, (round_id,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    try:
+        if row['status'] == 'pending':
+            if pick_seconds is None:
+                return None
+            transition = pick_timed_out(cur, row['game_id'], round_id, pick_seconds)
+        else:
+            transition = complete_round(cur, row['game_id'], row['round_number'], expired_after=grace_seconds)
+    except TransitionError:
+        return None
+    return transition if transition.version is not None else None
+
+
+def pick_timed_out(cur, game_id, round_id, pick_seconds):
+    """
+    Pick the category of the game's current round once ``pick_seconds`` have
+    passed since it was opened: the first offered category, or any category
+    when the round has no offer. The round becomes active with its questions.
+    Only rounds with a picker (duels) are picked this way.
+    """
+    game = lock_game(cur, game_id)
+    if game is None:
+        raise TransitionError('game_not_found')
+    if game['status'] != 'active':
+        raise TransitionError('game_not_active', status=game['status'])
+    # Only the round being picked now; later pending rounds have not been opened yet
+    execute_prepared(cur, NEXT_OPEN_ROUND, (game_id,))
+    rnd = cur.fetchone()
+    # Rounds without a picker (group games) get their categories from assign_categories
+    if (rnd is None or rnd['id'] != round_id or rnd['status'] != 'pending' or rnd['category_id']
+            or rnd['category_picker_id'] is None):
+        return Transition(game_id, round_id, None, [], None, None)
+    execute_prepared(cur, PICK_DUE, (round_id, pick_seconds))
+    due = cur.fetchone()
+    if not due or not due['due']:
+        raise TransitionError('round_not_due')
+
+    if rnd['category_options']:
+        category_id = rnd['category_options'][0]
+    else:
+        execute_prepared(cur, ANY_CATEGORY, ())
+        category_id = cur.fetchone()['id']
+        if category_id is None:
+            raise TransitionError('no_category')
+    execute_prepared(cur, AUTO_PICK_CATEGORY, (category_id, round_id))
+    if cur.fetchone() is None:
+        return Transition(game_id, round_id, None, [], None, None)
+    insert_many(cur, 'game_round_questions', ('game_round_id', 'question_id'),
+                [(round_id, qid) for qid in sample_questions(cur, category_id, 3)])
+    version = bump_state_version(cur, game_id)
+    picked = round_state(cur, {**rnd, 'status': 'active', 'category_id': category_id})
+    return Transition(game_id, round_id, version, [round_op(picked)], None, None)
+
+
+def complete_game(cur, game_id, rated=None):
+    """
+    Finish a game whose rounds are all completed (``rated`` overrides the game's
+    own flag). complete_round already does this after the last round, so for a
+    finished game this changes nothing and returns its winner.
+    """
+    game = lock_game(cur, game_id)
+    if game is None:
+        raise TransitionError('game_not_found')
+    if game['status'] == 'completed':
+        winner_score = None
+        if game['winner_id'] is not None:
+            execute_prepared(cur, PARTICIPANT_SCORE, (game_id, game['winner_id']))
+            row = cur.fetchone()
+            winner_score = row['score'] if row else None
+        return Transition(game_id, None, None, [], game['winner_id'], winner_score)
+    if game['status'] != 'active':
+        raise TransitionError('game_not_active', status=game['status'])
+    if game['open_rounds'] > 0:
+        raise TransitionError('rounds_open', open_rounds=game['open_rounds'])
+    if game['participant_count'] == 0:
+        raise TransitionError('no_participants')
+
+    finished = finish_game(cur, game_id, game['rated'] if rated is None else rated)
+    return Transition(game_id, None, finished['state_version'], [status_op('completed')],
+                      finished['winner_id'], finished['winner_score'])
+
+
+def finish_game(cur, game_id, rated):
+    """
+    Mark the game completed; the highest score wins (the earliest to join on a
+    tie). Awards XP (the score, +20% for the winner) and, if ``rated`` and the
+    game has two players, updates both Elo ratings. Returns the games row (id,
+    winner_id, state_version) with the winner's score as ``winner_score``.
+    """
+    execute_prepared(cur, FINISH_GAME, (game_id,))
+    result = dict(cur.fetchone())
+    participants = result.pop('participants')
+
+    # Elo update for duels (equal scores count as a draw); deltas keep concurrent updates safe
+    if rated and len(participants) == 2:
+        a, b = participants
+        winner_id = result['winner_id']
+        score_a = 0.5 if a['score'] == b['score'] else (1 if a['user_id'] == winner_id else 0)
+        delta_a, delta_b = rating.elo_deltas(
+            a['rating'], b['rating'], score_a, k=current_app.config.get('RATING_K_FACTOR', 32)
+        )
+        cur.execute("""
+            UPDATE users u
+            SET rating = u.rating + d.delta
+            FROM unnest(%s::bigint[], %s::int[]) AS d(user_id, delta)
+            WHERE u.id = d.user_id
+        """, ([a['user_id'], b['user_id']], [delta_a, delta_b]))
+    return result
@@ -0,0 +1,91 @@
+"""
+Socket.IO pushes to a single user or to a game room.
+
+Every client joins ``user_<id>`` on the default namespace (on connect when the
+session is logged in, or with the ``join_user`` event), so the server can tell
+a waiting player about a new game instead of being polled for it. The room is
+always the session user's own; ``join_user`` with another user_id is refused.
+
+Game rooms (``game_<id>``) get a versioned delta protocol instead of the full
+game state after every change:
+
+- ``game_snapshot`` ``{game_id, version, state}`` goes only to the socket that
+  sent ``join_game`` or ``request_resync``.
+- ``game_update`` ``{game_id, version, ops}`` goes to the room after each change.
+  ``version`` is the game's ``state_version`` after the change, so a client
+  applies an update only on top of ``version - 1``. It ignores versions it
+  already has, and on a gap it sends ``request_resync`` for a new snapshot.
+
+Ops:
+
+- ``{"op": "score", "user_id", "score"}``: a participant's score changed.
+- ``{"op": "status", "status"}``: the game status changed.
+- ``{"op": "round", "round"}``: replaces ``current_round`` (None after the last round).
+  Sent when a category is picked or a round is opened or closed.
+"""
+
+MATCH_FOUND = 'match_found'     # queue pairing (enqueue or background matcher)
+GAME_STARTED = 'game_started'   # invitation accepted, group game created
+GAME_SNAPSHOT = 'game_snapshot'
+GAME_UPDATE = 'game_update'
+
+
+def user_room(user_id):
+    return f'user_{user_id}'
+
+
+def game_room(game_id):
+    return f'game_{game_id}'
+
+
+def notify_game_created(socketio, event, game_state):
+    """Push ``event`` with the initial game state to every participant's user room"""
+    payload = {'game_id': game_state['game']['id'], 'game_state': game_state}
+    for participant in game_state['participants']:
+        socketio.emit(event, payload, room=user_room(participant['user_id']))
+
+
+def snapshot_payload(game_id, entry):
+    """``game_snapshot`` payload for a cached ``CachedState`` (see app/game_cache.py)"""
+    return {'game_id': game_id, 'version': entry.version, 'state': entry.state}
+
+
+def score_op(user_id, score):
+    return {'op': 'score', 'user_id': user_id, 'score': score}
+
+
+def status_op(status):
+    return {'op': 'status', 'status': status}
+
+
+def round_op(round_state):
+    return {'op': 'round', 'round': round_state}
+
+
+def send_game_update(socketio, game_id, version, ops):
+    """Broadcast the changes that turned ``version - 1`` into ``version`` to the game room"""
+    socketio.emit(GAME_UPDATE, {'game_id': game_id, 'version': version, 'ops': list(ops)}, room=game_room(game_id))
+
+
+def apply_ops(state, ops):
+    """
+    Apply ``game_update`` ops to a copy of ``state`` (the server-side reference
+    for what clients do; the cached state itself is never modified).
+    """
+    state = dict(state)
+    for op in ops:
+        kind = op['op']
+        if kind == 'score':
+            state['scores'] = {**state.get('scores', {}), op['user_id']: op['score']}
+            state['participants'] = [
+                {**p, 'score': op['score']} if p['user_id'] == op['user_id'] else p
+                for p in state.get('participants', [])
+            ]
+        elif kind == 'status':
+            state['game_status'] = op['status']
+            state['game'] = {**state.get('game', {}), 'status': op['status']}
+        elif kind == 'round':
+            state['current_round'] = op['round']
+        else:
+            raise ValueError(f"Unknown game_update op {kind!r}")
+    return state
@@ -0,0 +1,84 @@
+"""
+Cooperative (green thread) deployment support.
+
+Select the worker type with ``ASYNC_MODE`` (``threading``, ``eventlet`` or
+``gevent``). For the green modes, ``patch()`` must run before anything else is
+imported: it monkey-patches the standard library and installs a psycopg2 wait
+callback, so a slow query yields to other greenlets instead of blocking every
+socket on the worker. The ``app`` package calls it first thing on import, so
+this module must only import the standard library at module level, and entry
+points must import ``app`` before anything else.
+"""
+
+GREEN_MODES = ('eventlet', 'gevent')
+
+_patched = None
+
+
+def async_mode():
+    """Configured Socket.IO async mode, ``Config.ASYNC_MODE`` (None lets Flask-SocketIO pick)"""
+    from config import Config
+    return Config.ASYNC_MODE
+
+
+def _eventlet_wait_callback(conn, timeout=-1):
+    """Let psycopg2 wait for the socket through the eventlet hub"""
+    import psycopg2.extensions
+    from eventlet.hubs import trampoline
+
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            break
+        elif state == psycopg2.extensions.POLL_READ:
+            trampoline(conn.fileno(), read=True)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            trampoline(conn.fileno(), write=True)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+
+def _gevent_wait_callback(conn, timeout=None):
+    """Let psycopg2 wait for the socket through the gevent hub"""
+    import psycopg2.extensions
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            break
+        elif state == psycopg2.extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+
+def patch(mode=None):
+    """
+    Monkey-patch the process for ``mode`` (default: ASYNC_MODE) and make
+    psycopg2 green. Safe to call more than once; a no-op for threading.
+    """
+    global _patched
+    mode = mode or async_mode()
+    if mode not in GREEN_MODES or _patched == mode:
+        return mode
+
+    try:
+        if mode == 'eventlet':
+            import eventlet
+            eventlet.monkey_patch()
+            wait_callback = _eventlet_wait_callback
+        else:
+            from gevent import monkey
+            monkey.patch_all()
+            wait_callback = _gevent_wait_callback
+    except ImportError as e:
+        raise RuntimeError(f"ASYNC_MODE={mode} requires the '{mode}' package: {e}") from e
+
+    import psycopg2.extensions
+    psycopg2.extensions.set_wait_callback(wait_callback)
+    _patched = mode
+    print(f"Running with {mode} workers (green psycopg2 enabled)")
+    return mode
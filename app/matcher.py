@@ -0,0 +1,205 @@
+"""
+Tick-based background matchmaker.
+
+Every ``MATCHMAKER_TICK_SECONDS`` the matcher takes all waiting players off
+``match_queue`` (``FOR UPDATE SKIP LOCKED``), pairs them per game type by
+rating and creates all resulting games in one transaction. Each player's
+search window starts at ``MATCHMAKER_BASE_WINDOW`` rating points and widens by
+``MATCHMAKER_WINDOW_GROWTH`` points per second waited, up to
+``MATCHMAKER_MAX_WINDOW``.
+
+Every worker runs the loop, but a tick only does work in the worker that gets
+the transaction-level advisory lock, so players are never paired twice.
+"""
+
+import bisect
+import math
+import threading
+import time
+from collections import deque, namedtuple
+
+from flask import current_app
+
+from . import round_timer
+from .db import get_db, transaction
+from .game_events import notify_game_created, MATCH_FOUND
+
+# Arbitrary key for pg_try_advisory_xact_lock: one matcher tick at a time across workers
+MATCHER_LOCK_ID = 72_105_002
+
+Waiting = namedtuple('Waiting', 'queue_id user_id rating wait_seconds')
+
+
+def search_window(wait_seconds, base_window, window_growth, max_window):
+    """Rating distance a player accepts after waiting ``wait_seconds``"""
+    return min(base_window + window_growth * wait_seconds, max_window)
+
+
+def pair_players(waiting, base_window=100, window_growth=25, max_window=800):
+    """
+    Pair ``Waiting`` players of one game type and return ``[(player, opponent), ...]``.
+
+    Players are served longest-waiting first, and each is paired with the closest-rated
+    unpaired player inside its search window. The longest waiter also has the widest
+    window of everyone left, so its window decides. Players are kept sorted by rating,
+    so the nearest candidates are the direct neighbours once paired players are removed.
+    """
+    pool = sorted(waiting, key=lambda w: (w.rating, w.queue_id))
+    keys = [(w.rating, w.queue_id) for w in pool]
+    pairs = []
+    for player in sorted(waiting, key=lambda w: (-w.wait_seconds, w.queue_id)):
+        index = bisect.bisect_left(keys, (player.rating, player.queue_id))
+        if index >= len(keys) or keys[index] != (player.rating, player.queue_id):
+            continue  # already paired
+        window = search_window(player.wait_seconds, base_window, window_growth, max_window)
+        neighbours = [i for i in (index - 1, index + 1) if 0 <= i < len(pool)]
+        candidates = [i for i in neighbours if abs(pool[i].rating - player.rating) <= window]
+        if not candidates:
+            continue
+        best = min(candidates, key=lambda i: abs(pool[i].rating - player.rating))
+        pairs.append((player, pool[best]))
+        for i in sorted((index, best), reverse=True):
+            del pool[i]
+            del keys[i]
+    return pairs
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class MatcherStats:
+    """Matches per tick and queue wait times of the recent ticks (thread-safe)"""
+
+    def __init__(self, history=60, wait_samples=1000):
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self.matches_total = 0
+        self._matches = deque(maxlen=history)
+        self._waits = deque(maxlen=wait_samples)
+        self.last_tick = None
+
+    def record(self, matches, waiting, wait_seconds, duration_ms):
+        with self._lock:
+            self.ticks += 1
+            self.matches_total += matches
+            self._matches.append(matches)
+            self._waits.extend(wait_seconds)
+            self.last_tick = {'matches': matches, 'waiting': waiting, 'duration_ms': round(duration_ms, 3)}
+
+    def snapshot(self):
+        with self._lock:
+            waits = list(self._waits)
+            recent = list(self._matches)
+            return {
+                'ticks': self.ticks,
+                'matches_total': self.matches_total,
+                'matches_per_tick': round(sum(recent) / len(recent), 3) if recent else 0.0,
+                'last_tick': self.last_tick,
+                'wait_p50_s': round(_percentile(waits, 50), 3),
+                'wait_p95_s': round(_percentile(waits, 95), 3),
+                'wait_p99_s': round(_percentile(waits, 99), 3),
+            }
+
+
+def get_stats():
+    """Matcher statistics of the current app, or None when the matcher is disabled"""
+    stats = current_app.extensions.get('matcher_stats')
+    return stats.snapshot() if stats else None
+
+
+def run_tick(conn=None):
+    """
+    Pair every waiting player that can be paired and create their games.
+    Returns the created game states, or None if another worker holds the tick.
+    """
+    config = current_app.config
+    started = time.perf_counter()
+    with transaction(conn) as cur:
+        cur.execute("SELECT pg_try_advisory_xact_lock(%s) AS leader", (MATCHER_LOCK_ID,))
+        if not cur.fetchone()['leader']:
+            return None
+
+        # Rows locked by another transaction (e.g. an enqueue still in flight) are left for the next tick
+        cur.execute("""
+            SELECT id, user_id, game_type_id, rating,
+                   EXTRACT(EPOCH FROM LOCALTIMESTAMP - enqueued_at) AS wait_seconds
+            FROM match_queue
+            ORDER BY game_type_id, enqueued_at
+            FOR UPDATE SKIP LOCKED
+        """)
+        by_game_type = {}
+        rows = cur.fetchall()
+        for row in rows:
+            by_game_type.setdefault(row['game_type_id'], []).append(
+                Waiting(row['id'], row['user_id'], row['rating'], float(row['wait_seconds']))
+            )
+
+        pairs_by_game_type = {
+            game_type_id: pair_players(
+                waiting,
+                base_window=config['MATCHMAKER_BASE_WINDOW'],
+                window_growth=config['MATCHMAKER_WINDOW_GROWTH'],
+                max_window=config['MATCHMAKER_MAX_WINDOW'],
+            )
+            for game_type_id, waiting in by_game_type.items()
+        }
+        paired = [p for pairs in pairs_by_game_type.values() for pair in pairs for p in pair]
+
+        games = []
+        if paired:
+            cur.execute("DELETE FROM match_queue WHERE id = ANY(%s)", ([p.queue_id for p in paired],))
+            for game_type_id, pairs in pairs_by_game_type.items():
+                if not pairs:
+                    continue
+                cur.execute(
+                    "SELECT fn_create_games(%s, %s::bigint[], %s::bigint[], 'alternate', %s) AS state",
+                    (game_type_id, [a.user_id for a, _ in pairs], [b.user_id for _, b in pairs],
+                     config['ROUND_TIME_LIMIT_SECONDS'])
+                )
+                games.extend(row['state'] for row in cur.fetchall())
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    stats = current_app.extensions.setdefault('matcher_stats', MatcherStats())
+    stats.record(len(games), len(rows), [p.wait_seconds for p in paired], duration_ms)
+    if games:
+        current_app.logger.info(
+            f"Matchmaker: {len(games)} games from {len(rows)} waiting players in {duration_ms:.1f} ms"
+        )
+    return games
+
+
+def _run(app, socketio):
+    while True:
+        socketio.sleep(app.config['MATCHMAKER_TICK_SECONDS'])
+        with app.app_context():
+            try:
+                games = run_tick(get_db())
+            except Exception as e:
+                app.logger.error(f"Matchmaker tick failed: {e}")
+                continue
+            if games:
+                round_timer.games_changed(get_db(), [game_state['game']['id'] for game_state in games])
+            for game_state in games or ():
+                notify_game_created(socketio, MATCH_FOUND, game_state)
+
+
+def init_app(app, socketio):
+    """Start the matcher loop with the first request of this worker (when MATCHMAKER_ENABLED)"""
+    if not app.config.get('MATCHMAKER_ENABLED'):
+        return
+    app.extensions['matcher_stats'] = MatcherStats()
+    started = threading.Event()
+    start_lock = threading.Lock()
+
+    @app.before_request
+    def _start_matcher():
+        if started.is_set():
+            return
+        with start_lock:
+            if not started.is_set():
+                started.set()
+                socketio.start_background_task(_run, app, socketio)
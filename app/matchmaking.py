@@ -0,0 +1,94 @@
+"""
+Matchmaking for queued games.
+
+Pairing is an atomic claim: the longest-waiting player of a game type is
+locked with ``FOR UPDATE SKIP LOCKED`` and deleted from ``match_queue`` in the
+same statement that removes the enqueuing player. Concurrent enqueues, also
+from other workers, never pair the same player twice and never wait on each
+other's locks; they simply claim the next free row.
+"""
+
+from collections import namedtuple
+
+from .db import prepare_statement, execute_prepared, transaction
+
+QueueResult = namedtuple('QueueResult', 'queue_entry opponent_id match')
+
+JOIN_QUEUE = prepare_statement("matchmaking_join_queue", """
+    INSERT INTO match_queue (user_id, game_type_id, rating)
+    SELECT id, $2, rating FROM users WHERE id = $1
+    ON CONFLICT (user_id, game_type_id) DO NOTHING
+    RETURNING id, enqueued_at
+""")
+# Lock our own row first: if another enqueue is already pairing us, it is
+# locked and we back off instead of creating a second game.
+CLAIM_OPPONENT = prepare_statement("matchmaking_claim_opponent", """
+    WITH me AS (
+        SELECT id FROM match_queue WHERE id = $1 FOR UPDATE SKIP LOCKED
+    ), opponent AS (
+        DELETE FROM match_queue
+        WHERE id = (
+            SELECT id FROM match_queue
+            WHERE game_type_id = $2 AND user_id <> $3 AND EXISTS (SELECT 1 FROM me)
+            ORDER BY enqueued_at
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING user_id
+    ), leave_queue AS (
+        DELETE FROM match_queue WHERE id = $1 AND EXISTS (SELECT 1 FROM opponent)
+    )
+    SELECT user_id FROM opponent
+""")
+# Serializes the second attempts of one game type (see enqueue)
+LOCK_RETRIES = prepare_statement(
+    "matchmaking_lock_retries", "SELECT pg_advisory_xact_lock(hashtext('match_queue'), $1)"
+)
+
+
+class AlreadyQueued(Exception):
+    """Raised when the user already waits in the queue for this game type."""
+
+
+def claim_opponent(cur, queue_id, user_id, game_type_id):
+    """
+    Take the longest-waiting other player off the queue together with our own
+    entry ``queue_id``. Returns the opponent's user id, or None if nobody is free.
+    """
+    execute_prepared(cur, CLAIM_OPPONENT, (queue_id, game_type_id, user_id))
+    row = cur.fetchone()
+    return row['user_id'] if row else None
+
+
+def enqueue(conn, user_id, game_type_id, on_match, claim=True):
+    """
+    Queue ``user_id`` for ``game_type_id`` and pair them with the longest-waiting
+    player if there is one. ``on_match(cur, player_ids)`` runs in the pairing
+    transaction (e.g. to create the game) and its result is returned as ``match``.
+    With ``claim=False`` the player only joins the queue and the background
+    matcher (app/matcher.py) pairs them on its next tick.
+
+    Our queue row stays invisible to other workers until we found nobody to
+    claim. Two players enqueuing at the same moment cannot see each other in
+    that first transaction, so an unmatched player tries once more after the
+    row is committed. The second attempts of a game type take an advisory lock
+    and run one at a time: run together, each would lock its own row and skip
+    the other's, and both players would stay queued.
+    """
+    with transaction(conn) as cur:
+        execute_prepared(cur, JOIN_QUEUE, (user_id, game_type_id))
+        queue_entry = cur.fetchone()
+        if queue_entry is None:
+            raise AlreadyQueued(user_id, game_type_id)
+        if not claim:
+            return QueueResult(queue_entry, None, None)
+        opponent_id = claim_opponent(cur, queue_entry['id'], user_id, game_type_id)
+        if opponent_id is not None:
+            return QueueResult(queue_entry, opponent_id, on_match(cur, [opponent_id, user_id]))
+
+    with transaction(conn) as cur:
+        execute_prepared(cur, LOCK_RETRIES, (game_type_id,))
+        opponent_id = claim_opponent(cur, queue_entry['id'], user_id, game_type_id)
+        if opponent_id is not None:
+            return QueueResult(queue_entry, opponent_id, on_match(cur, [opponent_id, user_id]))
+    return QueueResult(queue_entry, None, None)
@@ -0,0 +1,196 @@
+"""
+Versioned schema migrations.
+
+Migrations are the numbered files in ``app/sql/migrations`` (``0001_name.sql``).
+Each one is applied exactly once, in its own transaction, and recorded in the
+``schema_migrations`` table together with a checksum of its contents so that an
+edited migration is detected instead of silently diverging.
+"""
+
+import hashlib
+import os
+import re
+from collections import namedtuple
+
+import click
+from flask.cli import with_appcontext
+
+from .db import get_db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'sql', 'migrations')
+FILENAME_RE = re.compile(r'^(\d{4})_([A-Za-z0-9_]+)\.sql$')
+
+# Arbitrary key for pg_advisory_lock so only one worker migrates at a time
+MIGRATION_LOCK_ID = 72_105_001
+
+Migration = namedtuple('Migration', 'version name checksum sql')
+
+
+class MigrationError(Exception):
+    """Raised when the migration files and the database history disagree."""
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Read and checksum every migration file, ordered by version"""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = FILENAME_RE.match(filename)
+        if not match:
+            continue
+        version, name = int(match.group(1)), match.group(2)
+        if version in migrations:
+            raise MigrationError(f"Duplicate migration version {version:04d}")
+        with open(os.path.join(directory, filename), encoding='utf8') as f:
+            # Normalise line endings so checkouts on Windows hash identically
+            sql = f.read().replace('\r\n', '\n')
+        checksum = hashlib.sha256(sql.encode('utf8')).hexdigest()
+        migrations[version] = Migration(version, name, checksum, sql)
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def latest_version(directory=MIGRATIONS_DIR):
+    """Highest migration version available on disk, without reading file contents"""
+    versions = [int(m.group(1)) for m in map(FILENAME_RE.match, os.listdir(directory)) if m]
+    return max(versions, default=0)
+
+
+def _ensure_version_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_migrations(conn):
+    """Return {version: row} for every migration recorded in the database"""
+    with conn.cursor() as cur:
+        _ensure_version_table(cur)
+        cur.execute("SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version")
+        rows = cur.fetchall()
+    conn.commit()
+    return {row['version']: row for row in rows}
+
+
+def verify_checksums(applied, migrations):
+    """Fail if an applied migration was edited or removed from disk"""
+    on_disk = {m.version: m for m in migrations}
+    for version, row in applied.items():
+        migration = on_disk.get(version)
+        if migration is None:
+            raise MigrationError(f"Migration {version:04d} ({row['name']}) is applied but missing on disk")
+        if migration.checksum != row['checksum'].strip():
+            raise MigrationError(
+                f"Checksum mismatch for migration {version:04d}_{migration.name}: "
+                f"the file was modified after being applied"
+            )
+
+
+def upgrade(conn, target=None):
+    """
+    Apply every pending migration up to ``target`` (default: latest).
+    Returns the list of migrations that were applied.
+    """
+    migrations = load_migrations()
+    applied_now = []
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+    conn.commit()
+    try:
+        applied = applied_migrations(conn)
+        verify_checksums(applied, migrations)
+
+        for migration in migrations:
+            if migration.version in applied:
+                continue
+            if target is not None and migration.version > target:
+                break
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(migration.sql)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                        (migration.version, migration.name, migration.checksum)
+                    )
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise MigrationError(f"Migration {migration.version:04d}_{migration.name} failed: {e}") from e
+            applied_now.append(migration)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+        conn.commit()
+
+    return applied_now
+
+
+def current_version(conn):
+    """Highest applied migration version (0 for an empty database)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('schema_migrations') AS tbl")
+        if cur.fetchone()['tbl'] is None:
+            version = 0
+        else:
+            cur.execute("SELECT COALESCE(MAX(version), 0) AS version FROM schema_migrations")
+            version = cur.fetchone()['version']
+    conn.commit()
+    return version
+
+
+def check_schema_version():
+    """
+    Cheap startup check: compare the database version with the files on disk.
+    Returns (current, latest) and warns when they differ.
+    """
+    current = current_version(get_db())
+    latest = latest_version()
+    if current < latest:
+        print(f"Database schema is at version {current}, {latest} is available. Run 'flask db upgrade'.")
+    elif current > latest:
+        print(f"Database schema version {current} is newer than this code ({latest}).")
+    return current, latest
+
+
+@click.group('db')
+def db_cli():
+    """Database schema migrations."""
+
+
+@db_cli.command('upgrade')
+@click.option('--target', type=int, default=None, help='Stop after this migration version')
+@with_appcontext
+def upgrade_command(target):
+    """Apply pending migrations."""
+    applied = upgrade(get_db(), target=target)
+    if not applied:
+        click.echo('Database is up to date.')
+    for migration in applied:
+        click.echo(f'Applied {migration.version:04d}_{migration.name}')
+
+
+@db_cli.command('status')
+@with_appcontext
+def status_command():
+    """Show applied and pending migrations."""
+    conn = get_db()
+    applied = applied_migrations(conn)
+    migrations = load_migrations()
+    for migration in migrations:
+        row = applied.get(migration.version)
+        if row is None:
+            state = 'pending'
+        elif row['checksum'].strip() != migration.checksum:
+            state = 'MODIFIED'
+        else:
+            state = f"applied {row['applied_at']:%Y-%m-%d %H:%M:%S}"
+        click.echo(f'{migration.version:04d}_{migration.name:<40} {state}')
+
+
+def init_app(app):
+    """Register the migration commands with the Flask app"""
+    app.cli.add_command(db_cli)
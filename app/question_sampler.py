@@ -0,0 +1,179 @@
+"""
+In-memory question sampling per category.
+
+Picking a round's questions used to run ``ORDER BY RANDOM() LIMIT k`` over
+every verified question of the category, which sorts the whole category on
+each pick. The sampler keeps the verified question ids of every
+``(category_id, difficulty)`` in compact ``array('q')`` buckets and draws
+``k`` distinct ids in O(k).
+
+Keeping it current:
+
+- The question endpoints of this worker apply their own creates, updates,
+  verifications and deletes immediately (``question_changed`` /
+  ``question_deleted``).
+- Changes made elsewhere (other workers, import_questions.py) are picked up
+  by a full reload once the sampler is older than ``QUESTION_SAMPLER_REFRESH_SECONDS``.
+- ``sample_questions`` checks the drawn ids against the database with one
+  primary-key lookup. A stale id is never used: if the check comes up short,
+  that pick falls back to the SQL query and the next pick reloads.
+"""
+
+import random
+import threading
+import time
+from array import array
+
+from flask import current_app
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+LOAD_VERIFIED = "SELECT id, category_id, difficulty FROM questions WHERE is_verified = TRUE"
+
+
+class QuestionSampler:
+
+    def __init__(self, rng=None):
+        self._lock = threading.Lock()
+        self._buckets = {}      # (category_id, difficulty) -> array('q') of question ids
+        self._positions = {}    # question_id -> ((category_id, difficulty), index in its bucket)
+        self._rng = rng or random.Random()
+        self.loaded_at = None
+        self.stale = False
+
+    def load(self, rows):
+        """Replace the contents with ``rows`` of verified questions (id, category_id, difficulty)"""
+        buckets, positions = {}, {}
+        for row in rows:
+            key = (row['category_id'], row['difficulty'])
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = array('q')
+            positions[row['id']] = (key, len(bucket))
+            bucket.append(row['id'])
+        with self._lock:
+            self._buckets, self._positions = buckets, positions
+            self.loaded_at = time.monotonic()
+            self.stale = False
+
+    def __len__(self):
+        return len(self._positions)
+
+    def add(self, question_id, category_id, difficulty):
+        with self._lock:
+            self._remove(question_id)
+            key = (category_id, difficulty)
+            bucket = self._buckets.setdefault(key, array('q'))
+            self._positions[question_id] = (key, len(bucket))
+            bucket.append(question_id)
+
+    def remove(self, question_id):
+        with self._lock:
+            self._remove(question_id)
+
+    def _remove(self, question_id):
+        # Swap with the bucket's last id so removal is O(1)
+        found = self._positions.pop(question_id, None)
+        if found is None:
+            return
+        key, index = found
+        bucket = self._buckets[key]
+        last = bucket.pop()
+        if last != question_id:
+            bucket[index] = last
+            self._positions[last] = (key, index)
+
+    def update(self, question):
+        """Apply a created or updated question row (id, category_id, difficulty, is_verified)"""
+        if question.get('is_verified'):
+            self.add(question['id'], question['category_id'], question['difficulty'])
+        else:
+            self.remove(question['id'])
+
+    def count(self, category_id, difficulty=None):
+        with self._lock:
+            return sum(len(b) for b in self._category_buckets(category_id, difficulty))
+
+    def _category_buckets(self, category_id, difficulty):
+        difficulties = (difficulty,) if difficulty else DIFFICULTIES
+        return [self._buckets[key] for key in ((category_id, d) for d in difficulties) if key in self._buckets]
+
+    def sample(self, category_id, k, difficulty=None):
+        """Up to ``k`` distinct verified question ids of the category, uniformly at random"""
+        with self._lock:
+            buckets = self._category_buckets(category_id, difficulty)
+            total = sum(len(b) for b in buckets)
+            # random.sample over a range draws k indices without materializing the range
+            picked = []
+            for index in self._rng.sample(range(total), min(k, total)):
+                for bucket in buckets:
+                    if index < len(bucket):
+                        picked.append(bucket[index])
+                        break
+                    index -= len(bucket)
+            return picked
+
+
+def get_sampler():
+    """The question sampler of the current app, (re)loaded when missing, stale or expired"""
+    sampler = current_app.extensions.get('question_sampler')
+    if sampler is None:
+        sampler = current_app.extensions.setdefault('question_sampler', QuestionSampler())
+    max_age = current_app.config.get('QUESTION_SAMPLER_REFRESH_SECONDS', 300)
+    if sampler.loaded_at is None or sampler.stale or time.monotonic() - sampler.loaded_at > max_age:
+        from .db import get_db
+        cur = get_db().cursor()
+        cur.execute(LOAD_VERIFIED)
+        sampler.load(cur.fetchall())
+        cur.close()
+    return sampler
+
+
+def _loaded_sampler():
+    sampler = current_app.extensions.get('question_sampler')
+    return sampler if sampler is not None and sampler.loaded_at is not None else None
+
+
+def question_changed(question):
+    """Apply a question created or updated by this worker (no-op until the sampler is loaded)"""
+    sampler = _loaded_sampler()
+    if sampler is not None:
+        sampler.update(question)
+
+
+def question_deleted(question_id):
+    sampler = _loaded_sampler()
+    if sampler is not None:
+        sampler.remove(question_id)
+
+
+def sample_questions(cur, category_id, k, difficulty=None):
+    """
+    ``k`` random verified question ids of ``category_id`` (fewer if the category
+    has fewer), optionally of one difficulty. Uses ``cur`` for the check so it
+    sees the caller's transaction.
+    """
+    sampler = get_sampler()
+    ids = sampler.sample(category_id, k, difficulty)
+    if ids:
+        cur.execute("""
+            SELECT id FROM questions
+            WHERE id = ANY(%s) AND category_id = %s AND is_verified = TRUE
+              AND (%s::text IS NULL OR difficulty = %s)
+        """, (ids, category_id, difficulty, difficulty))
+        valid = {row['id'] for row in cur.fetchall()}
+        if len(valid) == len(ids):
+            return ids
+
+    # Changed elsewhere since the last load (or an empty category): ask the database this time
+    cur.execute("""
+        SELECT id FROM questions
+        WHERE category_id = %s AND is_verified = TRUE AND (%s::text IS NULL OR difficulty = %s)
+        ORDER BY RANDOM()
+        LIMIT %s
+    """, (category_id, difficulty, difficulty, k))
+    fallback = [row['id'] for row in cur.fetchall()]
+    if ids or fallback:
+        # The sampler held a stale id or missed questions: reload on the next pick
+        sampler.stale = True
+    return fallback
@@ -0,0 +1,20 @@
+"""
+Elo ratings for duels (``users.rating``), used by the matchmaker to pair
+players of similar skill.
+"""
+
+DEFAULT_RATING = 1200
+
+
+def expected_score(rating, opponent_rating):
+    """Probability that a player rated ``rating`` beats ``opponent_rating``"""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def elo_deltas(rating_a, rating_b, score_a, k=32):
+    """
+    Rating changes for both players of a duel. ``score_a`` is 1 for a win of
+    player a, 0.5 for a draw and 0 for a loss. The two deltas always cancel out.
+    """
+    delta = round(k * (score_a - expected_score(rating_a, rating_b)))
+    return delta, -delta
@@ -0,0 +1,290 @@
+"""
+Server-side round deadlines.
+
+A round used to end only when a client called ``/complete``, so an abandoned
+round stayed 'active' forever. Every worker now keeps the deadlines of the
+active rounds in a heap and completes a round once its time limit plus the
+answer grace period has passed, answered or not (``expire_round`` in
+app/game_engine.py): the next round is opened or, after the last round, the
+game is finished. The transition goes to the game room as a ``game_update``.
+A duel round waiting for its category has a pick deadline instead, from the
+moment it was opened: when the picker does not pick within
+``ROUND_PICK_TIME_LIMIT_SECONDS``, the first offered category is picked for
+them and the round's own deadline starts.
+
+- A worker schedules the rounds it activates or opens itself (category pick,
+  group category assignment, round completion) right after the commit.
+- Rounds activated or opened by other workers, including the first round of a
+  new game, and the rounds of a worker that was restarted, are picked up by
+  reloading all active and picking rounds from the database on startup and
+  every ``ROUND_TIMER_RELOAD_SECONDS``.
+- Deadlines are computed from ``start_time`` on the database clock and kept on
+  this worker's monotonic clock.
+
+Several workers usually hold the same deadline. Expiring locks the game row and
+only completes a round that is still 'active' and past its deadline, so the
+round is completed and pushed exactly once; the other workers find nothing to do.
+"""
+
+import heapq
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+
+from .db import get_db, transaction
+from .game_engine import expire_round
+from .game_events import send_game_update
+
+# Seconds past a round's time limit in which answers still count (API latency, client lag)
+ANSWER_GRACE_SECONDS = 5
+
+Deadline = namedtuple('Deadline', 'due round_id game_id round_number')
+
+# Active rounds with a time limit and, per game, the pending round being picked
+# (the first one not completed); start_time is when it was opened for the pick.
+# Rounds without a picker (group games) wait for assign_categories instead.
+ROUND_DEADLINES = """
+    SELECT gr.id, gr.game_id, gr.round_number,
+           EXTRACT(EPOCH FROM gr.start_time
+                              + CASE WHEN gr.status = 'pending' THEN make_interval(secs => %(pick)s)
+                                     ELSE make_interval(secs => gr.time_limit_seconds + %(grace)s) END
+                              - LOCALTIMESTAMP) AS remaining
+    FROM game_rounds gr
+    JOIN games g ON g.id = gr.game_id
+    WHERE g.status = 'active'
+      AND (%(game_ids)s::bigint[] IS NULL OR gr.game_id = ANY(%(game_ids)s))
+      AND (
+          (gr.status = 'active' AND gr.time_limit_seconds IS NOT NULL)
+          OR (gr.status = 'pending' AND gr.category_id IS NULL AND gr.category_picker_id IS NOT NULL AND NOT EXISTS (
+              SELECT 1 FROM game_rounds p
+              WHERE p.game_id = gr.game_id AND p.round_number < gr.round_number AND p.status <> 'completed'
+          ))
+      )
+"""
+
+
+class RoundTimer:
+    """
+    Round deadlines of one worker on the monotonic clock. Each round has at most
+    one deadline; rescheduling or cancelling leaves the old heap entry behind,
+    and it is skipped when it reaches the top.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._lock = threading.Lock()
+        self._heap = []
+        self._due = {}          # round_id -> due of its current deadline
+        self._scheduled = {}    # round_id -> clock time of the last schedule()
+        self._clock = clock
+        self.wakeup = threading.Event()
+        self.expired_total = 0
+        self.last_reload = None
+
+    def __len__(self):
+        return len(self._due)
+
+    def schedule(self, round_id, game_id, round_number, seconds):
+        """Fire ``seconds`` from now (replaces an earlier deadline of the round)"""
+        now = self._clock()
+        deadline = Deadline(now + seconds, round_id, game_id, round_number)
+        with self._lock:
+            self._push(deadline)
+            self._scheduled[round_id] = now
+            self._drop_superseded()
+            first = self._heap[0] is deadline
+        if first:
+            # The loop sleeps until the previous first deadline
+            self.wakeup.set()
+
+    def _push(self, deadline):
+        self._due[deadline.round_id] = deadline.due
+        heapq.heappush(self._heap, deadline)
+
+    def cancel(self, round_id):
+        with self._lock:
+            self._due.pop(round_id, None)
+            self._scheduled.pop(round_id, None)
+
+    def load(self, rows, started):
+        """
+        Replace the deadlines with ``rows`` (id, game_id, round_number, remaining
+        seconds) read from the database. Rounds scheduled after ``started`` (when
+        the rows were queried) are kept; the query may have missed them.
+        """
+        now = self._clock()
+        with self._lock:
+            kept = [
+                d for d in self._heap
+                if self._due.get(d.round_id) == d.due and self._scheduled.get(d.round_id, started - 1) >= started
+            ]
+            self._heap, self._due = [], {}
+            self._scheduled = {d.round_id: self._scheduled[d.round_id] for d in kept}
+            for row in rows:
+                self._push(Deadline(now + float(row['remaining']), row['id'], row['game_id'], row['round_number']))
+            for deadline in kept:
+                self._push(deadline)
+            self.last_reload = time.time()
+        self.wakeup.set()
+
+    def next_due(self):
+        """Clock time of the first deadline, or None"""
+        with self._lock:
+            self._drop_superseded()
+            return self._heap[0].due if self._heap else None
+
+    def _drop_superseded(self):
+        while self._heap and self._due.get(self._heap[0].round_id) != self._heap[0].due:
+            heapq.heappop(self._heap)
+
+    def pop_expired(self, now=None):
+        """Remove and return the deadlines due at ``now``, earliest first"""
+        now = self._clock() if now is None else now
+        expired = []
+        with self._lock:
+            self._drop_superseded()
+            while self._heap and self._heap[0].due <= now:
+                deadline = heapq.heappop(self._heap)
+                del self._due[deadline.round_id]
+                self._scheduled.pop(deadline.round_id, None)
+                expired.append(deadline)
+                self._drop_superseded()
+        return expired
+
+    def stats(self):
+        return {'scheduled': len(self), 'expired_total': self.expired_total, 'last_reload': self.last_reload}
+
+
+def get_timer():
+    """The round timer of the current app, or None when ROUND_TIMER_ENABLED is off"""
+    return current_app.extensions.get('round_timer')
+
+
+def round_activated(round_id, game_id, round_number, time_limit_seconds):
+    """Schedule a round this worker just activated (call after the commit)"""
+    timer = get_timer()
+    if timer is not None and time_limit_seconds is not None:
+        timer.schedule(round_id, game_id, round_number, time_limit_seconds + ANSWER_GRACE_SECONDS)
+
+
+def round_completed(round_id):
+    timer = get_timer()
+    if timer is not None:
+        timer.cancel(round_id)
+
+
+def _deadline_params(game_ids=None):
+    return {'grace': ANSWER_GRACE_SECONDS, 'pick': current_app.config.get('ROUND_PICK_TIME_LIMIT_SECONDS', 30),
+            'game_ids': game_ids}
+
+
+def _schedule_rows(timer, rows):
+    for row in rows:
+        timer.schedule(row['id'], row['game_id'], row['round_number'], max(float(row['remaining']), 0.1))
+
+
+def games_changed(conn, game_ids):
+    """
+    Schedule the current deadlines of games this worker just moved on, e.g. the
+    pick of the round opened by a round completion (call after the commit)
+    """
+    timer = get_timer()
+    if timer is None or not game_ids:
+        return
+    try:
+        with transaction(conn) as cur:
+            cur.execute(ROUND_DEADLINES, _deadline_params(list(game_ids)))
+            rows = cur.fetchall()
+    except Exception as e:
+        # The games are committed; the next reload schedules them
+        current_app.logger.error(f"Round timer: scheduling games {list(game_ids)} failed: {e}")
+        return
+    _schedule_rows(timer, rows)
+
+
+def reload(timer, conn):
+    """Replace the timer's deadlines with the active and picking rounds in the database"""
+    started = timer._clock()
+    cur = conn.cursor()
+    cur.execute(ROUND_DEADLINES, _deadline_params())
+    rows = cur.fetchall()
+    cur.close()
+    conn.commit()
+    timer.load(rows, started)
+
+
+def expire(timer, deadline, conn, socketio):
+    """
+    Complete the round of an expired ``deadline``, or pick its category, if no
+    one else has. Returns True if this call did; a round that is not due yet on
+    the database clock is scheduled again.
+    """
+    from . import answer_ingest
+
+    ingest = answer_ingest.get_ingest()
+    if ingest is not None:
+        # Answers accepted before the deadline still count
+        ingest.flush()
+    params = _deadline_params([deadline.game_id])
+    with transaction(conn) as cur:
+        result = expire_round(cur, deadline.round_id, ANSWER_GRACE_SECONDS, params['pick'])
+        # Not due yet: its deadline again; otherwise the pick or round the transition opened
+        cur.execute(ROUND_DEADLINES, params)
+        rows = cur.fetchall()
+    if result is None:
+        # Due but not changed (e.g. no category to pick): left to the next reload
+        rows = [r for r in rows if r['id'] != deadline.round_id or float(r['remaining']) > 0]
+    _schedule_rows(timer, rows)
+    if result is None:
+        return False
+
+    timer.expired_total += 1
+    if ingest is not None:
+        ingest.forget_round(result.game_id, deadline.round_number)
+    send_game_update(socketio, result.game_id, result.version, result.ops)
+    current_app.logger.info(f"Round timer: round {deadline.round_number} of game {result.game_id} timed out")
+    return True
+
+
+def _run(app, socketio, timer):
+    reload_every = app.config.get('ROUND_TIMER_RELOAD_SECONDS', 30)
+    next_reload = 0.0
+    while True:
+        with app.app_context():
+            if timer._clock() >= next_reload:
+                try:
+                    reload(timer, get_db())
+                except Exception as e:
+                    app.logger.error(f"Round timer reload failed: {e}")
+                next_reload = timer._clock() + reload_every
+            for deadline in timer.pop_expired():
+                try:
+                    expire(timer, deadline, get_db(), socketio)
+                except Exception as e:
+                    # Still active in the database, so the next reload schedules it again
+                    app.logger.error(f"Round timer: expiring round {deadline.round_id} failed: {e}")
+
+        due = timer.next_due()
+        wait = min(next_reload, due if due is not None else next_reload) - timer._clock()
+        timer.wakeup.wait(max(wait, 0.0))
+        timer.wakeup.clear()
+
+
+def init_app(app, socketio):
+    """Create the round timer and start its loop with the first request (when ROUND_TIMER_ENABLED)"""
+    if not app.config.get('ROUND_TIMER_ENABLED'):
+        return
+    timer = RoundTimer()
+    app.extensions['round_timer'] = timer
+    started = threading.Event()
+    start_lock = threading.Lock()
+
+    @app.before_request
+    def _start_round_timer():
+        if started.is_set():
+            return
+        with start_lock:
+            if not started.is_set():
+                started.set()
+                socketio.start_background_task(_run, app, socketio, timer)
@@ -1,4 +1,3 @@
-from decimal import Decimal
 from typing import Any, Dict, List, Optional
 from flask import Blueprint, request, jsonify, abort
 
@@ -7,13 +6,6 @@ from app.db import query_db, modify_db
 categories_bp = Blueprint('categories_bp', __name__, url_prefix='/categories')
 
 
-def _convert_decimal(row: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Convert Decimal values in a dict to floats for JSON serialization.
-    """
-    return {k: (float(v) if isinstance(v, Decimal) else v) for k, v in row.items()}
-
-
 def _build_update_clause(fields: Dict[str, Any], table: str, key: str) -> (str, List[Any]):
     """
     Build dynamic SQL UPDATE clause and parameters.
@@ -35,8 +27,7 @@ def list_categories() -> Any:
     """
     sql = "SELECT id, name, description, created_at FROM categories ORDER BY name;"
     categories = query_db(sql)
-    # Convert any Decimal fields
-    return jsonify([_convert_decimal(cat) for cat in categories]), 200
+    return jsonify(categories), 200
 
 
 @categories_bp.route('', methods=['POST'])
@@ -65,7 +56,7 @@ def create_category() -> Any:
     except Exception as e:
         abort(400, description=str(e))
 
-    return jsonify(_convert_decimal(new_cat)), 201
+    return jsonify(new_cat), 201
 
 
 @categories_bp.route('/<int:c_id>', methods=['GET'])
@@ -81,7 +72,7 @@ def get_category(c_id: int) -> Any:
     if not category:
         abort(404, description=f'Category {c_id} not found')
 
-    return jsonify(_convert_decimal(category)), 200
+    return jsonify(category), 200
 
 
 @categories_bp.route('/<int:c_id>', methods=['PUT'])
@@ -112,7 +103,7 @@ def update_category(c_id: int) -> Any:
     except Exception as e:
         abort(400, description=str(e))
 
-    return jsonify(_convert_decimal(updated)), 200
+    return jsonify(updated), 200
 
 
 @categories_bp.route('/<int:c_id>', methods=['DELETE'])
@@ -210,7 +201,7 @@ def get_category_stats(c_id: int) -> Any:
         'average_completion_time': float(score_stats['average_completion_time']) if score_stats['average_completion_time'] else 0
     }
 
-    return jsonify(_convert_decimal(stats)), 200
+    return jsonify(stats), 200
 
 
 def get_category_players(c_id: int) -> Any:
@@ -253,9 +244,9 @@ def get_category_players(c_id: int) -> Any:
             'user_id': player['user_id'],
             'username': player['username'],
             'games_played': player['games_played'],
-            'best_score': float(player['best_score']) if player['best_score'] else 0,
-            'average_score': float(player['average_score']) if player['average_score'] else 0,
-            'last_played_at': player['last_played_at'].isoformat() if player['last_played_at'] else None,
+            'best_score': player['best_score'] or 0,
+            'average_score': player['average_score'] or 0,
+            'last_played_at': player['last_played_at'],
             'rank': player['rank']
         })
 
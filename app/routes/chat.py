@@ -7,7 +7,6 @@ from app.db import query_db, modify_db
 from .users import login_required # Import the login_required decorator
 from app import socketio
 from flask_socketio import join_room, leave_room, emit
-from datetime import datetime
 
 # ===========================
 # 1) Blueprint Definition with prefix
@@ -566,12 +565,6 @@ def handle_send_room_message(data):
         )
         new_msg_data = cur.fetchone()
         
-        # Convert to dict and handle datetime for JSON serialization
-        if new_msg_data:
-            new_msg_data = dict(new_msg_data)
-            if 'sent_at' in new_msg_data and isinstance(new_msg_data['sent_at'], datetime):
-                new_msg_data['sent_at'] = new_msg_data['sent_at'].isoformat()
-
         # Broadcast the new message to all clients in the room
         # Broadcast the new message to all clients in the room
         socketio.emit('new_room_message', new_msg_data, room=str(room_id), namespace='/chat') # <--- تبدیل به رشته  
@@ -635,12 +628,6 @@ def handle_send_direct_message(data):
         )
         new_msg_data = cur.fetchone()
 
-        # Convert to dict and handle datetime for JSON serialization
-        if new_msg_data:
-            new_msg_data = dict(new_msg_data)
-            if 'sent_at' in new_msg_data and isinstance(new_msg_data['sent_at'], datetime):
-                new_msg_data['sent_at'] = new_msg_data['sent_at'].isoformat()
-
         # Emit message to sender's and recipient's private rooms
         socketio.emit('new_direct_message', new_msg_data, room=str(sender_id), namespace='/chat')
         socketio.emit('new_direct_message', new_msg_data, room=str(recipient_id), namespace='/chat')
@@ -742,12 +729,6 @@ def handle_edit_message(data):
         )
         updated_msg_data = cur.fetchone()
 
-        # Convert to dict and handle datetime for JSON serialization
-        if updated_msg_data:
-            updated_msg_data = dict(updated_msg_data)
-            if 'sent_at' in updated_msg_data and isinstance(updated_msg_data['sent_at'], datetime):
-                updated_msg_data['sent_at'] = updated_msg_data['sent_at'].isoformat()
-
         # Broadcast the update
         if message['room_id']:
             # It's a room message
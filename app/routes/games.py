@@ -1,52 +1,184 @@
 # app/routes/games_bp.py
 
 import time
-from flask import Blueprint, request, jsonify, abort
-from app.db import get_db, query_db, modify_db
+from flask import Blueprint, request, jsonify, abort, current_app
+from app.db import (
+    get_db, query_db, modify_db, prepare_statement, execute_prepared, transaction, insert_many,
+    run_in_transaction
+)
 import psycopg2
 import random
 from datetime import datetime, timedelta
-from app import socketio
+from app import socketio, matchmaking, answer_ingest, round_timer, game_engine
+from app.game_events import (
+    notify_game_created, send_game_update, score_op, status_op, round_op, MATCH_FOUND, GAME_STARTED
+)
+from app.game_cache import get_cache
+from app.game_engine import bump_state_version, round_state, TransitionError
+from app.question_sampler import sample_questions, DIFFICULTIES
+from app.round_timer import ANSWER_GRACE_SECONDS
 
 games_bp = Blueprint("games_bp", __name__, url_prefix="/games")
 
+# --- Prepared statements for the game hot path (state, pick, answer, complete) ---
+GAME_STATE_GAME = prepare_statement("game_state_game", """
+    SELECT g.id, g.game_type_id, g.status, gt.total_rounds
+    FROM games g
+    JOIN game_types gt ON g.game_type_id = gt.id
+    WHERE g.id = $1
+""")
+GAME_STATE_PARTICIPANTS = prepare_statement("game_state_participants", """
+    SELECT gp.user_id, u.username, u.avatar, gp.score
+    FROM game_participants gp
+    JOIN users u ON gp.user_id = u.id
+    WHERE gp.game_id = $1
+    ORDER BY gp.join_time ASC
+""")
+GAME_STATE_ROUNDS = prepare_statement("game_state_rounds", """
+    SELECT id, round_number, category_id, category_picker_id, status, start_time, category_options,
+           time_limit_seconds
+    FROM game_rounds
+    WHERE game_id = $1
+    ORDER BY round_number ASC
+""")
+IS_PARTICIPANT = prepare_statement(
+    "game_is_participant",
+    "SELECT 1 FROM game_participants WHERE game_id = $1 AND user_id = $2"
+)
+PICK_ROUND = prepare_statement(
+    "pick_round",
+    """
+    SELECT id, category_id, status, category_picker_id, category_options, time_limit_seconds
+    FROM game_rounds WHERE game_id = $1 AND round_number = $2
+    """
+)
+CATEGORY_EXISTS = prepare_statement("category_exists", "SELECT 1 FROM categories WHERE id = $1")
+PICK_SET_CATEGORY = prepare_statement(
+    "pick_set_category",
+    """
+    UPDATE game_rounds SET category_id = $1, status = 'active', start_time = NOW()
+    WHERE id = $2 AND category_id IS NULL
+    RETURNING id
+    """
+)
+SUBMIT_ANSWER = prepare_statement(
+    "submit_answer", "SELECT fn_submit_answer($1, $2, $3, $4, $5, $6, $7, $8) AS result"
+)
+CREATE_GAME = prepare_statement(
+    "create_game", "SELECT fn_create_game($1, $2::bigint[], $3, $4, $5) AS state"
+)
+GAME_STATE_VERSION = prepare_statement(
+    "game_state_version", "SELECT state_version FROM games WHERE id = $1"
+)
+ACTIVE_GAME = prepare_statement("active_game", """
+    SELECT g.id AS game_id, g.game_type_id, g.status
+    FROM game_participants gp
+    JOIN games g ON g.id = gp.game_id
+    WHERE gp.user_id = $1
+      AND g.status IN ('pending', 'active')
+      AND ($2::int IS NULL OR g.game_type_id = $2)
+    ORDER BY gp.game_id DESC
+    LIMIT 1
+""")
+
+# fn_submit_answer status -> (HTTP status, error message)
+ANSWER_ERRORS = {
+    'game_not_found': (404, "Game not found"),
+    'game_not_active': (400, "Game is not active"),
+    'round_not_found': (404, "Round not found"),
+    'round_not_active': (400, "Round is not active"),
+    'time_limit_exceeded': (400, "Time limit exceeded"),
+    'not_participant': (403, "User not active participant"),
+    'question_not_in_round': (400, "Question not found in this round"),
+    'invalid_choice': (400, "Invalid choice for this question"),
+    'already_answered': (400, "Already answered"),
+}
+
+# game_engine.TransitionError code -> (HTTP status, error message formatted with its details)
+ROUND_ERRORS = {
+    'round_not_found': (404, "Round not found"),
+    'round_not_active': (400, "Cannot complete round in status {status}"),
+    'no_category': (400, "Category not selected for this round"),
+    'answers_missing': (400, "Not all answers submitted yet. Expected: {expected}, Submitted: {submitted}"),
+}
+GAME_ERRORS = {
+    'game_not_found': (404, "Game not found"),
+    'game_not_active': (400, "Cannot complete game in status {status}"),
+    'rounds_open': (400, "Pending rounds remain"),
+    'no_participants': (400, "No participants found"),
+}
+GROUP_GAME_ERRORS = {**GAME_ERRORS, 'rounds_open': (400, "Not all rounds completed")}
+
+
+def _transition_error(errors, e):
+    status_code, message = errors[e.code]
+    return jsonify({"error": message.format(**e.details)}), status_code
+
+ROUND_COLUMNS = (
+    'game_id', 'round_number', 'category_id', 'category_picker_id',
+    'status', 'time_limit_seconds', 'points_possible'
+)
+
+def _round_rows(game_id, total_rounds, time_limit_seconds):
+    """game_rounds rows (no category, no picker) for a game started without fn_create_game"""
+    return [(game_id, r, None, None, 'pending', time_limit_seconds, 100) for r in range(1, total_rounds + 1)]
+
+
+def create_game(cur, game_type_id, participant_ids, picker_mode='none', rated=True):
+    """
+    Create an active game with its participants and all rounds in one round trip
+    (fn_create_game, see migrations 0003, 0010 and 0016) and return its initial game state.
+    picker_mode 'alternate' makes the participants take turns picking categories;
+    an unrated game does not change ratings when it is finished.
+    """
+    execute_prepared(cur, CREATE_GAME, (
+        game_type_id, list(participant_ids), picker_mode, current_app.config['ROUND_TIME_LIMIT_SECONDS'], rated
+    ))
+    return cur.fetchone()['state']
+
+
 # --- Helper Function to get full game state ---
+def get_game_state_entry(game_id):
+    """
+    The current game state as a cached ``CachedState(version, state, payload)``,
+    or None if the game does not exist. Costs one lookup while the version is unchanged.
+    """
+    cur = get_db().cursor()
+    execute_prepared(cur, GAME_STATE_VERSION, (game_id,))
+    row = cur.fetchone()
+    cur.close()
+    if not row:
+        return None
+    return get_cache().get(game_id, row['state_version'], lambda: _build_game_state(game_id))
+
+
 def get_full_game_state_data(game_id, user_id=None):
     """
     A helper function to fetch the complete game state. 
     Can be called from both HTTP endpoints and SocketIO events.
+    The returned dict is shared through the game state cache; do not modify it.
     """
+    entry = get_game_state_entry(game_id)
+    return entry.state if entry else None
+
+
+def _build_game_state(game_id):
+    """Build the game state from the database (3-5 queries)"""
     conn = get_db()
     cur = conn.cursor()
 
-    cur.execute("""
-        SELECT g.id, g.game_type_id, g.status, gt.total_rounds
-        FROM games g
-        JOIN game_types gt ON g.game_type_id = gt.id
-        WHERE g.id = %s
-    """, (game_id,))
+    execute_prepared(cur, GAME_STATE_GAME, (game_id,))
     game = cur.fetchone()
     if not game:
         cur.close()
         return None
 
-    cur.execute("""
-        SELECT gp.user_id, u.username, u.avatar, gp.score
-        FROM game_participants gp
-        JOIN users u ON gp.user_id = u.id
-        WHERE gp.game_id = %s 
-        ORDER BY gp.join_time ASC
-    """, (game_id,))
+    execute_prepared(cur, GAME_STATE_PARTICIPANTS, (game_id,))
     participants = [dict(row) for row in cur.fetchall()]
     
     scores = {p['user_id']: p['score'] for p in participants}
 
-    cur.execute("""
-        SELECT id, round_number, category_id, category_picker_id, status, start_time
-        FROM game_rounds 
-        WHERE game_id = %s 
-        ORDER BY round_number ASC
-    """, (game_id,))
+    execute_prepared(cur, GAME_STATE_ROUNDS, (game_id,))
     rounds = cur.fetchall()
     
     current_round_data = None
@@ -67,44 +199,7 @@ def get_full_game_state_data(game_id, user_id=None):
             }
     
     if active_round:
-        round_id = active_round['id']
-        category_id = active_round['category_id']
-        
-        category_options = []
-        if not category_id:
-            cur.execute("SELECT id, name, description FROM categories ORDER BY RANDOM() LIMIT 3")
-            category_options = [dict(row) for row in cur.fetchall()]
-
-        questions = []
-        if category_id:
-            cur.execute("""
-                SELECT grq.question_id, q.text, qc.id as choice_id, qc.choice_text
-                FROM game_round_questions grq
-                JOIN questions q ON grq.question_id = q.id
-                JOIN question_choices qc ON q.id = qc.question_id
-                WHERE grq.game_round_id = %s
-                ORDER BY grq.question_id, qc.id
-            """, (round_id,))
-            
-            question_map = {}
-            for row in cur.fetchall():
-                qid = row['question_id']
-                if qid not in question_map:
-                    question_map[qid] = {'question_id': qid, 'text': row['text'], 'choices': []}
-                question_map[qid]['choices'].append({'choice_id': row['choice_id'], 'choice_text': row['choice_text']})
-            questions = list(question_map.values())
-
-        current_round_data = {
-            "round_number": active_round['round_number'],
-            "status": active_round['status'],
-            "category_id": category_id,
-            "category_picker_id": active_round['category_picker_id'],
-            "category_options": category_options,
-            "questions": questions,
-            "time_limit_seconds": 1000
-        }
-        
-
+        current_round_data = round_state(cur, active_round)
 
     cur.close()
 
@@ -133,117 +228,47 @@ def enqueue_for_duel():
     conn = get_db()
     cur = conn.cursor()
 
-    # 1. Check if user exists
-    cur.execute("SELECT 1 FROM users WHERE id = %s", (user_id,))
-    if not cur.fetchone():
-        cur.close()
+    # 1. Check that the user and the game type exist (one round trip)
+    cur.execute("""
+        SELECT EXISTS (SELECT 1 FROM users WHERE id = %s) AS user_exists,
+               EXISTS (SELECT 1 FROM game_types WHERE id = %s) AS game_type_exists
+    """, (user_id, game_type_id))
+    checks = cur.fetchone()
+    cur.close()
+    if not checks['user_exists']:
         return jsonify({"error": f"User {user_id} not found"}), 404
-
-    # 2. Check game type
-    cur.execute("SELECT total_rounds FROM game_types WHERE id = %s", (game_type_id,))
-    gt = cur.fetchone()
-    if not gt:
-        cur.close()
+    if not checks['game_type_exists']:
         return jsonify({"error": f"GameType {game_type_id} not found"}), 404
 
-    # 3. Check if user is already in queue
-    cur.execute("SELECT 1 FROM match_queue WHERE user_id = %s AND game_type_id = %s", (user_id, game_type_id))
-    if cur.fetchone():
-        cur.close()
-        return jsonify({"error": "User already in queue"}), 400
-
-    # 4. Insert into match queue
+    # 2. Join the queue and atomically claim the longest-waiting opponent, if any.
+    #    A match creates the active game with both participants and all rounds; the picker alternates.
     try:
-        cur.execute("""
-            INSERT INTO match_queue (user_id, game_type_id)
-            VALUES (%s, %s)
-            RETURNING id, enqueued_at
-        """, (user_id, game_type_id))
-        queue_entry = cur.fetchone()
-        
-        conn.commit()
+        result = matchmaking.enqueue(
+            conn, user_id, game_type_id,
+            on_match=lambda tx, player_ids: create_game(tx, game_type_id, player_ids, 'alternate'),
+            # With the background matcher running, players are paired by rating on its next tick
+            claim=not current_app.config.get('MATCHMAKER_ENABLED')
+        )
+    except matchmaking.AlreadyQueued:
+        return jsonify({"error": "User already in queue"}), 400
     except psycopg2.Error as e:
-        conn.rollback()
-        cur.close()
-        return jsonify({"error": str(e)}), 400
-
-    # 5. Search for a match in the queue (another user with the same game_type_id)
-    cur.execute("""
-        SELECT id, user_id 
-        FROM match_queue 
-        WHERE game_type_id = %s AND user_id <> %s
-        ORDER BY enqueued_at ASC
-        LIMIT 1
-    """, (game_type_id, user_id))
-    match_row = cur.fetchone()
-    
-
-    if match_row:
-        other_queue_id, other_user_id = match_row['id'], match_row['user_id']
-        try:
-            # Create a new record in the games table
-            cur.execute("""
-                INSERT INTO games (game_type_id, status)
-                VALUES (%s, 'pending')
-                RETURNING id
-            """, (game_type_id,))
-            new_game_id = cur.fetchone()["id"]
-            
-            # Remove both users from the queue
-            cur.execute(
-                "DELETE FROM match_queue WHERE id IN (%s, %s)",
-                (queue_entry["id"], other_queue_id)
-            )
-            
-
-            # Insert into game_participants
-            cur.execute("""
-                INSERT INTO game_participants (game_id, user_id)
-                VALUES (%s, %s), (%s, %s)
-            """, (new_game_id, user_id, new_game_id, other_user_id))
-
-            # Create rounds and activate the game
-            cur.execute("SELECT total_rounds FROM game_types WHERE id = %s", (game_type_id,))
-            total_rounds = cur.fetchone()['total_rounds']
-            
-            player_ids = [user_id, other_user_id]
-            picker_id = random.choice(player_ids) # Randomly choose the first picker
-
-            for r in range(1, total_rounds + 1):
-                cur.execute("""
-                    INSERT INTO game_rounds 
-                      (game_id, round_number, category_id, category_picker_id, status, time_limit_seconds, points_possible)
-                    VALUES 
-                      (%s, %s, NULL, %s, 'pending', 1000, 100)
-                """, (new_game_id, r, picker_id))
-                # Switch picker for the next round
-                picker_id = player_ids[0] if picker_id == player_ids[1] else player_ids[1]
-
-            # Change game status to active and set the start_time
-            cur.execute("""
-                UPDATE games
-                SET status = 'active', start_time = NOW()
-                WHERE id = %s
-            """, (new_game_id,))
-
-            conn.commit()
-        except psycopg2.Error as e:
-            conn.rollback()
-            cur.close()
-            return jsonify({"error": str(e)}), 500
+        return jsonify({"error": str(e)}), 500
 
-        cur.close()
+    if result.match:
+        game_state = result.match
+        round_timer.games_changed(conn, [game_state['game']['id']])
+        notify_game_created(socketio, MATCH_FOUND, game_state)
         return jsonify({
             "message": "Matched and game created",
-            "game_id": new_game_id,
-            "players": [user_id, other_user_id]
+            "game_id": game_state['game']['id'],
+            "players": [user_id, result.opponent_id],
+            "game_state": game_state
         }), 201
 
-    cur.close()
     return jsonify({
         "message": "Enqueued for matching",
-        "queue_id": queue_entry["id"],
-        "enqueued_at": queue_entry["enqueued_at"].isoformat()
+        "queue_id": result.queue_entry["id"],
+        "enqueued_at": result.queue_entry["enqueued_at"].isoformat()
     }), 200
 
 
@@ -365,69 +390,29 @@ def respond_to_invitation():
 
     # action == "accept"
     try:
-        # Change invitation status to 'accepted'
-        cur.execute("""
-            UPDATE game_invitations
-            SET status = 'accepted'
-            WHERE id = %s
-        """, (inv_id,))
-
-        # Create a duel game (assuming game_type_id = 1 for duel)
-        cur.execute("""
-            INSERT INTO games (game_type_id, status)
-            VALUES (1, 'pending')
-            RETURNING id
-        """)
-        new_game_id = cur.fetchone()['id']
-
-        # Insert both participants
-        cur.execute("""
-            INSERT INTO game_participants (game_id, user_id)
-            VALUES (%s, %s), (%s, %s)
-        """, (new_game_id, inviter_id_db, new_game_id, invitee_id_db))
-
-        # Update the game_id in the invitation
-        cur.execute("""
-            UPDATE game_invitations
-            SET game_id = %s
-            WHERE id = %s
-        """, (new_game_id, inv_id))
-
-        # Create rounds and activate the game
-        cur.execute("SELECT total_rounds FROM game_types WHERE id = %s", (1,))
-        total_rounds = cur.fetchone()['total_rounds']
-        
-        player_ids = [inviter_id_db, invitee_id_db]
-        picker_id = random.choice(player_ids) # Randomly choose the first picker
-
-        for r in range(1, total_rounds + 1):
-            cur.execute("""
-                INSERT INTO game_rounds 
-                  (game_id, round_number, category_id, category_picker_id, status, time_limit_seconds, points_possible)
-                VALUES 
-                  (%s, %s, NULL, %s, 'pending', 1000, 100)
-            """, (new_game_id, r, picker_id))
-            # Switch picker for the next round
-            picker_id = player_ids[0] if picker_id == player_ids[1] else player_ids[1]
-
-        # Change game status to active and set start_time
-        cur.execute("""
-            UPDATE games
-            SET status = 'active', start_time = NOW()
-            WHERE id = %s
-        """, (new_game_id,))
-
-        conn.commit()
+        with transaction(conn) as tx:
+            # Create an active duel game (assuming game_type_id = 1 for duel) with its rounds
+            game_state = create_game(tx, 1, [inviter_id_db, invitee_id_db], 'alternate')
+            new_game_id = game_state['game']['id']
+
+            # Accept the invitation and link it to the game
+            tx.execute("""
+                UPDATE game_invitations
+                SET status = 'accepted', game_id = %s
+                WHERE id = %s
+            """, (new_game_id, inv_id))
     except psycopg2.Error as e:
-        conn.rollback()
         cur.close()
         return jsonify({"error": str(e)}), 500
 
     cur.close()
+    round_timer.games_changed(conn, [new_game_id])
+    notify_game_created(socketio, GAME_STARTED, game_state)
     return jsonify({
         "message": "Invitation accepted, game created",
         "game_id": new_game_id,
-        "players": [inviter_id_db, invitee_id_db]
+        "players": [inviter_id_db, invitee_id_db],
+        "game_state": game_state
     }), 201
 
 
@@ -456,29 +441,28 @@ def start_duel_game(game_id):
     total_rounds = total_rounds_row['total_rounds']
 
     try:
-        # 3. Change status to active and set start_time
-        cur.execute("""
-            UPDATE games
-            SET status = 'active', start_time = NOW()
-            WHERE id = %s
-        """, (game_id,))
-
-        # 4. Create empty rounds with category_id = NULL
-        for r in range(1, total_rounds + 1):
-            cur.execute("""
-                INSERT INTO game_rounds 
-                  (game_id, round_number, category_id, category_picker_id, status, time_limit_seconds, points_possible)
-                VALUES 
-                  (%s, %s, NULL, NULL, 'pending', 1000, 100)
-            """, (game_id, r))
-
-        conn.commit()
+        with transaction(conn) as tx:
+            # 3. Change status to active and set start_time
+            tx.execute("""
+                UPDATE games
+                SET status = 'active', start_time = NOW(), state_version = state_version + 1
+                WHERE id = %s
+                RETURNING state_version
+            """, (game_id,))
+            version = tx.fetchone()['state_version']
+
+            # 4. Create empty rounds with category_id = NULL
+            rows = _round_rows(game_id, total_rounds, current_app.config['ROUND_TIME_LIMIT_SECONDS'])
+            rounds = insert_many(tx, 'game_rounds', ROUND_COLUMNS, rows, returning=(
+                'id, round_number, status, category_id, category_picker_id, category_options, time_limit_seconds'
+            ))
+            first_round = round_state(tx, min(rounds, key=lambda r: r['round_number'])) if rounds else None
     except psycopg2.Error as e:
-        conn.rollback()
         cur.close()
         return jsonify({"error": str(e)}), 500
 
     cur.close()
+    send_game_update(socketio, game_id, version, [status_op('active'), round_op(first_round)])
     return jsonify({
         "message": "Game started",
         "game_id": game_id,
@@ -491,65 +475,70 @@ def pick_category_for_round(game_id, round_number):
     data = request.get_json() or {}
     user_id = data.get("user_id")
     category_id = data.get("category_id")
+    difficulty = data.get("difficulty")  # optional: only questions of this difficulty
     if not user_id or not category_id:
         return jsonify({"error": "Missing user_id or category_id"}), 400
+    if difficulty is not None and difficulty not in DIFFICULTIES:
+        return jsonify({"error": f"Invalid difficulty {difficulty}"}), 400
 
     conn = get_db()
-    cur = conn.cursor()
-
-    # 1. Check for game existence and active status
-    cur.execute("SELECT status FROM games WHERE id = %s", (game_id,))
-    row = cur.fetchone()
-    if not row or row['status'] != 'active':
-        cur.close(); return jsonify({"error": "Game not found or not active"}), 404
-
-    # 2. Check if user_id is a participant of the game
-    cur.execute("SELECT 1 FROM game_participants WHERE game_id = %s AND user_id = %s", (game_id, user_id))
-    if not cur.fetchone():
-        cur.close(); return jsonify({"error": "User not a participant"}), 403
-
-    # 3. Check for round existence and empty category_id
-    cur.execute("SELECT id, category_id, status, category_picker_id FROM game_rounds WHERE game_id = %s AND round_number = %s", (game_id, round_number))
-    rnd = cur.fetchone()
-    if not rnd:
-        cur.close(); return jsonify({"error": "Round not found"}), 404
-    round_id_db, category_id_db, picker_id_db = rnd['id'], rnd['category_id'], rnd['category_picker_id']
-    
-    # Check if it's the user's turn to pick
-    if picker_id_db != user_id:
-        cur.close(); return jsonify({"error": "Not your turn to pick"}), 403
-        
-    if category_id_db is not None:
-        cur.close(); return jsonify({"error": "Category already picked"}), 400
-
-    # 4. Check for a valid category
-    cur.execute("SELECT 1 FROM categories WHERE id = %s", (category_id,))
-    if not cur.fetchone():
-        cur.close(); return jsonify({"error": "Category not found"}), 404
-
     try:
-        # 5. Update the category and round status
-        cur.execute("UPDATE game_rounds SET category_id = %s, status = 'active', start_time = NOW() WHERE id = %s", (category_id, round_id_db))
-        
-        cur.execute("SELECT id FROM questions WHERE category_id = %s AND is_verified = TRUE ORDER BY RANDOM() LIMIT 3", (category_id,))
-        questions_sample = cur.fetchall()
-        question_ids = [q['id'] for q in questions_sample]
-
-        for qid in question_ids:
-            cur.execute("INSERT INTO game_round_questions (game_round_id, question_id) VALUES (%s, %s)", (round_id_db, qid))
-
-        conn.commit()
-
-        # Emit update to all clients in the game room
-        game_state = get_full_game_state_data(game_id)
-        room_name = f'game_{game_id}'
-
-        socketio.emit('game_update', game_state, room=room_name)
-
+        with transaction(conn) as tx:
+            # 1. Lock the game row first (app/game_engine.py): a concurrent pick of
+            #    the same round waits here and then sees the category already set
+            game = game_engine.lock_game(tx, game_id)
+            if not game or game['status'] != 'active':
+                return jsonify({"error": "Game not found or not active"}), 404
+
+            # 2. Check if user_id is a participant of the game
+            execute_prepared(tx, IS_PARTICIPANT, (game_id, user_id))
+            if not tx.fetchone():
+                return jsonify({"error": "User not a participant"}), 403
+
+            # 3. Check for round existence and empty category_id
+            execute_prepared(tx, PICK_ROUND, (game_id, round_number))
+            rnd = tx.fetchone()
+            if not rnd:
+                return jsonify({"error": "Round not found"}), 404
+            round_id_db, category_id_db, picker_id_db = rnd['id'], rnd['category_id'], rnd['category_picker_id']
+            offered = rnd['category_options']
+
+            # Check if it's the user's turn to pick
+            if picker_id_db != user_id:
+                return jsonify({"error": "Not your turn to pick"}), 403
+
+            if category_id_db is not None:
+                return jsonify({"error": "Category already picked"}), 400
+
+            # 4. Check for a valid category
+            execute_prepared(tx, CATEGORY_EXISTS, (category_id,))
+            if not tx.fetchone():
+                return jsonify({"error": "Category not found"}), 404
+
+            # Only one of the categories offered when the round was created (rounds without an offer accept any)
+            if offered and category_id not in offered:
+                return jsonify({"error": "Category not offered for this round"}), 400
+
+            # 5. Update the category and round status; only a round without a category is picked
+            execute_prepared(tx, PICK_SET_CATEGORY, (category_id, round_id_db))
+            if tx.fetchone() is None:
+                return jsonify({"error": "Category already picked"}), 400
+
+            question_ids = sample_questions(tx, category_id, 3, difficulty)
+            insert_many(tx, 'game_round_questions', ('game_round_id', 'question_id'),
+                        [(round_id_db, qid) for qid in question_ids])
+            version = bump_state_version(tx, game_id)
+            picked_round = round_state(tx, {
+                'id': round_id_db, 'round_number': round_number, 'status': 'active',
+                'category_id': category_id, 'category_picker_id': picker_id_db,
+                'time_limit_seconds': rnd['time_limit_seconds']
+            })
     except psycopg2.Error as e:
-        conn.rollback(); cur.close(); return jsonify({"error": str(e)}), 500
+        return jsonify({"error": str(e)}), 500
 
-    cur.close()
+    round_timer.round_activated(round_id_db, game_id, round_number, rnd['time_limit_seconds'])
+    # Only the picked round goes to the game room, not the whole game state
+    send_game_update(socketio, game_id, version, [round_op(picked_round)])
     return jsonify({"message": "Category picked"}), 200
 
 
@@ -564,341 +553,97 @@ def submit_answer(game_id, round_number):
 
     conn = get_db()
     cur = conn.cursor()
+    ingest = answer_ingest.get_ingest()
 
-    # 1. Check game status
-    cur.execute("SELECT status FROM games WHERE id = %s", (game_id,))
-    row_game = cur.fetchone()
-    if not row_game:
-        cur.close()
-        return jsonify({"error": "Game not found"}), 404
-    if row_game['status'] != 'active':
-        cur.close()
-        return jsonify({"error": "Game is not active"}), 400
-
-    # 2. Check round status and get points_possible and time_limit
-    cur.execute("""
-        SELECT id, points_possible, start_time, time_limit_seconds 
-        FROM game_rounds 
-        WHERE game_id = %s AND round_number = %s
-    """, (game_id, round_number))
-    row_rnd = cur.fetchone()
-    if not row_rnd:
-        cur.close()
-        return jsonify({"error": "Round not found"}), 404
-    round_id_db, points_possible, round_start, time_limit_seconds = row_rnd['id'], row_rnd['points_possible'], row_rnd['start_time'], row_rnd['time_limit_seconds']
-
-    # Check if the round is active
-    cur.execute("SELECT status FROM game_rounds WHERE id = %s", (round_id_db,))
-    if cur.fetchone()['status'] != 'active':
-        cur.close()
-        return jsonify({"error": "Round is not active"}), 400
-
-
-    # 3. Check for time expiration
-    if time_limit_seconds is not None and round_start is not None:
-        grace_period = 5  # 5-second grace period for API calls / client-side lag
-        elapsed = (datetime.now() - round_start).total_seconds()
-        if elapsed > (time_limit_seconds + grace_period):
-            cur.close()
-            return jsonify({"error": "Time limit exceeded"}), 400
-
-    # 4. Check if user_id is an active participant
-    cur.execute("""
-        SELECT 1 
-        FROM game_participants 
-        WHERE game_id = %s AND user_id = %s AND status = 'active'
-    """, (game_id, user_id))
-    if not cur.fetchone():
-        cur.close()
-        return jsonify({"error": "User not active participant"}), 403
-
-    # 5. Find game_round_question_id
-    cur.execute("""
-        SELECT grq.id 
-        FROM game_round_questions grq
-        JOIN game_rounds gr ON grq.game_round_id = gr.id
-        WHERE gr.game_id = %s AND gr.round_number = %s AND grq.question_id = %s
-    """, (game_id, round_number, question_id))
-    grq_row = cur.fetchone()
-    if not grq_row:
-        cur.close()
-        return jsonify({"error": "Question not found in this round"}), 400
-    game_round_question_id = grq_row['id']
-
-    # 6. Check for duplicate answer submission
-    cur.execute("""
-        SELECT 1 
-        FROM round_answers 
-        WHERE game_round_question_id = %s AND user_id = %s
-    """, (game_round_question_id, user_id))
-    if cur.fetchone():
-        cur.close()
-        return jsonify({"error": "Already answered"}), 400
-
-    # 7. Validate choice_id and determine is_correct
-    cur.execute("""
-        SELECT is_correct 
-        FROM question_choices 
-        WHERE id = %s AND question_id = %s
-    """, (choice_id, question_id))
-    choice_row = cur.fetchone()
-    if not choice_row:
-        cur.close()
-        return jsonify({"error": "Invalid choice for this question"}), 400
-    is_correct = choice_row['is_correct']
-    points = points_possible if is_correct else 0
-
-    # 7.1. Get correct choice ID, regardless of the user's answer
-    cur.execute("""
-        SELECT id FROM question_choices
-        WHERE question_id = %s AND is_correct = TRUE
-        LIMIT 1
-    """, (question_id,))
-    correct_choice_row = cur.fetchone()
-    # This should always find a correct answer if the question is well-formed
-    correct_choice_id = correct_choice_row['id'] if correct_choice_row else None
-
-
-    # 8. Insert into round_answers and update participant's score
     try:
-        cur.execute("""
-            INSERT INTO round_answers 
-              (game_round_question_id, user_id, choice_id, is_correct, points_earned, response_time_ms)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (
-            game_round_question_id,
-            user_id,
-            choice_id,
-            is_correct,
-            points,
-            data.get("response_time_ms", None)
-        ))
-
-        cur.execute("""
-            UPDATE game_participants
-            SET score = score + %s
-            WHERE game_id = %s AND user_id = %s
-        """, (points, game_id, user_id))
-
-        conn.commit()
-    except psycopg2.Error as e:
+        if ingest is not None:
+            # Write-behind: validated in memory and logged locally; the flusher writes batches
+            result = ingest.submit(cur, game_id, round_number, user_id, question_id, choice_id,
+                                   data.get("response_time_ms", None), ANSWER_GRACE_SECONDS)
+        else:
+            # Validate, insert, score and bump the state version in one round trip (fn_submit_answer, migration 0009)
+            execute_prepared(cur, SUBMIT_ANSWER, (
+                game_id, round_number, user_id, question_id, choice_id,
+                data.get("response_time_ms", None), ANSWER_GRACE_SECONDS, datetime.now()
+            ))
+            result = cur.fetchone()['result']
+            conn.commit()
+    except (psycopg2.Error, OSError) as e:
         conn.rollback()
         cur.close()
         return jsonify({"error": str(e)}), 500
-
     cur.close()
+
+    if result['status'] != 'ok':
+        status_code, message = ANSWER_ERRORS[result['status']]
+        return jsonify({"error": message, "code": result['status']}), status_code
+
+    if ingest is None:
+        send_game_update(socketio, game_id, result['state_version'], [score_op(user_id, result['score'])])
     return jsonify({
         "message": "Answer recorded",
-        "is_correct": is_correct,
-        "points_earned": points,
-        "correct_choice_id": correct_choice_id
+        "is_correct": result['is_correct'],
+        "points_earned": result['points_earned'],
+        "correct_choice_id": result['correct_choice_id']
     }), 200
 
 
 @games_bp.route("/<int:game_id>/rounds/<int:round_number>/complete", methods=["POST"])
 def complete_round(game_id, round_number):
     conn = get_db()
-    cur = conn.cursor()
+    ingest = answer_ingest.get_ingest()
 
     try:
-        # 1. Find round ID and check status
-        cur.execute("""
-            SELECT id, status, category_id
-            FROM game_rounds 
-            WHERE game_id = %s AND round_number = %s
-        """, (game_id, round_number))
-        row = cur.fetchone()
-        if not row:
-            cur.close()
-            return jsonify({"error": "Round not found"}), 404
-        
-        round_id_db = row['id']
-        round_status = row['status']
-        category_id = row['category_id']
-        
-        # If the round is already completed, return a success message
-        if round_status == 'completed':
-            cur.close()
-            return jsonify({"message": f"Round {round_number} already completed"}), 200
-        
-        # Check that the round is active and a category has been selected
-        if round_status != 'active':
-            cur.close()
-            return jsonify({"error": f"Cannot complete round in status {round_status}"}), 400
-        
-        if not category_id:
-            cur.close()
-            return jsonify({"error": "Category not selected for this round"}), 400
-        
-        # 2. Count the number of participants and questions in this round
-        cur.execute("SELECT COUNT(*) FROM game_participants WHERE game_id = %s", (game_id,))
-        num_players = cur.fetchone()['count']
-
-        cur.execute("SELECT COUNT(*) FROM game_round_questions WHERE game_round_id = %s", (round_id_db,))
-        num_questions = cur.fetchone()['count']
-
-        expected_answers = num_players * num_questions
-
-        # 3. Count the answers
-        cur.execute("""
-            SELECT COUNT(*) 
-            FROM round_answers 
-            WHERE game_round_question_id IN (
-                SELECT id FROM game_round_questions WHERE game_round_id = %s
-            )
-        """, (round_id_db,))
-        answer_count = cur.fetchone()['count']
-
-
-        if answer_count < expected_answers:
-            cur.close()
-            return jsonify({"error": f"Not all answers submitted yet. Expected: {expected_answers}, Submitted: {answer_count}"}), 400
-             
-        # 4. Update the round status
-        cur.execute("""
-            UPDATE game_rounds
-            SET status = 'completed', end_time = NOW()
-            WHERE id = %s
-        """, (round_id_db,))
-        
-        # 5. Check if this is the last round
-        cur.execute("""
-            SELECT COUNT(*) as total_rounds
-            FROM game_rounds 
-            WHERE game_id = %s
-        """, (game_id,))
-        total_rounds = cur.fetchone()['total_rounds']
-        
-        if round_number < total_rounds:
-            # Activate the next round if it exists
-            cur.execute("""
-                SELECT id, round_number 
-                FROM game_rounds 
-                WHERE game_id = %s AND round_number = %s AND status = 'pending'
-            """, (game_id, round_number + 1))
-            next_round = cur.fetchone()
-            
-            if next_round:
-
-                # Activate the next round with 'pending' status for category selection
-                cur.execute("""
-                    UPDATE game_rounds
-                    SET status = 'pending', start_time = NOW()
-                    WHERE id = %s
-                """, (next_round['id'],))
-            else:
-                # Check what rounds exist
-                cur.execute("SELECT round_number, status FROM game_rounds WHERE game_id = %s ORDER BY round_number", (game_id,))
-                all_rounds = cur.fetchall()
-        else:
-            print(f"This was the last round ({round_number}/{total_rounds}), game should be completed")
-        
-        conn.commit()
-        
-        # Emit update to all clients in the game room
-        game_state = get_full_game_state_data(game_id)
-        room_name = f'game_{game_id}'
-        socketio.emit('game_update', game_state, room=room_name)
-        
+        if ingest is not None:
+            # Answers still in this worker's write-behind log count towards the round
+            ingest.flush()
+
+        # Complete the round and open the next one, or finish the game after the
+        # last round, under the game's row lock (app/game_engine.py)
+        transition = run_in_transaction(
+            lambda cur: game_engine.complete_round(cur, game_id, round_number), conn=conn
+        )
+    except TransitionError as e:
+        return _transition_error(ROUND_ERRORS, e)
     except psycopg2.Error as e:
-        conn.rollback()
-        cur.close()
         return jsonify({"error": str(e)}), 500
     except Exception as e:
-        conn.rollback()
-        cur.close()
         return jsonify({"error": "Internal server error"}), 500
 
-    cur.close()
-    return jsonify({"message": f"Round {round_number} completed"}), 200
+    # A concurrent /complete (or the round timer) got there first
+    if transition.version is None:
+        return jsonify({"message": f"Round {round_number} already completed"}), 200
+
+    round_timer.round_completed(transition.round_id)
+    if transition.winner_id is None:
+        # The pick deadline of the round it opened
+        round_timer.games_changed(conn, [game_id])
+    if ingest is not None:
+        ingest.forget_round(game_id, round_number)
+    send_game_update(socketio, game_id, transition.version, transition.ops)
+    return jsonify({
+        "message": f"Round {round_number} completed",
+        "game_completed": transition.winner_id is not None
+    }), 200
 
 
 @games_bp.route("/<int:game_id>/complete", methods=["POST"])
 def complete_duel_game(game_id):
-    conn = get_db()
-    cur = conn.cursor()
-
-    # 1. Check for game existence and active status
-    cur.execute("SELECT status FROM games WHERE id = %s", (game_id,))
-    row = cur.fetchone()
-    if not row:
-        cur.close()
-        return jsonify({"error": "Game not found"}), 404
-    if row['status'] != 'active':
-        cur.close()
-        return jsonify({"error": f"Cannot complete game in status {row['status']}"}), 400
-
-    # 2. Check if all rounds have been completed
-    cur.execute("""
-        SELECT COUNT(*) 
-        FROM game_rounds 
-        WHERE game_id = %s AND status <> 'completed'
-    """, (game_id,))
-    pending = cur.fetchone()['count']
-    if pending > 0:
-        cur.close()
-        return jsonify({"error": "Pending rounds remain"}), 400
-
-    # 3. Find the user with the highest score
-    cur.execute("""
-        SELECT user_id, score 
-        FROM game_participants 
-        WHERE game_id = %s
-        ORDER BY score DESC, join_time ASC
-        LIMIT 1
-    """, (game_id,))
-    winner_row = cur.fetchone()
-    if not winner_row:
-        cur.close()
-        return jsonify({"error": "No participants found"}), 400
-    winner_id, winner_score = winner_row['user_id'], winner_row['score']
-    
-    # 4. Update the games table
+    # Usually already done by the completion of the last round; then this returns the result
     try:
-        cur.execute("""
-            UPDATE games
-            SET status = 'completed', end_time = NOW(), winner_id = %s
-            WHERE id = %s
-            RETURNING id, winner_id
-        """, (winner_id, game_id))
-        result = cur.fetchone()
-        
-        # --- XP LOGIC: Update XP for all participants ---
-        cur.execute("SELECT user_id, score FROM game_participants WHERE game_id = %s", (game_id,))
-        participants = cur.fetchall()
-        for p in participants:
-            user_id = p['user_id']
-            score = p['score']
-            bonus = 0
-            if user_id == winner_id:
-                bonus = int(score * 0.2)  # 20% XP bonus for winner
-            xp_earned = score + bonus
-            cur.execute("""
-                UPDATE users
-                SET total_xp = COALESCE(total_xp, 0) + %s
-                WHERE id = %s
-            """, (xp_earned, user_id))
-        # --- END XP LOGIC ---
-        
-        conn.commit()
-        
-        # Emit final update
-        game_state = get_full_game_state_data(game_id)
-        room_name = f'game_{game_id}'
-
-        socketio.emit('game_update', game_state, room=room_name)
-
+        transition = run_in_transaction(lambda cur: game_engine.complete_game(cur, game_id), conn=get_db())
+    except TransitionError as e:
+        return _transition_error(GAME_ERRORS, e)
     except psycopg2.Error as e:
-        conn.rollback()
-        cur.close()
         return jsonify({"error": str(e)}), 500
 
-    cur.close()
+    if transition.version is not None:
+        send_game_update(socketio, game_id, transition.version, transition.ops)
     return jsonify({
         "message": "Game completed",
-        "game_id": result['id'],
-        "winner_id": result['winner_id'],
-        "winner_score": winner_score
+        "game_id": game_id,
+        "winner_id": transition.winner_id,
+        "winner_score": transition.winner_score
     }), 200
 
 
@@ -915,65 +660,35 @@ def create_group_game():
     conn = get_db()
     cur = conn.cursor()
 
-    # 1. Check for existence of creator_id and each participant_id
-    cur.execute("SELECT 1 FROM users WHERE id = %s", (creator_id,))
-    if not cur.fetchone():
-        cur.close()
-        return jsonify({"error": f"User {creator_id} not found"}), 404
-
-    for pid in participant_ids:
-        cur.execute("SELECT 1 FROM users WHERE id = %s", (pid,))
-        if not cur.fetchone():
+    # 1. Check for existence of creator_id and each participant_id (one query for all of them)
+    cur.execute("SELECT id FROM users WHERE id = ANY(%s)", ([creator_id] + participant_ids,))
+    existing_ids = {row['id'] for row in cur.fetchall()}
+    for uid in [creator_id] + participant_ids:
+        if uid not in existing_ids:
             cur.close()
-            return jsonify({"error": f"User {pid} not found"}), 404
+            return jsonify({"error": f"User {uid} not found"}), 404
 
     # 2. Create the group game
     try:
-        cur.execute("""
-            INSERT INTO games (game_type_id, status)
-            VALUES (%s, 'pending')
-            RETURNING id
-        """, (game_type_id,))
-        new_game_id = cur.fetchone()['id']
-
-        # 3. Insert participants
-        for pid in participant_ids:
-            cur.execute("""
-                INSERT INTO game_participants (game_id, user_id)
-                VALUES (%s, %s)
-            """, (new_game_id, pid))
-
-        # 4. Get number of rounds from game_types
-        cur.execute("SELECT total_rounds FROM game_types WHERE id = %s", (game_type_id,))
-        total_rounds = cur.fetchone()['total_rounds']
-
-        # 5. Create each round with category_id = NULL
-        for r in range(1, total_rounds + 1):
-            cur.execute("""
-                INSERT INTO game_rounds 
-                  (game_id, round_number, category_id, category_picker_id, status, time_limit_seconds, points_possible)
-                VALUES (%s, %s, NULL, NULL, 'pending', 1000, 100)
-            """, (new_game_id, r))
-
-        # 6. Change game status to active and set start_time
-        cur.execute("""
-            UPDATE games
-            SET status = 'active', start_time = NOW()
-            WHERE id = %s
-        """, (new_game_id,))
-
-        conn.commit()
+        # Game, participants and rounds (category_id = NULL, no picker) in one call
+        with transaction(conn) as tx:
+            # Finishing a group game does not change ratings
+            game_state = create_game(tx, game_type_id, participant_ids, rated=False)
+    except psycopg2.errors.NoDataFound:
+        cur.close()
+        return jsonify({"error": f"GameType {game_type_id} not found"}), 404
     except psycopg2.Error as e:
-        conn.rollback()
         cur.close()
         return jsonify({"error": str(e)}), 500
 
     cur.close()
+    notify_game_created(socketio, GAME_STARTED, game_state)
     return jsonify({
         "message": "Group game created and started",
-        "game_id": new_game_id,
+        "game_id": game_state['game']['id'],
         "participant_ids": participant_ids,
-        "total_rounds": total_rounds
+        "total_rounds": game_state['total_rounds'],
+        "game_state": game_state
     }), 201
 
 
@@ -1007,6 +722,14 @@ def assign_categories_group(game_id):
 
     assigned = []
     try:
+        # Game row first, like every game transition (app/game_engine.py)
+        game_engine.lock_game(cur, game_id)
+        # Assigned once: a second call would add questions to rounds that already have a category
+        cur.execute("SELECT 1 FROM game_rounds WHERE game_id = %s AND category_id IS NOT NULL LIMIT 1", (game_id,))
+        if cur.fetchone():
+            conn.rollback()
+            cur.close()
+            return jsonify({"error": "Categories already assigned"}), 400
         for r in range(1, total_rounds + 1):
             chosen_cat = random.choice(category_ids)
 
@@ -1015,22 +738,16 @@ def assign_categories_group(game_id):
                 UPDATE game_rounds
                 SET category_id = %s, category_picker_id = NULL, status = 'active', start_time = NOW()
                 WHERE game_id = %s AND round_number = %s
-                RETURNING id
+                RETURNING id, time_limit_seconds
             """, (chosen_cat, game_id, r))
-            round_id_db = cur.fetchone()['id']
+            round_row = cur.fetchone()
+            round_id_db = round_row['id']
 
             # 5. Select one random question from that category
-            cur.execute("""
-                SELECT id 
-                FROM questions 
-                WHERE category_id = %s AND is_verified = TRUE
-                ORDER BY RANDOM()
-                LIMIT 1
-            """, (chosen_cat,))
-            q_row = cur.fetchone()
-            if not q_row:
+            sampled = sample_questions(cur, chosen_cat, 1)
+            if not sampled:
                 raise Exception(f"No verified questions in category {chosen_cat}")
-            question_id = q_row['id']
+            question_id = sampled[0]
 
             # Insert into game_round_questions
             cur.execute("""
@@ -1042,9 +759,20 @@ def assign_categories_group(game_id):
                 "round_number": r,
                 "round_id": round_id_db,
                 "category_id": chosen_cat,
-                "question_id": question_id
+                "question_id": question_id,
+                "time_limit_seconds": round_row['time_limit_seconds']
             })
 
+        version = bump_state_version(cur, game_id)
+        # Every round is active now; the first one is the current round
+        first_round = None
+        if assigned:
+            first = assigned[0]
+            first_round = round_state(cur, {
+                'id': first['round_id'], 'round_number': first['round_number'], 'status': 'active',
+                'category_id': first['category_id'], 'category_picker_id': None,
+                'time_limit_seconds': first['time_limit_seconds']
+            })
         conn.commit()
     except Exception as e:
         conn.rollback()
@@ -1052,6 +780,9 @@ def assign_categories_group(game_id):
         return jsonify({"error": str(e)}), 500
 
     cur.close()
+    for a in assigned:
+        round_timer.round_activated(a['round_id'], game_id, a['round_number'], a['time_limit_seconds'])
+    send_game_update(socketio, game_id, version, [round_op(first_round)])
     return jsonify({
         "message": "Categories and questions assigned for all rounds",
         "assigned_rounds": assigned
@@ -1060,91 +791,33 @@ def assign_categories_group(game_id):
 
 @games_bp.route("/<int:game_id>/complete_group", methods=["POST"])
 def complete_group_game(game_id):
-    conn = get_db()
-    cur = conn.cursor()
-
-    # 1. Check for game existence and active status
-    cur.execute("SELECT status FROM games WHERE id = %s", (game_id,))
-    row = cur.fetchone()
-    if not row:
-        cur.close()
-        return jsonify({"error": "Game not found"}), 404
-    if row['status'] != 'active':
-        cur.close()
-        return jsonify({"error": f"Cannot complete game in status {row['status']}"}), 400
-
-    # 2. Check if all rounds are completed
-    cur.execute("""
-        SELECT COUNT(*) 
-        FROM game_rounds 
-        WHERE game_id = %s AND status <> 'completed'
-    """, (game_id,))
-    incomplete_rounds = cur.fetchone()['count']
-    if incomplete_rounds > 0:
-        cur.close()
-        return jsonify({"error": "Not all rounds completed"}), 400
-
-    # 3. Find the participant with the highest score
-    cur.execute("""
-        SELECT user_id, score 
-        FROM game_participants 
-        WHERE game_id = %s
-        ORDER BY score DESC
-        LIMIT 1
-    """, (game_id,))
-    winner_row = cur.fetchone()
-    if not winner_row:
-        cur.close()
-        return jsonify({"error": "No participants found"}), 400
-    winner_id, winner_score = winner_row['user_id'], winner_row['score']
-
-    # 4. Update the games table
+    # Group games are not rated; usually already finished with their last round
     try:
-        cur.execute("""
-            UPDATE games
-            SET status = 'completed', end_time = NOW(), winner_id = %s
-            WHERE id = %s
-            RETURNING id, winner_id
-        """, (winner_id, game_id))
-        result = cur.fetchone()
-        # --- XP LOGIC: Update XP for all participants ---
-        cur.execute("SELECT user_id, score FROM game_participants WHERE game_id = %s", (game_id,))
-        participants = cur.fetchall()
-        for p in participants:
-            user_id = p['user_id']
-            score = p['score']
-            bonus = 0
-            if user_id == winner_id:
-                bonus = int(score * 0.2)  # 20% XP bonus for winner
-            xp_earned = score + bonus
-            cur.execute("""
-                UPDATE users
-                SET total_xp = COALESCE(total_xp, 0) + %s
-                WHERE id = %s
-            """, (xp_earned, user_id))
-        # --- END XP LOGIC ---
-        conn.commit()
+        transition = run_in_transaction(
+            lambda cur: game_engine.complete_game(cur, game_id, rated=False), conn=get_db()
+        )
+    except TransitionError as e:
+        return _transition_error(GROUP_GAME_ERRORS, e)
     except psycopg2.Error as e:
-        conn.rollback()
-        cur.close()
         return jsonify({"error": str(e)}), 500
 
-    cur.close()
+    if transition.version is not None:
+        send_game_update(socketio, game_id, transition.version, transition.ops)
     return jsonify({
         "message": "Group game completed",
-        "game_id": result['id'],
-        "winner_id": result['winner_id'],
-        "winner_score": winner_score
+        "game_id": game_id,
+        "winner_id": transition.winner_id,
+        "winner_score": transition.winner_score
     }), 200
 
 
 @games_bp.route("/<int:game_id>/state", methods=["GET"])
 def get_game_state(game_id):
-    user_id = request.args.get("user_id", type=int)
-    state = get_full_game_state_data(game_id, user_id)
-    if not state:
+    entry = get_game_state_entry(game_id)
+    if not entry:
         return jsonify({"error": "Game not found"}), 404
-    return jsonify(state)
+    # Serialized once per state version and shared by every reader
+    return current_app.response_class(entry.payload + b"\n", mimetype="application/json")
 
 
 @games_bp.route("/queue/status", methods=["GET"])
@@ -1169,13 +842,7 @@ def queue_status():
         }), 200
 
     # Check if user has been matched and a game is created (pending or active)
-    cur.execute("""
-        SELECT g.id as game_id, g.status
-        FROM games g
-        JOIN game_participants gp ON gp.game_id = g.id
-        WHERE gp.user_id = %s AND g.game_type_id = %s AND g.status IN ('pending', 'active')
-        ORDER BY g.id DESC LIMIT 1
-    """, (user_id, game_type_id))
+    execute_prepared(cur, ACTIVE_GAME, (user_id, game_type_id))
     game_row = cur.fetchone()
     cur.close()
     if game_row:
@@ -1186,3 +853,24 @@ def queue_status():
         }), 200
 
     return jsonify({"status": "not_found"}), 404
+
+
+@games_bp.route("/active", methods=["GET"])
+def active_game():
+    """The user's open (pending or active) game, for reconnects; optional game_type_id filter"""
+    user_id = request.args.get("user_id", type=int)
+    game_type_id = request.args.get("game_type_id", type=int)
+    if not user_id:
+        return jsonify({"error": "Missing user_id"}), 400
+
+    cur = get_db().cursor()
+    execute_prepared(cur, ACTIVE_GAME, (user_id, game_type_id))
+    game_row = cur.fetchone()
+    cur.close()
+    if not game_row:
+        return jsonify({"error": "No active game"}), 404
+    return jsonify({
+        "game_id": game_row["game_id"],
+        "game_type_id": game_row["game_type_id"],
+        "game_status": game_row["status"]
+    }), 200
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify, abort
-from app.db import get_db
+from app.db import get_db, read_only_blueprint
 
-leaderboards_bp = Blueprint("leaderboards", __name__, url_prefix="/leaderboards")
+leaderboards_bp = read_only_blueprint(Blueprint("leaderboards", __name__, url_prefix="/leaderboards"))
 
 
 
@@ -11,6 +11,8 @@ leaderboards_bp = Blueprint("leaderboards", __name__, url_prefix="/leaderboards"
 def list_leaderboards():
     """
     Return leaderboard entries, optionally filtered by scope and/or category_id.
+    Ranks are computed from the scores when reading (equal scores share a rank);
+    the top entries come from the score index, so the page's ranks are exact.
     Query Parameters (all optional):
       - scope:      one of 'alltime', 'weekly', 'monthly' (default: 'alltime')
       - category_id: integer ID of the category to filter by
@@ -48,15 +50,18 @@ def list_leaderboards():
                   u.avatar,
                   l.scope,
                   l.category_id,
-                  l.rank,
+                  RANK() OVER (ORDER BY l.score DESC) AS rank,
                   l.score,
                   l.generated_at
-                FROM leaderboards l
+                FROM (
+                  SELECT * FROM leaderboards
+                  WHERE scope = %s
+                    AND category_id = %s
+                  ORDER BY score DESC, user_id
+                  LIMIT %s
+                ) l
                 JOIN users u ON l.user_id = u.id
-                WHERE l.scope = %s
-                  AND l.category_id = %s
-                ORDER BY l.rank ASC
-                LIMIT %s;
+                ORDER BY l.score DESC, l.user_id;
                 """,
                 (scope, category_id, limit),
             )
@@ -71,14 +76,17 @@ def list_leaderboards():
                   u.avatar,
                   l.scope,
                   l.category_id,
-                  l.rank,
+                  RANK() OVER (ORDER BY l.score DESC) AS rank,
                   l.score,
                   l.generated_at
-                FROM leaderboards l
+                FROM (
+                  SELECT * FROM leaderboards
+                  WHERE scope = %s
+                  ORDER BY score DESC, user_id
+                  LIMIT %s
+                ) l
                 JOIN users u ON l.user_id = u.id
-                WHERE l.scope = %s
-                ORDER BY l.rank ASC
-                LIMIT %s;
+                ORDER BY l.score DESC, l.user_id;
                 """,
                 (scope, limit),
             )
@@ -95,6 +103,7 @@ def list_leaderboards():
 def get_user_leaderboards(user_id):
     """
     Return all leaderboard entries for a specific user, across all scopes.
+    Each rank is 1 + the number of entries of the same board with a higher score.
     Path Parameter:
       - user_id: integer ID of the user
     Response JSON: a list of objects with fields:
@@ -126,7 +135,16 @@ def get_user_leaderboards(user_id):
               u.avatar,
               l.scope,
               l.category_id,
-              l.rank,
+              1 + CASE
+                WHEN l.category_id IS NULL THEN (
+                  SELECT COUNT(*) FROM leaderboards o
+                  WHERE o.scope = l.scope AND o.category_id IS NULL AND o.score > l.score
+                )
+                ELSE (
+                  SELECT COUNT(*) FROM leaderboards o
+                  WHERE o.scope = l.scope AND o.category_id = l.category_id AND o.score > l.score
+                )
+              END AS rank,
               l.score,
               l.generated_at
             FROM leaderboards l
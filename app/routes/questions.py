@@ -1,19 +1,12 @@
-from decimal import Decimal
 from typing import Any, Dict, List, Optional
 from flask import Blueprint, request, jsonify, abort
 
 from app.db import query_db, modify_db
+from app.question_sampler import question_changed, question_deleted
 
 questions_bp = Blueprint('questions_bp', __name__, url_prefix='/questions')
 
 
-def _convert_decimal(row: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Convert Decimal values in a dict to floats for JSON serialization.
-    """
-    return {k: (float(v) if isinstance(v, Decimal) else v) for k, v in row.items()}
-
-
 def _build_update_clause(fields: Dict[str, Any], table: str, key: str) -> (str, List[Any]):
     """
     Build dynamic SQL UPDATE clause and parameters.
@@ -56,8 +49,7 @@ def list_questions() -> Any:
         f"FROM questions {where};"
     )
     questions = query_db(sql, tuple(params))
-    # Convert any Decimal fields
-    return jsonify([_convert_decimal(q) for q in questions]), 200
+    return jsonify(questions), 200
 
 
 @questions_bp.route('', methods=['POST'])
@@ -84,11 +76,12 @@ def create_question() -> Any:
         data['text'], data['category_id'], data['difficulty'], data.get('created_by')
     )
     try:
-        new_q = query_db(sql, params, one=True)
+        new_q = modify_db(sql, params)
     except Exception as e:
         abort(400, description=str(e))
 
-    return jsonify(_convert_decimal(new_q)), 201
+    question_changed(new_q)
+    return jsonify(new_q), 201
 
 
 @questions_bp.route('/<int:q_id>', methods=['GET'])
@@ -110,7 +103,6 @@ def get_question(q_id: int) -> Any:
     )
     choices = query_db(sql_c, (q_id,))
 
-    question = _convert_decimal(question)
     question['choices'] = choices
     return jsonify(question), 200
 
@@ -133,17 +125,18 @@ def update_question(q_id: int) -> Any:
     sql, params = _build_update_clause(fields, 'questions', 'id')
     params.append(q_id)
     try:
-        updated = query_db(
+        updated = modify_db(
             sql + ' RETURNING id, text, category_id, difficulty, is_verified, created_at, created_by',
-            tuple(params),
-            one=True
+            tuple(params)
         )
         if not updated:
             abort(404, description=f'Question {q_id} not found')
     except Exception as e:
         abort(400, description=str(e))
 
-    return jsonify(_convert_decimal(updated)), 200
+    # Committed by modify_db: verification, re-categorization and difficulty changes reach the question sampler
+    question_changed(updated)
+    return jsonify(updated), 200
 
 
 @questions_bp.route('/<int:q_id>', methods=['DELETE'])
@@ -154,13 +147,14 @@ def delete_question(q_id: int) -> Any:
     """
     sql = 'DELETE FROM questions WHERE id = %s RETURNING id'
     try:
-        deleted = query_db(sql, (q_id,), one=True)
+        deleted = modify_db(sql, (q_id,))
     except Exception as e:
         abort(400, description=str(e))
 
     if not deleted:
         abort(404, description=f'Question {q_id} not found')
 
+    question_deleted(deleted['id'])
     return jsonify({'deleted_id': deleted['id']}), 200
 
 
@@ -1,20 +1,11 @@
-from decimal import Decimal
 from typing import Any, Dict, List
 from flask import Blueprint, jsonify
 from datetime import datetime, date
 
-from ..db import get_db, query_db
+from ..db import get_db, query_db, read_only_blueprint
 
 # Blueprint for statistics-related endpoints
-stats_bp = Blueprint("stats", __name__, url_prefix="/stats")
-
-
-def _convert_decimal(row: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Convert Decimal fields in a row to float.
-    """
-    return {key: (float(value) if isinstance(value, Decimal) else value)
-            for key, value in row.items()}
+stats_bp = read_only_blueprint(Blueprint("stats", __name__, url_prefix="/stats"))
 
 
 @stats_bp.route("/top10-winrate", methods=["GET"])
@@ -44,7 +35,7 @@ def get_top10_winrate() -> Any:
     if not rows:
         return jsonify({"message": "No user statistics found."}), 404
 
-    result = [_convert_decimal(row) for row in rows]
+    result = rows
     
     return jsonify(result), 200
 
@@ -99,7 +90,7 @@ def get_user_winloss(user_id: int) -> Any:
     if not rows:
         return jsonify({"message": "User not found."}), 404
 
-    data = _convert_decimal(rows[0])
+    data = rows[0]
     return jsonify(data), 200
 
 
@@ -213,7 +204,7 @@ def get_recent_games() -> Any:
             "winner": row['winner'],
             "category": row['category'] or "Mixed",
             "duration": duration_str,
-            "created_at": row['created_at'].isoformat() if row['created_at'] else None
+            "created_at": row['created_at']
         })
     
     return jsonify(recent_games), 200
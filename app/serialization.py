@@ -0,0 +1,94 @@
+"""
+JSON serialization shared by Flask responses and Socket.IO payloads.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise. Both backends serialize the values our queries return without
+per-row conversion: RealDictRow (a dict), Decimal (as float), datetime/date/time
+(ISO 8601), UUID, and dicts with non-string keys such as ``{user_id: score}``.
+"""
+
+import datetime
+import decimal
+import json as _stdlib_json
+import uuid
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(obj):
+    """Fallback for types the JSON backend does not handle natively"""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj):
+        """Serialize ``obj`` to UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+else:
+    class _Encoder(_stdlib_json.JSONEncoder):
+        def default(self, obj):
+            return _default(obj)
+
+    _encoder = _Encoder(ensure_ascii=False, separators=(',', ':'))
+
+    def dumps_bytes(obj):
+        """Serialize ``obj`` to UTF-8 JSON bytes"""
+        return _encoder.encode(obj).encode('utf8')
+
+    def loads(s, **kwargs):
+        return _stdlib_json.loads(s)
+
+
+def dumps(obj, **kwargs):
+    """Serialize ``obj`` to a JSON string (formatting kwargs such as separators are ignored)"""
+    return dumps_bytes(obj).decode('utf8')
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by :func:`dumps_bytes`, used by ``jsonify``"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Build the body from bytes directly, skipping a str round trip
+        return self._app.response_class(dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+class SocketIOJSON:
+    """``json`` module replacement for the Socket.IO server (``SocketIO(json=...)``)"""
+
+    dumps = staticmethod(dumps)
+    loads = staticmethod(loads)
+
+
+def init_app(app):
+    """Install the fast JSON provider on the Flask app"""
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,265 @@
+-- 0001: initial schema (tables, materialized view, indexes)
+
+-- =====================================================
+-- 1) Main User and Profile Tables
+-- =====================================================
+CREATE TABLE IF NOT EXISTS users (
+    id BIGSERIAL PRIMARY KEY,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    email VARCHAR(120) UNIQUE NOT NULL
+        CHECK (email ~* '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$'),
+    password_hash VARCHAR(255) NOT NULL,
+    avatar VARCHAR(255),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_login TIMESTAMP,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    role VARCHAR(20) NOT NULL DEFAULT 'user'
+        CHECK (role IN ('user', 'admin', 'moderator')),
+    current_level INTEGER NOT NULL DEFAULT 1,
+    total_xp BIGINT NOT NULL DEFAULT 0
+);
+
+-- =====================================================
+-- 2) Categories
+-- =====================================================
+CREATE TABLE IF NOT EXISTS categories (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    description TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- =====================================================
+-- 4) Questions and Choices Tables
+-- =====================================================
+CREATE TABLE IF NOT EXISTS questions (
+    id BIGSERIAL PRIMARY KEY,
+    text TEXT NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+    difficulty VARCHAR(20) NOT NULL
+        CHECK (difficulty IN ('easy', 'medium', 'hard')),
+    is_verified BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    created_by BIGINT REFERENCES users(id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS question_choices (
+    id BIGSERIAL PRIMARY KEY,
+    question_id BIGINT NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+    choice_text TEXT NOT NULL,
+    is_correct BOOLEAN NOT NULL DEFAULT FALSE,
+    position CHAR(1) NOT NULL
+        CHECK (position IN ('A','B','C','D')),
+    UNIQUE (question_id, position),
+    CONSTRAINT choice_text_length CHECK (char_length(trim(choice_text)) > 0)
+);
+
+-- =====================================================
+-- 5) Game Types Table with Total Rounds
+-- =====================================================
+CREATE TABLE IF NOT EXISTS game_types (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(50) NOT NULL UNIQUE,
+    description TEXT,
+    total_rounds SMALLINT NOT NULL DEFAULT 5
+        CHECK (total_rounds > 0)
+);
+INSERT INTO game_types (name, description, total_rounds)
+VALUES
+  ('Classic Duel','Two‑player head‑to‑head match',5),
+  ('Speed Quiz','Time‑attack mode',3),
+  ('Battle Royale','Up to four players, last one standing',7)
+ON CONFLICT DO NOTHING;
+
+-- =====================================================
+-- 6) Games and Participants Tables
+-- =====================================================
+CREATE TABLE IF NOT EXISTS games (
+    id BIGSERIAL PRIMARY KEY,
+    game_type_id INTEGER NOT NULL REFERENCES game_types(id) ON DELETE RESTRICT,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending','active','completed','cancelled')),
+    start_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    end_time TIMESTAMP,
+    winner_id BIGINT REFERENCES users(id) ON DELETE SET NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS game_participants (
+    game_id BIGINT NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    join_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    score INTEGER NOT NULL DEFAULT 0,
+    status VARCHAR(20) NOT NULL DEFAULT 'active'
+        CHECK (status IN ('active','disconnected','finished')),
+    PRIMARY KEY (game_id, user_id)
+);
+
+-- =====================================================
+-- 7) Match Queue Table for Game Waiting
+-- =====================================================
+CREATE TABLE IF NOT EXISTS match_queue (
+    id BIGSERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    game_type_id INTEGER NOT NULL REFERENCES game_types(id) ON DELETE RESTRICT,
+    enqueued_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- =====================================================
+-- 9) Game Rounds Table with Category Selection
+-- =====================================================
+CREATE TABLE IF NOT EXISTS game_rounds (
+    id BIGSERIAL PRIMARY KEY,
+    game_id BIGINT NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    round_number SMALLINT NOT NULL,
+    category_id INTEGER REFERENCES categories(id) ON DELETE RESTRICT,
+    category_picker_id BIGINT REFERENCES users(id) ON DELETE SET NULL,
+    start_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    end_time TIMESTAMP,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending','active','completed')),
+    time_limit_seconds INTEGER,
+    points_possible INTEGER NOT NULL DEFAULT 100,
+    UNIQUE (game_id, round_number)
+);
+
+-- =====================================================
+-- 10) Game Round Questions Storage Table
+-- =====================================================
+CREATE TABLE IF NOT EXISTS game_round_questions (
+    id BIGSERIAL PRIMARY KEY,
+    game_round_id BIGINT NOT NULL REFERENCES game_rounds(id) ON DELETE CASCADE,
+    question_id BIGINT NOT NULL REFERENCES questions(id) ON DELETE RESTRICT,
+    CONSTRAINT uq_round_question UNIQUE (game_round_id, question_id)
+);
+
+-- =====================================================
+-- 11) Round Answers Table
+-- =====================================================
+CREATE TABLE IF NOT EXISTS round_answers (
+    id BIGSERIAL PRIMARY KEY,
+    game_round_question_id BIGINT NOT NULL REFERENCES game_round_questions(id) ON DELETE CASCADE,
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    choice_id BIGINT NOT NULL REFERENCES question_choices(id) ON DELETE RESTRICT,
+    answer_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    response_time_ms INTEGER,
+    is_correct BOOLEAN NOT NULL,
+    points_earned INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (game_round_question_id, user_id)
+);
+
+-- =====================================================
+-- 12) User Overall Stats and Category Stats
+-- =====================================================
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id BIGINT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    games_played INTEGER NOT NULL DEFAULT 0,
+    games_won INTEGER NOT NULL DEFAULT 0,
+    total_points BIGINT NOT NULL DEFAULT 0,
+    correct_answers INTEGER NOT NULL DEFAULT 0,
+    total_answers INTEGER NOT NULL DEFAULT 0,
+    average_response_time_ms INTEGER,
+    highest_score INTEGER NOT NULL DEFAULT 0,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    best_streak INTEGER NOT NULL DEFAULT 0,
+    last_played_at TIMESTAMP,
+    stats_updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_category_stats (
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+    games_played INTEGER NOT NULL DEFAULT 0,
+    correct_answers INTEGER NOT NULL DEFAULT 0,
+    total_answers INTEGER NOT NULL DEFAULT 0,
+    total_points BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, category_id)
+);
+
+-- =====================================================
+-- 13) Leaderboards Table
+-- =====================================================
+CREATE TABLE IF NOT EXISTS leaderboards (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    scope VARCHAR(20) NOT NULL
+        CHECK (scope IN ('daily','weekly','monthly','alltime')),
+    category_id INTEGER REFERENCES categories(id) ON DELETE SET NULL,
+    rank INTEGER NOT NULL,
+    score BIGINT NOT NULL,
+    generated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_leaderboards_user_scope_cat UNIQUE (user_id, scope, category_id)
+);
+
+-- =====================================================
+-- 14) Chat Rooms and Messages
+-- =====================================================
+CREATE TABLE IF NOT EXISTS chat_rooms (
+    id BIGSERIAL PRIMARY KEY,
+    name VARCHAR(100),
+    type VARCHAR(20) NOT NULL
+        CHECK (type IN ('private','game','public')),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    game_id BIGINT REFERENCES games(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS chat_room_members (
+    room_id BIGINT NOT NULL REFERENCES chat_rooms(id) ON DELETE CASCADE,
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    joined_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (room_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id BIGSERIAL PRIMARY KEY,
+    room_id BIGINT REFERENCES chat_rooms(id) ON DELETE CASCADE,
+    sender_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    recipient_id BIGINT REFERENCES users(id) ON DELETE CASCADE,
+    reply_to_id BIGINT REFERENCES chat_messages(id) ON DELETE SET NULL,
+    message TEXT NOT NULL,
+    is_edited BOOLEAN NOT NULL DEFAULT FALSE,
+    is_deleted BOOLEAN NOT NULL DEFAULT FALSE,
+    is_read BOOLEAN NOT NULL DEFAULT FALSE,
+    sent_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- =====================================================
+-- 17) Materialized View for Top Players
+-- =====================================================
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_top_players AS
+SELECT
+    u.id         AS user_id,
+    u.username   AS username,
+    us.total_points,
+    us.games_won,
+    us.games_played,
+    CASE
+      WHEN us.total_answers = 0 THEN 0
+      ELSE ROUND((us.correct_answers::numeric / us.total_answers::numeric) * 100, 2)
+    END AS accuracy_rate
+FROM users u
+JOIN user_stats us ON u.id = us.user_id
+WHERE us.games_played > 0
+ORDER BY us.total_points DESC
+WITH DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_top_players ON mv_top_players(user_id);
+
+-- =====================================================
+-- 19) Indexes for Performance Optimization
+-- =====================================================
+CREATE INDEX IF NOT EXISTS idx_questions_category_id ON questions(category_id);
+CREATE INDEX IF NOT EXISTS idx_questions_difficulty ON questions(difficulty);
+CREATE INDEX IF NOT EXISTS idx_games_status ON games(status);
+CREATE INDEX IF NOT EXISTS idx_game_participants_user_id ON game_participants(user_id);
+CREATE INDEX IF NOT EXISTS idx_match_queue_enqueued_at ON match_queue(enqueued_at);
+CREATE INDEX IF NOT EXISTS idx_game_rounds_category_id ON game_rounds(category_id);
+CREATE INDEX IF NOT EXISTS idx_round_answers_user_id ON round_answers(user_id);
+CREATE INDEX IF NOT EXISTS idx_user_stats_total_points ON user_stats(total_points DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_scope_category_score ON leaderboards(scope, category_id, score DESC);
+CREATE INDEX IF NOT EXISTS idx_chat_rooms_type ON chat_rooms(type);
+CREATE INDEX IF NOT EXISTS idx_chat_rooms_game_id ON chat_rooms(game_id);
+CREATE INDEX IF NOT EXISTS idx_chat_room_members_user_id ON chat_room_members(user_id);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_room_id_sent_at ON chat_messages(room_id, sent_at DESC);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_recipient_id ON chat_messages(recipient_id) WHERE recipient_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_chat_messages_sender_id ON chat_messages(sender_id);
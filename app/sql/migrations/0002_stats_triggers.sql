@@ -0,0 +1,126 @@
+-- 0002: statistics functions and triggers
+
+-- =====================================================
+-- 18) Functions and Triggers for Statistical Updates
+-- =====================================================
+
+-- 18.1) Update user_stats on answer
+CREATE OR REPLACE FUNCTION fn_update_user_stats_on_answer() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE user_stats
+    SET
+        total_answers = user_stats.total_answers + 1,
+        correct_answers = user_stats.correct_answers + CASE WHEN NEW.is_correct THEN 1 ELSE 0 END,
+        total_points = user_stats.total_points + NEW.points_earned,
+        average_response_time_ms =
+            (COALESCE(user_stats.average_response_time_ms, 0) * user_stats.total_answers + NEW.response_time_ms) / (user_stats.total_answers + 1),
+        stats_updated_at = NOW()
+    WHERE user_id = NEW.user_id;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_after_insert_round_answers ON round_answers;
+CREATE TRIGGER trg_after_insert_round_answers
+AFTER INSERT ON round_answers
+FOR EACH ROW
+EXECUTE FUNCTION fn_update_user_stats_on_answer();
+
+-- 18.2) Update category-specific stats
+CREATE OR REPLACE FUNCTION fn_update_user_category_stats_on_answer() RETURNS TRIGGER AS $$
+DECLARE
+    v_category_id INTEGER;
+BEGIN
+    SELECT gr.category_id INTO v_category_id
+    FROM game_round_questions grq
+    JOIN game_rounds gr ON gr.id = grq.game_round_id
+    WHERE grq.id = NEW.game_round_question_id;
+
+    INSERT INTO user_category_stats (user_id, category_id, games_played, correct_answers, total_answers, total_points)
+    VALUES (NEW.user_id, v_category_id, 0, CASE WHEN NEW.is_correct THEN 1 ELSE 0 END, 1, NEW.points_earned)
+    ON CONFLICT (user_id, category_id) DO UPDATE
+    SET
+        correct_answers = user_category_stats.correct_answers + EXCLUDED.correct_answers,
+        total_answers   = user_category_stats.total_answers + EXCLUDED.total_answers,
+        total_points    = user_category_stats.total_points + EXCLUDED.total_points;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_after_insert_round_answers_cat ON round_answers;
+CREATE TRIGGER trg_after_insert_round_answers_cat
+AFTER INSERT ON round_answers
+FOR EACH ROW
+EXECUTE FUNCTION fn_update_user_category_stats_on_answer();
+
+-- 18.3) Update overall stats after game complete
+CREATE OR REPLACE FUNCTION fn_update_stats_after_game_complete() RETURNS TRIGGER AS $$
+DECLARE
+    v_participant RECORD;
+    v_game_category RECORD;
+BEGIN
+    IF NEW.status = 'completed' AND OLD.status IS DISTINCT FROM NEW.status THEN
+        FOR v_participant IN SELECT user_id, score FROM game_participants WHERE game_id = NEW.id LOOP
+            IF v_participant.user_id = NEW.winner_id THEN
+                UPDATE user_stats SET
+                    games_won = games_won + 1,
+                    games_played = games_played + 1,
+                    current_streak = current_streak + 1,
+                    best_streak = GREATEST(best_streak, current_streak + 1),
+                    highest_score = GREATEST(highest_score, v_participant.score),
+                    last_played_at = NOW(),
+                    stats_updated_at = NOW()
+                WHERE user_id = v_participant.user_id;
+            ELSE
+                UPDATE user_stats SET
+                    games_played = games_played + 1,
+                    current_streak = 0,
+                    highest_score = GREATEST(highest_score, v_participant.score),
+                    last_played_at = NOW(),
+                    stats_updated_at = NOW()
+                WHERE user_id = v_participant.user_id;
+            END IF;
+            FOR v_game_category IN SELECT DISTINCT category_id FROM game_rounds WHERE game_id = NEW.id AND category_id IS NOT NULL LOOP
+                INSERT INTO user_category_stats (user_id, category_id, games_played, correct_answers, total_answers, total_points)
+                VALUES (v_participant.user_id, v_game_category.category_id, 1, 0, 0, 0)
+                ON CONFLICT (user_id, category_id) DO UPDATE SET games_played = user_category_stats.games_played + 1;
+            END LOOP;
+        END LOOP;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_after_update_games ON games;
+CREATE TRIGGER trg_after_update_games
+AFTER UPDATE ON games
+FOR EACH ROW
+WHEN (OLD.status IS DISTINCT FROM NEW.status)
+EXECUTE FUNCTION fn_update_stats_after_game_complete();
+
+-- 18.4) Full-refresh alltime leaderboard on game complete
+CREATE OR REPLACE FUNCTION fn_refresh_alltime_leaderboard() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.status = 'completed' AND OLD.status IS DISTINCT FROM NEW.status THEN
+        -- wipe alltime
+        DELETE FROM leaderboards WHERE scope = 'alltime' AND category_id IS NULL;
+        -- rebuild ranks
+        WITH ranked AS (
+            SELECT user_id, ROW_NUMBER() OVER (ORDER BY total_points DESC) AS new_rank, total_points
+            FROM user_stats
+        )
+        INSERT INTO leaderboards (user_id, scope, category_id, rank, score, generated_at)
+        SELECT user_id, 'alltime', NULL, new_rank, total_points, NOW() FROM ranked;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_refresh_alltime_lb ON games;
+CREATE TRIGGER trg_refresh_alltime_lb
+AFTER UPDATE ON games
+FOR EACH ROW
+WHEN (OLD.status IS DISTINCT FROM NEW.status)
+EXECUTE FUNCTION fn_refresh_alltime_leaderboard();
@@ -0,0 +1,84 @@
+-- 0003: create a game, its participants and all rounds in one call
+
+-- fn_create_game(game_type_id, participant_ids, picker_mode) inserts the game
+-- (already 'active'), one participant row per id and every round, and returns
+-- the initial state in the shape of get_full_game_state_data().
+--
+-- picker_mode:
+--   'alternate'  participants take turns picking the round category, in
+--                array order, starting with a random participant
+--   'none'       no picker (categories are assigned later)
+CREATE OR REPLACE FUNCTION fn_create_game(
+    p_game_type_id INTEGER,
+    p_participant_ids BIGINT[],
+    p_picker_mode TEXT DEFAULT 'none'
+) RETURNS JSONB AS $$
+DECLARE
+    v_total_rounds SMALLINT;
+    v_game_id BIGINT;
+    v_player_count INTEGER := COALESCE(array_length(p_participant_ids, 1), 0);
+    v_first_picker INTEGER;
+BEGIN
+    IF p_picker_mode NOT IN ('alternate', 'none') THEN
+        RAISE EXCEPTION 'Unknown picker mode %', p_picker_mode USING ERRCODE = 'invalid_parameter_value';
+    END IF;
+    IF v_player_count = 0 THEN
+        RAISE EXCEPTION 'A game needs at least one participant' USING ERRCODE = 'invalid_parameter_value';
+    END IF;
+
+    SELECT total_rounds INTO v_total_rounds FROM game_types WHERE id = p_game_type_id;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'GameType % not found', p_game_type_id USING ERRCODE = 'no_data_found';
+    END IF;
+
+    INSERT INTO games (game_type_id, status, start_time)
+    VALUES (p_game_type_id, 'active', NOW())
+    RETURNING id INTO v_game_id;
+
+    INSERT INTO game_participants (game_id, user_id)
+    SELECT v_game_id, pid FROM unnest(p_participant_ids) AS pid;
+
+    v_first_picker := floor(random() * v_player_count)::INTEGER;
+    INSERT INTO game_rounds
+      (game_id, round_number, category_id, category_picker_id, status, time_limit_seconds, points_possible)
+    SELECT v_game_id, r, NULL,
+           CASE WHEN p_picker_mode = 'alternate'
+                THEN p_participant_ids[1 + (v_first_picker + r - 1) % v_player_count]
+           END,
+           'pending', 1000, 100
+    FROM generate_series(1, v_total_rounds) AS r;
+
+    RETURN jsonb_build_object(
+        'game', jsonb_build_object(
+            'id', v_game_id,
+            'game_type_id', p_game_type_id,
+            'status', 'active',
+            'total_rounds', v_total_rounds
+        ),
+        'participants', (
+            SELECT jsonb_agg(jsonb_build_object(
+                       'user_id', u.id, 'username', u.username, 'avatar', u.avatar, 'score', 0
+                   ) ORDER BY p.ord)
+            FROM unnest(p_participant_ids) WITH ORDINALITY AS p(user_id, ord)
+            JOIN users u ON u.id = p.user_id
+        ),
+        'game_status', 'active',
+        'total_rounds', v_total_rounds,
+        'scores', (SELECT jsonb_object_agg(pid, 0) FROM unnest(p_participant_ids) AS pid),
+        'current_round', jsonb_build_object(
+            'round_number', 1,
+            'status', 'pending',
+            'category_id', NULL,
+            'category_picker_id', CASE WHEN p_picker_mode = 'alternate'
+                                       THEN p_participant_ids[1 + v_first_picker]
+                                  END,
+            'category_options', (
+                SELECT COALESCE(jsonb_agg(c), '[]'::jsonb)
+                FROM (SELECT id, name, description FROM categories ORDER BY random() LIMIT 3) c
+            ),
+            'questions', '[]'::jsonb,
+            'time_limit_seconds', 1000
+        )
+    );
+END;
+$$ LANGUAGE plpgsql;
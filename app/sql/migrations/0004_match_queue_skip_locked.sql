@@ -0,0 +1,14 @@
+-- 0004: match queue constraints and index for SKIP LOCKED matchmaking
+
+-- One queue entry per user and game type (keep the oldest if duplicates slipped in)
+DELETE FROM match_queue a
+USING match_queue b
+WHERE a.user_id = b.user_id
+  AND a.game_type_id = b.game_type_id
+  AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_match_queue_user_game_type ON match_queue(user_id, game_type_id);
+
+-- Longest-waiting player per game type; replaces the plain enqueued_at index
+CREATE INDEX IF NOT EXISTS idx_match_queue_game_type_enqueued_at ON match_queue(game_type_id, enqueued_at);
+DROP INDEX IF EXISTS idx_match_queue_enqueued_at;
@@ -0,0 +1,18 @@
+-- 0005: Elo rating for skill-aware matchmaking, batch game creation
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS rating INTEGER NOT NULL DEFAULT 1200;
+
+-- Rating at enqueue time, so the matcher pairs without joining users on every tick
+ALTER TABLE match_queue ADD COLUMN IF NOT EXISTS rating INTEGER NOT NULL DEFAULT 1200;
+
+-- Create one two-player game per (p_first[i], p_second[i]) pair in a single call;
+-- returns the initial state of every game (see fn_create_game)
+CREATE OR REPLACE FUNCTION fn_create_games(
+    p_game_type_id INTEGER,
+    p_first BIGINT[],
+    p_second BIGINT[],
+    p_picker_mode TEXT DEFAULT 'none'
+) RETURNS SETOF JSONB AS $$
+    SELECT fn_create_game(p_game_type_id, ARRAY[pair.first_id, pair.second_id], p_picker_mode)
+    FROM unnest(p_first, p_second) AS pair(first_id, second_id);
+$$ LANGUAGE sql;
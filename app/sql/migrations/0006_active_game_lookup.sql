@@ -0,0 +1,7 @@
+-- 0006: cheap "my active game" lookup (reconnects, /games/active)
+
+-- A user's games newest first, so the lookup stops at the first open one
+CREATE INDEX IF NOT EXISTS idx_game_participants_user_game ON game_participants(user_id, game_id DESC);
+
+-- Only the few open games, not the whole game history
+CREATE INDEX IF NOT EXISTS idx_games_open ON games(id) WHERE status IN ('pending', 'active');
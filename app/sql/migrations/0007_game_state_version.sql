@@ -0,0 +1,4 @@
+-- 0007: version counter for the in-process game state cache (app/game_cache.py)
+
+-- Bumped in the transaction of every change to a game's visible state
+ALTER TABLE games ADD COLUMN IF NOT EXISTS state_version BIGINT NOT NULL DEFAULT 0;
@@ -0,0 +1,100 @@
+-- 0008: persist the categories offered for each round
+
+-- Reading the state of a round without a category used to draw three random
+-- categories on every call. The offer is now drawn once, when the round is
+-- created (pending), and stored with it; pick_category only accepts an offered
+-- category.
+CREATE OR REPLACE FUNCTION fn_category_offer(p_count INTEGER DEFAULT 3) RETURNS INTEGER[] AS $$
+    SELECT COALESCE(array_agg(id), '{}')
+    FROM (SELECT id FROM categories ORDER BY random() LIMIT p_count) c;
+$$ LANGUAGE sql VOLATILE;
+
+-- Added without a default so existing rounds are not rewritten, then defaulted for new rounds
+ALTER TABLE game_rounds ADD COLUMN IF NOT EXISTS category_options INTEGER[];
+ALTER TABLE game_rounds ALTER COLUMN category_options SET DEFAULT fn_category_offer(3);
+
+-- Rounds of running games that still wait for a pick
+UPDATE game_rounds
+SET category_options = fn_category_offer(3)
+WHERE category_options IS NULL AND category_id IS NULL AND status IN ('pending', 'active');
+
+-- fn_create_game (0003) now returns the stored offer of round 1
+CREATE OR REPLACE FUNCTION fn_create_game(
+    p_game_type_id INTEGER,
+    p_participant_ids BIGINT[],
+    p_picker_mode TEXT DEFAULT 'none'
+) RETURNS JSONB AS $$
+DECLARE
+    v_total_rounds SMALLINT;
+    v_game_id BIGINT;
+    v_player_count INTEGER := COALESCE(array_length(p_participant_ids, 1), 0);
+    v_first_picker INTEGER;
+BEGIN
+    IF p_picker_mode NOT IN ('alternate', 'none') THEN
+        RAISE EXCEPTION 'Unknown picker mode %', p_picker_mode USING ERRCODE = 'invalid_parameter_value';
+    END IF;
+    IF v_player_count = 0 THEN
+        RAISE EXCEPTION 'A game needs at least one participant' USING ERRCODE = 'invalid_parameter_value';
+    END IF;
+
+    SELECT total_rounds INTO v_total_rounds FROM game_types WHERE id = p_game_type_id;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'GameType % not found', p_game_type_id USING ERRCODE = 'no_data_found';
+    END IF;
+
+    INSERT INTO games (game_type_id, status, start_time)
+    VALUES (p_game_type_id, 'active', NOW())
+    RETURNING id INTO v_game_id;
+
+    INSERT INTO game_participants (game_id, user_id)
+    SELECT v_game_id, pid FROM unnest(p_participant_ids) AS pid;
+
+    v_first_picker := floor(random() * v_player_count)::INTEGER;
+    INSERT INTO game_rounds
+      (game_id, round_number, category_id, category_picker_id, status, time_limit_seconds, points_possible)
+    SELECT v_game_id, r, NULL,
+           CASE WHEN p_picker_mode = 'alternate'
+                THEN p_participant_ids[1 + (v_first_picker + r - 1) % v_player_count]
+           END,
+           'pending', 1000, 100
+    FROM generate_series(1, v_total_rounds) AS r;
+
+    RETURN jsonb_build_object(
+        'game', jsonb_build_object(
+            'id', v_game_id,
+            'game_type_id', p_game_type_id,
+            'status', 'active',
+            'total_rounds', v_total_rounds
+        ),
+        'participants', (
+            SELECT jsonb_agg(jsonb_build_object(
+                       'user_id', u.id, 'username', u.username, 'avatar', u.avatar, 'score', 0
+                   ) ORDER BY p.ord)
+            FROM unnest(p_participant_ids) WITH ORDINALITY AS p(user_id, ord)
+            JOIN users u ON u.id = p.user_id
+        ),
+        'game_status', 'active',
+        'total_rounds', v_total_rounds,
+        'scores', (SELECT jsonb_object_agg(pid, 0) FROM unnest(p_participant_ids) AS pid),
+        'current_round', jsonb_build_object(
+            'round_number', 1,
+            'status', 'pending',
+            'category_id', NULL,
+            'category_picker_id', CASE WHEN p_picker_mode = 'alternate'
+                                       THEN p_participant_ids[1 + v_first_picker]
+                                  END,
+            'category_options', (
+                SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                           'id', c.id, 'name', c.name, 'description', c.description
+                       ) ORDER BY o.ord), '[]'::jsonb)
+                FROM game_rounds gr
+                CROSS JOIN LATERAL unnest(gr.category_options) WITH ORDINALITY AS o(id, ord)
+                JOIN categories c ON c.id = o.id
+                WHERE gr.game_id = v_game_id AND gr.round_number = 1
+            ),
+            'questions', '[]'::jsonb,
+            'time_limit_seconds', 1000
+        )
+    );
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,116 @@
+-- 0009: validate and record an answer in one call
+
+-- fn_submit_answer(game_id, round_number, user_id, question_id, choice_id,
+-- response_time_ms, grace_seconds, now) runs every check of POST
+-- /games/<id>/rounds/<n>/answer, inserts the answer (ON CONFLICT DO NOTHING
+-- for duplicates), adds the points to the participant's score and bumps the
+-- game's state_version. It returns a JSONB object whose "status" is 'ok' or
+-- one of the error codes below; nothing is written unless it is 'ok'.
+--
+--   game_not_found, game_not_active, round_not_found, round_not_active,
+--   time_limit_exceeded, not_participant, question_not_in_round,
+--   invalid_choice, already_answered
+--
+-- On 'ok' it also returns is_correct, points_earned, correct_choice_id, score
+-- (the participant's new total) and state_version.
+CREATE OR REPLACE FUNCTION fn_submit_answer(
+    p_game_id BIGINT,
+    p_round_number INTEGER,
+    p_user_id BIGINT,
+    p_question_id BIGINT,
+    p_choice_id BIGINT,
+    p_response_time_ms INTEGER DEFAULT NULL,
+    p_grace_seconds INTEGER DEFAULT 5,
+    p_now TIMESTAMP DEFAULT LOCALTIMESTAMP
+) RETURNS JSONB AS $$
+DECLARE
+    v_game_status TEXT;
+    v_round RECORD;
+    v_grq_id BIGINT;
+    v_is_correct BOOLEAN;
+    v_correct_choice_id BIGINT;
+    v_points INTEGER;
+    v_answer_id BIGINT;
+    v_score INTEGER;
+    v_version BIGINT;
+BEGIN
+    SELECT status INTO v_game_status FROM games WHERE id = p_game_id;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'game_not_found');
+    ELSIF v_game_status <> 'active' THEN
+        RETURN jsonb_build_object('status', 'game_not_active');
+    END IF;
+
+    SELECT id, status, points_possible, start_time, time_limit_seconds INTO v_round
+    FROM game_rounds
+    WHERE game_id = p_game_id AND round_number = p_round_number;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'round_not_found');
+    ELSIF v_round.status <> 'active' THEN
+        RETURN jsonb_build_object('status', 'round_not_active');
+    END IF;
+
+    -- The grace period covers API latency and client-side lag; p_now lets the
+    -- caller measure elapsed time on its own clock
+    IF v_round.time_limit_seconds IS NOT NULL AND v_round.start_time IS NOT NULL
+       AND p_now - v_round.start_time
+           > make_interval(secs => v_round.time_limit_seconds + p_grace_seconds) THEN
+        RETURN jsonb_build_object('status', 'time_limit_exceeded');
+    END IF;
+
+    PERFORM 1 FROM game_participants
+    WHERE game_id = p_game_id AND user_id = p_user_id AND status = 'active';
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'not_participant');
+    END IF;
+
+    SELECT id INTO v_grq_id
+    FROM game_round_questions
+    WHERE game_round_id = v_round.id AND question_id = p_question_id;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'question_not_in_round');
+    END IF;
+
+    SELECT is_correct INTO v_is_correct
+    FROM question_choices
+    WHERE id = p_choice_id AND question_id = p_question_id;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'invalid_choice');
+    END IF;
+
+    SELECT id INTO v_correct_choice_id
+    FROM question_choices
+    WHERE question_id = p_question_id AND is_correct = TRUE
+    LIMIT 1;
+
+    v_points := CASE WHEN v_is_correct THEN v_round.points_possible ELSE 0 END;
+
+    INSERT INTO round_answers
+      (game_round_question_id, user_id, choice_id, is_correct, points_earned, response_time_ms)
+    VALUES (v_grq_id, p_user_id, p_choice_id, v_is_correct, v_points, p_response_time_ms)
+    ON CONFLICT (game_round_question_id, user_id) DO NOTHING
+    RETURNING id INTO v_answer_id;
+    IF v_answer_id IS NULL THEN
+        RETURN jsonb_build_object('status', 'already_answered');
+    END IF;
+
+    UPDATE game_participants
+    SET score = score + v_points
+    WHERE game_id = p_game_id AND user_id = p_user_id
+    RETURNING score INTO v_score;
+
+    UPDATE games
+    SET state_version = state_version + 1
+    WHERE id = p_game_id
+    RETURNING state_version INTO v_version;
+
+    RETURN jsonb_build_object(
+        'status', 'ok',
+        'is_correct', v_is_correct,
+        'points_earned', v_points,
+        'correct_choice_id', v_correct_choice_id,
+        'score', v_score,
+        'state_version', v_version
+    );
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,209 @@
+-- 0011: maintained counters for game transitions (app/game_engine.py)
+
+-- Completing a round used to count participants, round questions and answers
+-- with COUNT(*) queries, and completing a game counted its unfinished rounds.
+-- Triggers now keep these counts on the game and round rows, which the engine
+-- reads under the game's row lock.
+ALTER TABLE games ADD COLUMN IF NOT EXISTS participant_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE games ADD COLUMN IF NOT EXISTS open_rounds INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE game_rounds ADD COLUMN IF NOT EXISTS question_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE game_rounds ADD COLUMN IF NOT EXISTS answer_count INTEGER NOT NULL DEFAULT 0;
+
+-- Group games (POST /games) are not rated when the engine finishes them
+ALTER TABLE games ADD COLUMN IF NOT EXISTS rated BOOLEAN NOT NULL DEFAULT TRUE;
+
+UPDATE games g
+SET participant_count = (SELECT COUNT(*) FROM game_participants gp WHERE gp.game_id = g.id),
+    open_rounds = (SELECT COUNT(*) FROM game_rounds gr WHERE gr.game_id = g.id AND gr.status <> 'completed');
+
+UPDATE game_rounds gr
+SET question_count = (SELECT COUNT(*) FROM game_round_questions grq WHERE grq.game_round_id = gr.id),
+    answer_count = (
+        SELECT COUNT(*)
+        FROM round_answers ra
+        JOIN game_round_questions grq ON grq.id = ra.game_round_question_id
+        WHERE grq.game_round_id = gr.id
+    );
+
+CREATE OR REPLACE FUNCTION fn_count_participants() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE games SET participant_count = participant_count + 1 WHERE id = NEW.game_id;
+    ELSE
+        UPDATE games SET participant_count = participant_count - 1 WHERE id = OLD.game_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_count_participants ON game_participants;
+CREATE TRIGGER trg_count_participants
+AFTER INSERT OR DELETE ON game_participants
+FOR EACH ROW
+EXECUTE FUNCTION fn_count_participants();
+
+-- Rounds that are not completed yet; the game is finished when it reaches 0
+CREATE OR REPLACE FUNCTION fn_count_open_rounds() RETURNS TRIGGER AS $$
+DECLARE
+    v_delta INTEGER := 0;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status <> 'completed' THEN
+        v_delta := v_delta + 1;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status <> 'completed' THEN
+        v_delta := v_delta - 1;
+    END IF;
+    IF v_delta <> 0 THEN
+        UPDATE games SET open_rounds = open_rounds + v_delta
+        WHERE id = CASE WHEN TG_OP = 'DELETE' THEN OLD.game_id ELSE NEW.game_id END;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_count_open_rounds ON game_rounds;
+CREATE TRIGGER trg_count_open_rounds
+AFTER INSERT OR DELETE OR UPDATE OF status ON game_rounds
+FOR EACH ROW
+EXECUTE FUNCTION fn_count_open_rounds();
+
+CREATE OR REPLACE FUNCTION fn_count_round_questions() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE game_rounds SET question_count = question_count + 1 WHERE id = NEW.game_round_id;
+    ELSE
+        UPDATE game_rounds SET question_count = question_count - 1 WHERE id = OLD.game_round_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_count_round_questions ON game_round_questions;
+CREATE TRIGGER trg_count_round_questions
+AFTER INSERT OR DELETE ON game_round_questions
+FOR EACH ROW
+EXECUTE FUNCTION fn_count_round_questions();
+
+CREATE OR REPLACE FUNCTION fn_count_round_answers() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE game_rounds SET answer_count = answer_count + 1
+        WHERE id = (SELECT game_round_id FROM game_round_questions WHERE id = NEW.game_round_question_id);
+    ELSE
+        UPDATE game_rounds SET answer_count = answer_count - 1
+        WHERE id = (SELECT game_round_id FROM game_round_questions WHERE id = OLD.game_round_question_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_count_round_answers ON round_answers;
+CREATE TRIGGER trg_count_round_answers
+AFTER INSERT OR DELETE ON round_answers
+FOR EACH ROW
+EXECUTE FUNCTION fn_count_round_answers();
+
+-- fn_submit_answer (0009), unchanged except that it locks the game row first
+CREATE OR REPLACE FUNCTION fn_submit_answer(
+    p_game_id BIGINT,
+    p_round_number INTEGER,
+    p_user_id BIGINT,
+    p_question_id BIGINT,
+    p_choice_id BIGINT,
+    p_response_time_ms INTEGER DEFAULT NULL,
+    p_grace_seconds INTEGER DEFAULT 5,
+    p_now TIMESTAMP DEFAULT LOCALTIMESTAMP
+) RETURNS JSONB AS $$
+DECLARE
+    v_game_status TEXT;
+    v_round RECORD;
+    v_grq_id BIGINT;
+    v_is_correct BOOLEAN;
+    v_correct_choice_id BIGINT;
+    v_points INTEGER;
+    v_answer_id BIGINT;
+    v_score INTEGER;
+    v_version BIGINT;
+BEGIN
+    -- Lock the game row first, like every game transition (app/game_engine.py):
+    -- the answer counter trigger below writes the round row before the game row
+    SELECT status INTO v_game_status FROM games WHERE id = p_game_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'game_not_found');
+    ELSIF v_game_status <> 'active' THEN
+        RETURN jsonb_build_object('status', 'game_not_active');
+    END IF;
+
+    SELECT id, status, points_possible, start_time, time_limit_seconds INTO v_round
+    FROM game_rounds
+    WHERE game_id = p_game_id AND round_number = p_round_number;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'round_not_found');
+    ELSIF v_round.status <> 'active' THEN
+        RETURN jsonb_build_object('status', 'round_not_active');
+    END IF;
+
+    -- The grace period covers API latency and client-side lag; p_now lets the
+    -- caller measure elapsed time on its own clock
+    IF v_round.time_limit_seconds IS NOT NULL AND v_round.start_time IS NOT NULL
+       AND p_now - v_round.start_time
+           > make_interval(secs => v_round.time_limit_seconds + p_grace_seconds) THEN
+        RETURN jsonb_build_object('status', 'time_limit_exceeded');
+    END IF;
+
+    PERFORM 1 FROM game_participants
+    WHERE game_id = p_game_id AND user_id = p_user_id AND status = 'active';
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'not_participant');
+    END IF;
+
+    SELECT id INTO v_grq_id
+    FROM game_round_questions
+    WHERE game_round_id = v_round.id AND question_id = p_question_id;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'question_not_in_round');
+    END IF;
+
+    SELECT is_correct INTO v_is_correct
+    FROM question_choices
+    WHERE id = p_choice_id AND question_id = p_question_id;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'invalid_choice');
+    END IF;
+
+    SELECT id INTO v_correct_choice_id
+    FROM question_choices
+    WHERE question_id = p_question_id AND is_correct = TRUE
+    LIMIT 1;
+
+    v_points := CASE WHEN v_is_correct THEN v_round.points_possible ELSE 0 END;
+
+    INSERT INTO round_answers
+      (game_round_question_id, user_id, choice_id, is_correct, points_earned, response_time_ms)
+    VALUES (v_grq_id, p_user_id, p_choice_id, v_is_correct, v_points, p_response_time_ms)
+    ON CONFLICT (game_round_question_id, user_id) DO NOTHING
+    RETURNING id INTO v_answer_id;
+    IF v_answer_id IS NULL THEN
+        RETURN jsonb_build_object('status', 'already_answered');
+    END IF;
+
+    UPDATE game_participants
+    SET score = score + v_points
+    WHERE game_id = p_game_id AND user_id = p_user_id
+    RETURNING score INTO v_score;
+
+    UPDATE games
+    SET state_version = state_version + 1
+    WHERE id = p_game_id
+    RETURNING state_version INTO v_version;
+
+    RETURN jsonb_build_object(
+        'status', 'ok',
+        'is_correct', v_is_correct,
+        'points_earned', v_points,
+        'correct_choice_id', v_correct_choice_id,
+        'score', v_score,
+        'state_version', v_version
+    );
+END;
+$$ LANGUAGE plpgsql;
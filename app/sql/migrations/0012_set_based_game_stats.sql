@@ -0,0 +1,46 @@
+-- 0012: set-based game statistics
+
+-- fn_update_stats_after_game_complete (0002) looped over the participants and,
+-- for each of them, over the game's categories, issuing one UPDATE/INSERT per
+-- row. fn_record_game_stats does the same work in two statements, however many
+-- players and categories the game has. As before, user_stats rows are only
+-- updated (they are created at registration); user_category_stats rows are
+-- upserted.
+CREATE OR REPLACE FUNCTION fn_record_game_stats(p_game_id BIGINT, p_winner_id BIGINT) RETURNS VOID AS $$
+    -- SET expressions read the old row, so best_streak compares with the streak before this game
+    UPDATE user_stats us
+    SET games_played = us.games_played + 1,
+        games_won = us.games_won + CASE WHEN gp.user_id = p_winner_id THEN 1 ELSE 0 END,
+        current_streak = CASE WHEN gp.user_id = p_winner_id THEN us.current_streak + 1 ELSE 0 END,
+        best_streak = CASE WHEN gp.user_id = p_winner_id
+                           THEN GREATEST(us.best_streak, us.current_streak + 1)
+                           ELSE us.best_streak
+                      END,
+        highest_score = GREATEST(us.highest_score, gp.score),
+        last_played_at = NOW(),
+        stats_updated_at = NOW()
+    FROM game_participants gp
+    WHERE gp.game_id = p_game_id AND us.user_id = gp.user_id;
+
+    INSERT INTO user_category_stats (user_id, category_id, games_played, correct_answers, total_answers, total_points)
+    SELECT gp.user_id, c.category_id, 1, 0, 0, 0
+    FROM game_participants gp
+    CROSS JOIN (
+        SELECT DISTINCT category_id
+        FROM game_rounds
+        WHERE game_id = p_game_id AND category_id IS NOT NULL
+    ) c
+    WHERE gp.game_id = p_game_id
+    ON CONFLICT (user_id, category_id) DO UPDATE
+    SET games_played = user_category_stats.games_played + 1;
+$$ LANGUAGE sql;
+
+-- Same trigger (trg_after_update_games), set-based body
+CREATE OR REPLACE FUNCTION fn_update_stats_after_game_complete() RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.status = 'completed' AND OLD.status IS DISTINCT FROM NEW.status THEN
+        PERFORM fn_record_game_stats(NEW.id, NEW.winner_id);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
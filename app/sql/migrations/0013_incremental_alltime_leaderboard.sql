@@ -0,0 +1,60 @@
+-- 0013: incremental all-time leaderboard
+
+-- fn_refresh_alltime_leaderboard (0002) deleted the whole all-time board and
+-- re-inserted every user_stats row with a ROW_NUMBER() on each completed game:
+-- O(users) writes per game, and every completion wrote the same rows. Now a
+-- completed game upserts only its participants' rows, and only where the score
+-- changed. Ranks are no longer stored; the read endpoints compute them from
+-- the score index (RANK(): equal scores share a rank).
+
+-- One all-time row per user. The table's UNIQUE (user_id, scope, category_id)
+-- does not cover it: NULL category_ids never conflict.
+DELETE FROM leaderboards l
+USING leaderboards newer
+WHERE l.scope = 'alltime' AND l.category_id IS NULL
+  AND newer.scope = 'alltime' AND newer.category_id IS NULL
+  AND newer.user_id = l.user_id AND newer.id > l.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_leaderboards_alltime_user
+    ON leaderboards (user_id)
+    WHERE scope = 'alltime' AND category_id IS NULL;
+
+-- Top-N of a scope in score order (the list endpoint); user_id keeps ties in a stable order
+CREATE INDEX IF NOT EXISTS idx_leaderboards_scope_score
+    ON leaderboards (scope, score DESC, user_id);
+
+ALTER TABLE leaderboards ALTER COLUMN rank DROP NOT NULL;
+
+CREATE OR REPLACE FUNCTION fn_update_alltime_leaderboard(p_game_id BIGINT) RETURNS VOID AS $$
+    -- Runs after fn_record_game_stats has updated (and locked) the participants'
+    -- user_stats rows, so two games sharing a player upsert one after the other
+    -- and the later one reads the later total. Rows are locked in user_id order.
+    INSERT INTO leaderboards (user_id, scope, category_id, rank, score, generated_at)
+    SELECT us.user_id, 'alltime', NULL, NULL, us.total_points, NOW()
+    FROM game_participants gp
+    JOIN user_stats us ON us.user_id = gp.user_id
+    WHERE gp.game_id = p_game_id
+    ORDER BY us.user_id
+    ON CONFLICT (user_id) WHERE scope = 'alltime' AND category_id IS NULL
+    DO UPDATE SET score = EXCLUDED.score, generated_at = EXCLUDED.generated_at
+    WHERE leaderboards.score IS DISTINCT FROM EXCLUDED.score;
+$$ LANGUAGE sql;
+
+-- Same trigger (trg_refresh_alltime_lb, fires after trg_after_update_games)
+CREATE OR REPLACE FUNCTION fn_refresh_alltime_leaderboard() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.status = 'completed' AND OLD.status IS DISTINCT FROM NEW.status THEN
+        PERFORM fn_update_alltime_leaderboard(NEW.id);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Bring the board up to date once; from here on only changed rows are written
+UPDATE leaderboards SET rank = NULL WHERE scope = 'alltime' AND category_id IS NULL;
+INSERT INTO leaderboards (user_id, scope, category_id, rank, score, generated_at)
+SELECT user_id, 'alltime', NULL, NULL, total_points, NOW()
+FROM user_stats
+ON CONFLICT (user_id) WHERE scope = 'alltime' AND category_id IS NULL
+DO UPDATE SET score = EXCLUDED.score, generated_at = EXCLUDED.generated_at
+WHERE leaderboards.score IS DISTINCT FROM EXCLUDED.score;
@@ -0,0 +1,111 @@
+-- 0014: statement-level triggers on round_answers
+
+-- Every inserted answer fired three row-level triggers: user_stats (0002),
+-- user_category_stats with a category lookup (0002) and the round's
+-- answer_count (0011). A batch of answers (the answer ingest's INSERT ... SELECT)
+-- paid each of them once per row. The statement-level triggers below read the
+-- inserted rows from a transition table and apply one aggregated UPDATE/upsert
+-- per table, whatever the batch size. A single answer (fn_submit_answer) is a
+-- batch of one. Rows skipped by ON CONFLICT DO NOTHING are not in the
+-- transition table, so they still count nothing.
+
+DROP TRIGGER IF EXISTS trg_after_insert_round_answers ON round_answers;
+DROP TRIGGER IF EXISTS trg_after_insert_round_answers_cat ON round_answers;
+DROP TRIGGER IF EXISTS trg_count_round_answers ON round_answers;
+DROP FUNCTION IF EXISTS fn_update_user_stats_on_answer();
+DROP FUNCTION IF EXISTS fn_update_user_category_stats_on_answer();
+DROP FUNCTION IF EXISTS fn_count_round_answers();
+
+CREATE OR REPLACE FUNCTION fn_update_user_stats_on_answers() RETURNS TRIGGER AS $$
+BEGIN
+    -- The average is updated once per statement over the batch's response times
+    UPDATE user_stats us
+    SET total_answers = us.total_answers + a.answers,
+        correct_answers = us.correct_answers + a.correct,
+        total_points = us.total_points + a.points,
+        average_response_time_ms =
+            (COALESCE(us.average_response_time_ms, 0) * us.total_answers + a.response_time_ms) / (us.total_answers + a.answers),
+        stats_updated_at = NOW()
+    FROM (
+        SELECT user_id,
+               COUNT(*) AS answers,
+               COUNT(*) FILTER (WHERE is_correct) AS correct,
+               SUM(points_earned) AS points,
+               SUM(response_time_ms) AS response_time_ms
+        FROM new_answers
+        GROUP BY user_id
+    ) a
+    WHERE us.user_id = a.user_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_after_insert_round_answers
+AFTER INSERT ON round_answers
+REFERENCING NEW TABLE AS new_answers
+FOR EACH STATEMENT
+EXECUTE FUNCTION fn_update_user_stats_on_answers();
+
+CREATE OR REPLACE FUNCTION fn_update_user_category_stats_on_answers() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO user_category_stats (user_id, category_id, games_played, correct_answers, total_answers, total_points)
+    SELECT na.user_id, gr.category_id, 0,
+           COUNT(*) FILTER (WHERE na.is_correct), COUNT(*), SUM(na.points_earned)
+    FROM new_answers na
+    JOIN game_round_questions grq ON grq.id = na.game_round_question_id
+    JOIN game_rounds gr ON gr.id = grq.game_round_id
+    GROUP BY na.user_id, gr.category_id
+    ORDER BY na.user_id, gr.category_id
+    ON CONFLICT (user_id, category_id) DO UPDATE
+    SET
+        correct_answers = user_category_stats.correct_answers + EXCLUDED.correct_answers,
+        total_answers   = user_category_stats.total_answers + EXCLUDED.total_answers,
+        total_points    = user_category_stats.total_points + EXCLUDED.total_points;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_after_insert_round_answers_cat
+AFTER INSERT ON round_answers
+REFERENCING NEW TABLE AS new_answers
+FOR EACH STATEMENT
+EXECUTE FUNCTION fn_update_user_category_stats_on_answers();
+
+-- game_rounds.answer_count (0011). A trigger with a transition table has one
+-- event, so inserts and deletes get one trigger each.
+CREATE OR REPLACE FUNCTION fn_count_round_answers_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE game_rounds gr SET answer_count = gr.answer_count + c.answers
+        FROM (
+            SELECT grq.game_round_id, COUNT(*) AS answers
+            FROM new_answers na
+            JOIN game_round_questions grq ON grq.id = na.game_round_question_id
+            GROUP BY grq.game_round_id
+        ) c
+        WHERE gr.id = c.game_round_id;
+    ELSE
+        UPDATE game_rounds gr SET answer_count = gr.answer_count - c.answers
+        FROM (
+            SELECT grq.game_round_id, COUNT(*) AS answers
+            FROM old_answers oa
+            JOIN game_round_questions grq ON grq.id = oa.game_round_question_id
+            GROUP BY grq.game_round_id
+        ) c
+        WHERE gr.id = c.game_round_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_count_round_answers_insert
+AFTER INSERT ON round_answers
+REFERENCING NEW TABLE AS new_answers
+FOR EACH STATEMENT
+EXECUTE FUNCTION fn_count_round_answers_changed();
+
+CREATE TRIGGER trg_count_round_answers_delete
+AFTER DELETE ON round_answers
+REFERENCING OLD TABLE AS old_answers
+FOR EACH STATEMENT
+EXECUTE FUNCTION fn_count_round_answers_changed();
@@ -0,0 +1,105 @@
+-- 0015: statistics through an outbox
+
+-- user_stats, user_category_stats and the all-time leaderboard were updated
+-- inside every answer and game-completion transaction, so all of them queued
+-- on the same stats rows. The triggers now append one event per statement to
+-- stats_outbox instead. The stats worker (app/stats_worker.py) applies the
+-- events in batches. games.*, game_participants.score and the round counters
+-- (0011, 0014) stay synchronous: the game itself depends on them.
+
+CREATE TABLE IF NOT EXISTS stats_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    -- Transaction that wrote the event: ids are taken in insert order but
+    -- committed in any order, so the consumer reads in (txid, id) order and only
+    -- below the oldest running transaction (see stats_worker.NEXT_EVENTS)
+    txid BIGINT NOT NULL DEFAULT txid_current(),
+    kind VARCHAR(20) NOT NULL CHECK (kind IN ('answers', 'game_completed')),
+    payload JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_stats_outbox_txid_id ON stats_outbox (txid, id);
+
+-- Position of each consumer, moved in the transaction that applies the events
+CREATE TABLE IF NOT EXISTS stats_checkpoint (
+    consumer VARCHAR(50) PRIMARY KEY,
+    last_txid BIGINT NOT NULL DEFAULT 0,
+    last_id BIGINT NOT NULL DEFAULT 0,
+    processed_total BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO stats_checkpoint (consumer) VALUES ('stats_worker') ON CONFLICT DO NOTHING;
+
+-- Wake the workers; notifications are sent at commit, one per channel and transaction
+CREATE OR REPLACE FUNCTION fn_notify_stats_outbox() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('stats_outbox', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notify_stats_outbox ON stats_outbox;
+CREATE TRIGGER trg_notify_stats_outbox
+AFTER INSERT ON stats_outbox
+FOR EACH STATEMENT
+EXECUTE FUNCTION fn_notify_stats_outbox();
+
+-- Answers: one event per statement with the inserted answers summed per user and category
+DROP TRIGGER IF EXISTS trg_after_insert_round_answers ON round_answers;
+DROP TRIGGER IF EXISTS trg_after_insert_round_answers_cat ON round_answers;
+DROP FUNCTION IF EXISTS fn_update_user_stats_on_answers();
+DROP FUNCTION IF EXISTS fn_update_user_category_stats_on_answers();
+
+CREATE OR REPLACE FUNCTION fn_outbox_answers() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO stats_outbox (kind, payload)
+    SELECT 'answers', jsonb_agg(a)
+    FROM (
+        SELECT na.user_id, gr.category_id,
+               COUNT(*) AS answers,
+               COUNT(*) FILTER (WHERE na.is_correct) AS correct,
+               SUM(na.points_earned) AS points,
+               SUM(na.response_time_ms) AS response_time_ms
+        FROM new_answers na
+        JOIN game_round_questions grq ON grq.id = na.game_round_question_id
+        JOIN game_rounds gr ON gr.id = grq.game_round_id
+        GROUP BY na.user_id, gr.category_id
+    ) a
+    HAVING COUNT(*) > 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_outbox_answers
+AFTER INSERT ON round_answers
+REFERENCING NEW TABLE AS new_answers
+FOR EACH STATEMENT
+EXECUTE FUNCTION fn_outbox_answers();
+
+-- Completed games: same trigger (trg_after_update_games), the worker calls
+-- fn_record_game_stats (0012) in outbox order, so streaks stay in game order
+CREATE OR REPLACE FUNCTION fn_update_stats_after_game_complete() RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.status = 'completed' AND OLD.status IS DISTINCT FROM NEW.status THEN
+        INSERT INTO stats_outbox (kind, payload)
+        VALUES ('game_completed', jsonb_build_object('game_id', NEW.id, 'winner_id', NEW.winner_id));
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The worker updates the all-time rows of every user whose points it changed
+DROP TRIGGER IF EXISTS trg_refresh_alltime_lb ON games;
+DROP FUNCTION IF EXISTS fn_refresh_alltime_leaderboard();
+
+CREATE OR REPLACE FUNCTION fn_update_alltime_leaderboard_users(p_user_ids BIGINT[]) RETURNS VOID AS $$
+    INSERT INTO leaderboards (user_id, scope, category_id, rank, score, generated_at)
+    SELECT us.user_id, 'alltime', NULL, NULL, us.total_points, NOW()
+    FROM user_stats us
+    WHERE us.user_id = ANY(p_user_ids)
+    ORDER BY us.user_id
+    ON CONFLICT (user_id) WHERE scope = 'alltime' AND category_id IS NULL
+    DO UPDATE SET score = EXCLUDED.score, generated_at = EXCLUDED.generated_at
+    WHERE leaderboards.score IS DISTINCT FROM EXCLUDED.score;
+$$ LANGUAGE sql;
@@ -0,0 +1,268 @@
+-- =================================================================
+-- PvP Quiz App - Comprehensive Seeding Script (Corrected)
+-- =================================================================
+-- This script populates the database with a large, consistent set of
+-- sample data to simulate real application usage.
+--
+-- IMPORTANT:
+-- 1. Run this script AFTER applying the migrations (flask db upgrade).
+-- 2. This script assumes the 'questions' and 'question_choices'
+--    tables are already populated with data (e.g., from your import script).
+--    It references question IDs from 1 to 100.
+-- 3. It is idempotent: you can run it multiple times. It will
+--    clear old data before inserting new data.
+-- =================================================================
+
+-- =====================================================
+-- A) 100 Users
+-- =====================================================
+
+
+
+
+-- CREATE EXTENSION IF NOT EXISTS pgcrypto;
+
+
+-- INSERT INTO users (username, email, password_hash, avatar, role, current_level, total_xp)
+-- SELECT
+--   'user' || i,
+--   'user' || i || '@example.com',
+--   crypt('P@ssw0rd' || i, gen_salt('bf')),
+--   'https://i.pravatar.cc/150?img=' || (i % 70),
+--   CASE WHEN i = 1 THEN 'admin' WHEN i % 10 = 0 THEN 'moderator' ELSE 'user' END,
+--   (random()*20 + 1)::int,
+--   (random()*10000)::bigint
+-- FROM generate_series(1,100) AS s(i);
+
+-- -- =====================================================
+-- -- B) 10 Categories
+-- -- =====================================================
+-- INSERT INTO categories (name, description)
+-- SELECT
+--   'Category ' || i,
+--   'This is a description for Category ' || i
+-- FROM generate_series(1,10) AS s(i);
+
+-- -- =====================================================
+-- -- C) 3 Game Types
+-- -- =====================================================
+
+-- -- =====================================================
+-- -- D) 50 Games
+-- -- =====================================================
+-- INSERT INTO games (game_type_id, status, start_time, end_time, winner_id)
+-- SELECT
+--   (random()*2 + 1)::int,                          -- 1–3
+--   CASE WHEN random() < 0.7 THEN 'completed' ELSE 'active' END,
+--   NOW() - ((random()*10)::int || ' days')::interval,
+--   CASE WHEN random() < 0.7
+--        THEN NOW() - ((random()*9)::int || ' days')::interval
+--        ELSE NULL END,
+--   CASE WHEN random() < 0.7
+--        THEN (random()*99 + 1)::bigint
+--        ELSE NULL END
+-- FROM generate_series(1,50) AS s(i);
+
+-- -- =====================================================
+-- -- E) 100 Match‑Queue Entries
+-- -- =====================================================
+-- INSERT INTO match_queue (user_id, game_type_id, enqueued_at)
+-- SELECT
+--   (random()*99 + 1)::bigint,
+--   (random()*2 + 1)::int,
+--   NOW() - ((random()*5)::int || ' hours')::interval
+-- FROM generate_series(1,100) AS s(i);
+
+-- -- =====================================================
+-- -- F) Game Participants (2 per completed game, 4 for Royale)
+-- -- =====================================================
+-- -- F) Game Participants (2 per classic/speed game, 4 for Royale)
+-- WITH gs AS (
+--   SELECT g.id   AS game_id,
+--          g.game_type_id
+--   FROM games g
+--   WHERE g.status IN ('active','completed')
+-- )
+-- INSERT INTO game_participants (game_id, user_id, join_time, score, status)
+-- SELECT
+--   gs.game_id,
+--   u.rnd_user_id,
+--   NOW() - FLOOR(random()*3600)::int * INTERVAL '1 second',
+--   FLOOR(random()*500)::int,
+--   CASE
+--     WHEN gs.game_type_id = 3 THEN
+--       CASE CEIL(random()*3)::int
+--         WHEN 1 THEN 'active'
+--         WHEN 2 THEN 'finished'
+--         WHEN 3 THEN 'disconnected'
+--       END
+--     ELSE 'finished'
+--   END
+-- FROM gs
+-- JOIN LATERAL (
+--   SELECT usr.id AS rnd_user_id
+--   FROM users usr
+--   ORDER BY random()
+--   LIMIT CASE WHEN gs.game_type_id = 3 THEN 4 ELSE 2 END
+-- ) AS u ON true;
+
+
+
+-- -- =====================================================
+-- -- G) Game Rounds
+-- -- =====================================================
+-- INSERT INTO game_rounds (
+--   game_id,
+--   round_number,
+--   category_id,
+--   category_picker_id,
+--   start_time,
+--   end_time,
+--   status,
+--   time_limit_seconds,
+--   points_possible
+-- )
+-- SELECT
+--   g.game_id,                                          -- fully qualified
+--   r.round_num,                                        -- alias the series
+--   (random()*9 + 1)::int,                              -- random category
+--   (random()*99 + 1)::bigint,                          -- random picker
+--   g.start_time + ((r.round_num - 1) * INTERVAL '2 minutes'),
+--   g.start_time + ((r.round_num - 1) * INTERVAL '2 minutes' + INTERVAL '90 seconds'),
+--   CASE WHEN g.status = 'completed' THEN 'completed' ELSE 'pending' END,
+--   90,
+--   100
+-- FROM (
+--   SELECT
+--     gm.id           AS game_id,       -- alias games.id
+--     gm.start_time   AS start_time,
+--     gm.status       AS status,
+--     gt.total_rounds AS total_rounds
+--   FROM games   AS gm
+--   JOIN game_types AS gt
+--     ON gm.game_type_id = gt.id
+-- ) AS g
+-- CROSS JOIN LATERAL (
+--   SELECT generate_series(1, g.total_rounds) AS round_num
+-- ) AS r;
+
+
+-- -- =====================================================
+-- -- H) Game Round Questions (3 per round)
+-- -- =====================================================
+-- INSERT INTO game_round_questions (game_round_id, question_id)
+-- SELECT
+--   gr.id      AS game_round_id,
+--   q.id       AS question_id
+-- FROM game_rounds AS gr
+-- JOIN LATERAL (
+--   -- select 3 distinct question IDs at random
+--   SELECT id
+--   FROM questions
+--   ORDER BY random()
+--   LIMIT 3
+-- ) AS q ON TRUE
+-- ON CONFLICT (game_round_id, question_id) DO NOTHING;
+
+-- -- =====================================================
+-- -- I) Round Answers (each participant answers each question)
+-- -- =====================================================
+-- INSERT INTO round_answers (game_round_question_id, user_id, choice_id, answer_time, response_time_ms, is_correct, points_earned)
+-- SELECT
+--   grq.id,
+--   gp.user_id,
+--   -- pick one of the four choices for that question at random:
+--   (SELECT id
+--    FROM question_choices
+--    WHERE question_id = grq.question_id
+--    ORDER BY random() LIMIT 1),
+--   gr.start_time + (random()*90)::int * '1 second'::interval,
+--   (random()*2000)::int,
+--   (random() < 0.5),
+--   CASE WHEN random() < 0.5 THEN 100 ELSE 0 END
+-- FROM game_round_questions grq
+-- JOIN game_rounds gr   ON grq.game_round_id = gr.id
+-- JOIN game_participants gp ON gr.game_id = gp.game_id;
+
+-- -- =====================================================
+-- -- J) Initialize User Stats (one row per user)
+-- -- =====================================================
+-- INSERT INTO user_stats (user_id)
+-- SELECT id FROM users
+-- ON CONFLICT (user_id) DO NOTHING;
+
+-- -- =====================================================
+-- -- K) Initialize Leaderboards (all‑time)
+-- -- =====================================================
+-- WITH latest_points AS (
+--   SELECT user_id, total_points
+--   FROM user_stats
+-- )
+-- INSERT INTO leaderboards (user_id, scope, category_id, rank, score)
+-- SELECT
+--   user_id,
+--   'alltime',
+--   NULL,
+--   ROW_NUMBER() OVER (ORDER BY total_points DESC),
+--   total_points       -- ← use total_points here, not score
+-- FROM latest_points;
+
+
+-- -- =====================================================
+-- -- L) Chat Rooms & Messages
+-- -- =====================================================
+-- -- L1) Create a public global room and one per game
+-- INSERT INTO chat_rooms (name, type, game_id)
+-- VALUES
+--   ('Global Chat','public',NULL)
+-- ;
+-- INSERT INTO chat_rooms (name, type, game_id)
+-- SELECT 'Game Chat #'||id,'game',id
+-- FROM games;
+
+-- -- L2) Room Members: all participants plus 20 random users in global
+-- -- Global + per‑game members, idempotent
+-- INSERT INTO chat_room_members (room_id, user_id, joined_at)
+-- SELECT
+--   (SELECT id FROM chat_rooms WHERE name = 'Global Chat'),
+--   (random()*99 + 1)::bigint,
+--   NOW() - ((random()*7)::int || ' days')::interval
+-- FROM generate_series(1,20)
+-- ON CONFLICT (room_id, user_id) DO NOTHING;
+
+-- INSERT INTO chat_room_members (room_id, user_id, joined_at)
+-- SELECT
+--   cr.id,
+--   gp.user_id,
+--   gp.join_time
+-- FROM chat_rooms cr
+-- JOIN game_participants gp ON cr.game_id = gp.game_id
+-- WHERE cr.type = 'game'
+-- ON CONFLICT (room_id, user_id) DO NOTHING;
+
+
+-- -- L3) Chat Messages: ~ 10 per room
+-- INSERT INTO chat_messages (room_id, sender_id, message, sent_at, is_read)
+-- SELECT
+--   cr.id,
+--   CASE
+--     WHEN cr.type = 'game' THEN
+--       (SELECT gp.user_id
+--        FROM game_participants gp
+--        WHERE gp.game_id = cr.game_id
+--        ORDER BY random()
+--        LIMIT 1)
+--     ELSE
+--       (SELECT id
+--        FROM users
+--        ORDER BY random()
+--        LIMIT 1)
+--   END AS sender_id,
+--   'Sample message #' || floor(random()*1000)::int,
+--   NOW() - ((random()*3600)::int * INTERVAL '1 second'),
+--   (random() < 0.5)
+-- FROM chat_rooms cr
+-- CROSS JOIN generate_series(1,10) AS s(i);
+
+
+-- COMMIT;
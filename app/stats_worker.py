@@ -0,0 +1,303 @@
+"""
+Asynchronous statistics: the stats worker applies the events of ``stats_outbox``.
+
+Answers and completed games no longer update user_stats, user_category_stats
+and the all-time leaderboard in their own transactions. Triggers append one
+event per statement to ``stats_outbox`` (migration 0015), and the worker
+applies the events in batches:
+
+- ``answers`` events are summed per user and per (user, category) and applied
+  with one UPDATE and one upsert per batch.
+- ``game_completed`` events run fn_record_game_stats (migration 0012) one game
+  at a time in outbox order, so win streaks follow the order of the games.
+- The all-time leaderboard rows of every user the batch touched are upserted
+  last.
+
+Ordering and checkpoints: outbox ids are taken at insert but committed in any
+order, so the worker reads in (txid, id) order and only events of transactions
+older than the oldest one still running; an event that commits later can then
+never sort before the checkpoint. The checkpoint row in ``stats_checkpoint`` is
+locked for the batch and moved in the same transaction that applies it, so a
+batch is applied exactly once and only one worker consumes at a time (the
+others skip the locked row).
+
+Wake-ups: an insert into the outbox sends NOTIFY ``stats_outbox`` at commit.
+The worker LISTENs on a connection of its own and also polls every
+``STATS_WORKER_POLL_SECONDS``, for notifications missed while reconnecting
+and for events held back by a long-running transaction.
+``flask stats drain`` applies everything pending and ``flask stats status``
+prints the checkpoint and the lag.
+"""
+
+import select
+import threading
+import time
+
+import click
+import psycopg2
+import psycopg2.extensions
+from flask import current_app
+from flask.cli import with_appcontext
+
+from .db import get_db, transaction
+
+CONSUMER = 'stats_worker'
+CHANNEL = 'stats_outbox'
+
+LOCK_CHECKPOINT = """
+    SELECT last_txid, last_id FROM stats_checkpoint WHERE consumer = %s FOR UPDATE SKIP LOCKED
+"""
+# Transactions below the snapshot's xmin are all finished: their events are final
+NEXT_EVENTS = """
+    SELECT id, txid, kind, payload
+    FROM stats_outbox
+    WHERE (txid, id) > (%s, %s)
+      AND txid < txid_snapshot_xmin(txid_current_snapshot())
+    ORDER BY txid, id
+    LIMIT %s
+"""
+# Users or categories deleted since the event was written are skipped
+APPLY_ANSWERS = """
+    WITH answers AS (
+        SELECT (a->>'user_id')::bigint AS user_id,
+               (a->>'category_id')::int AS category_id,
+               (a->>'answers')::int AS answers,
+               (a->>'correct')::int AS correct,
+               (a->>'points')::bigint AS points,
+               (a->>'response_time_ms')::bigint AS response_time_ms
+        FROM stats_outbox o
+        CROSS JOIN jsonb_array_elements(o.payload) AS a
+        WHERE o.id = ANY(%s) AND o.kind = 'answers'
+    ), per_user AS (
+        SELECT user_id, SUM(answers) AS answers, SUM(correct) AS correct,
+               SUM(points) AS points, SUM(response_time_ms) AS response_time_ms
+        FROM answers
+        GROUP BY user_id
+    ), users_updated AS (
+        UPDATE user_stats us
+        SET total_answers = us.total_answers + a.answers,
+            correct_answers = us.correct_answers + a.correct,
+            total_points = us.total_points + a.points,
+            average_response_time_ms =
+                (COALESCE(us.average_response_time_ms, 0) * us.total_answers + a.response_time_ms) / (us.total_answers + a.answers),
+            stats_updated_at = NOW()
+        FROM per_user a
+        WHERE us.user_id = a.user_id
+        RETURNING us.user_id
+    ), categories_updated AS (
+        INSERT INTO user_category_stats (user_id, category_id, games_played, correct_answers, total_answers, total_points)
+        SELECT a.user_id, a.category_id, 0, SUM(a.correct), SUM(a.answers), SUM(a.points)
+        FROM answers a
+        JOIN users u ON u.id = a.user_id
+        JOIN categories c ON c.id = a.category_id
+        GROUP BY a.user_id, a.category_id
+        ORDER BY a.user_id, a.category_id
+        ON CONFLICT (user_id, category_id) DO UPDATE
+        SET correct_answers = user_category_stats.correct_answers + EXCLUDED.correct_answers,
+            total_answers   = user_category_stats.total_answers + EXCLUDED.total_answers,
+            total_points    = user_category_stats.total_points + EXCLUDED.total_points
+        RETURNING user_id
+    )
+    SELECT user_id FROM users_updated
+"""
+GAME_PARTICIPANTS = "SELECT DISTINCT user_id FROM game_participants WHERE game_id = ANY(%s)"
+MOVE_CHECKPOINT = """
+    UPDATE stats_checkpoint
+    SET last_txid = %s, last_id = %s, processed_total = processed_total + %s, updated_at = NOW()
+    WHERE consumer = %s
+"""
+LAG = """
+    SELECT c.processed_total,
+           COUNT(o.id) AS events,
+           COALESCE(EXTRACT(EPOCH FROM LOCALTIMESTAMP - MIN(o.created_at)), 0) AS seconds
+    FROM stats_checkpoint c
+    LEFT JOIN stats_outbox o ON (o.txid, o.id) > (c.last_txid, c.last_id)
+    WHERE c.consumer = %s
+    GROUP BY c.processed_total
+"""
+# Applied events are kept for a while for inspection, then deleted
+PRUNE = """
+    DELETE FROM stats_outbox o
+    USING stats_checkpoint c
+    WHERE c.consumer = %s AND (o.txid, o.id) <= (c.last_txid, c.last_id)
+      AND o.created_at < LOCALTIMESTAMP - make_interval(hours => %s)
+"""
+
+
+def process_batch(conn, batch_size=500):
+    """
+    Apply up to ``batch_size`` outbox events in one transaction. Returns the
+    number applied, or None if another worker holds the checkpoint.
+    """
+    with transaction(conn) as cur:
+        cur.execute(LOCK_CHECKPOINT, (CONSUMER,))
+        checkpoint = cur.fetchone()
+        if checkpoint is None:
+            return None
+        cur.execute(NEXT_EVENTS, (checkpoint['last_txid'], checkpoint['last_id'], batch_size))
+        events = cur.fetchall()
+        if not events:
+            return 0
+
+        answer_ids = [e['id'] for e in events if e['kind'] == 'answers']
+        games = [e['payload'] for e in events if e['kind'] == 'game_completed']
+        touched = set()
+        if answer_ids:
+            cur.execute(APPLY_ANSWERS, (answer_ids,))
+            touched.update(row['user_id'] for row in cur.fetchall())
+        for game in games:
+            cur.execute("SELECT fn_record_game_stats(%s, %s)", (game['game_id'], game['winner_id']))
+        if games:
+            cur.execute(GAME_PARTICIPANTS, ([game['game_id'] for game in games],))
+            touched.update(row['user_id'] for row in cur.fetchall())
+        if touched:
+            cur.execute("SELECT fn_update_alltime_leaderboard_users(%s::bigint[])", (sorted(touched),))
+
+        last = events[-1]
+        cur.execute(MOVE_CHECKPOINT, (last['txid'], last['id'], len(events), CONSUMER))
+    return len(events)
+
+
+def drain(conn, batch_size=500):
+    """Apply batches until the outbox is caught up; returns the number of events applied"""
+    applied = 0
+    while True:
+        count = process_batch(conn, batch_size)
+        if not count:
+            return applied
+        applied += count
+        if count < batch_size:
+            return applied
+
+
+def lag(conn):
+    """Events not applied yet and the age of the oldest one in seconds"""
+    with transaction(conn) as cur:
+        cur.execute(LAG, (CONSUMER,))
+        row = cur.fetchone()
+    if row is None:
+        return {'events': None, 'seconds': None, 'processed_total': None}
+    return {'events': row['events'], 'seconds': round(float(row['seconds']), 3),
+            'processed_total': row['processed_total']}
+
+
+def prune(conn, retention_hours):
+    with transaction(conn) as cur:
+        cur.execute(PRUNE, (CONSUMER, retention_hours))
+        return cur.rowcount
+
+
+class StatsWorker:
+    """Counters of this worker's stats loop, reported by /health"""
+
+    def __init__(self):
+        self.applied_total = 0
+        self.batches_total = 0
+        self.last_run = None
+        self.lag = {'events': None, 'seconds': None}
+
+    def stats(self):
+        return {'applied_total': self.applied_total, 'batches_total': self.batches_total,
+                'last_run': self.last_run, 'lag_events': self.lag['events'], 'lag_seconds': self.lag['seconds']}
+
+
+def get_worker():
+    """The stats worker of the current app, or None when STATS_WORKER_ENABLED is off"""
+    return current_app.extensions.get('stats_worker')
+
+
+def _listen(app):
+    """A connection of its own (not pooled) that LISTENs on the outbox channel"""
+    config = app.config
+    conn = psycopg2.connect(
+        host=config['DB_HOST'], port=config['DB_PORT'], dbname=config['DB_NAME'],
+        user=config['DB_USER'], password=config['DB_PASSWORD'],
+    )
+    conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    with conn.cursor() as cur:
+        cur.execute(f"LISTEN {CHANNEL}")
+    return conn
+
+
+def _run(app, worker):
+    batch_size = app.config.get('STATS_WORKER_BATCH_SIZE', 500)
+    poll_seconds = app.config.get('STATS_WORKER_POLL_SECONDS', 1.0)
+    retention_hours = app.config.get('STATS_OUTBOX_RETENTION_HOURS', 24)
+    listener = None
+    next_prune = 0.0
+    while True:
+        try:
+            if listener is None:
+                listener = _listen(app)
+            with app.app_context():
+                conn = get_db()
+                while True:
+                    count = process_batch(conn, batch_size)
+                    if not count:
+                        break
+                    worker.applied_total += count
+                    worker.batches_total += 1
+                    if count < batch_size:
+                        break
+                worker.lag = lag(conn)
+                worker.last_run = time.time()
+                if time.monotonic() >= next_prune:
+                    prune(conn, retention_hours)
+                    next_prune = time.monotonic() + 600
+
+            # Sleep until a NOTIFY arrives or the poll interval passes
+            if select.select([listener], [], [], poll_seconds)[0]:
+                listener.poll()
+                listener.notifies.clear()
+        except Exception as e:
+            app.logger.error(f"Stats worker failed: {e}")
+            if listener is not None:
+                try:
+                    listener.close()
+                except Exception:
+                    pass
+                listener = None
+            time.sleep(poll_seconds)
+
+
+@click.group('stats')
+def stats_cli():
+    """Statistics outbox."""
+
+
+@stats_cli.command('drain')
+@click.option('--batch-size', type=int, default=500, show_default=True)
+@with_appcontext
+def drain_command(batch_size):
+    """Apply all pending outbox events."""
+    applied = drain(get_db(), batch_size)
+    click.echo(f'Applied {applied} event(s).')
+
+
+@stats_cli.command('status')
+@with_appcontext
+def status_command():
+    """Show the applied total and the lag of the stats worker."""
+    current = lag(get_db())
+    click.echo(f"applied {current['processed_total']}, pending {current['events']}, "
+               f"oldest pending {current['seconds']} s")
+
+
+def init_app(app, socketio):
+    """Register the stats commands; start the worker with the first request (when STATS_WORKER_ENABLED)"""
+    app.cli.add_command(stats_cli)
+    if not app.config.get('STATS_WORKER_ENABLED'):
+        return
+    worker = StatsWorker()
+    app.extensions['stats_worker'] = worker
+    started = threading.Event()
+    start_lock = threading.Lock()
+
+    @app.before_request
+    def _start_stats_worker():
+        if started.is_set():
+            return
+        with start_lock:
+            if not started.is_set():
+                started.set()
+                socketio.start_background_task(_run, app, worker)
@@ -0,0 +1 @@
+"""Performance benchmarks. Each module is runnable with ``python -m benchmarks.<name>``."""
@@ -0,0 +1,159 @@
+"""
+Inserting answers with the row-level triggers of migrations 0002/0011 vs the
+current statement-level triggers (answer counter, 0014; one stats outbox
+event per statement, 0015), for a single answer and for a batch like the
+answer ingest's.
+
+The previous triggers are recreated inside each run's transaction, so the
+database keeps the current ones. Both paths insert the same answers into a
+fresh round (untimed setup) and every run is rolled back.
+
+    python -m benchmarks.bench_answer_triggers --iterations 200
+"""
+
+import click
+
+from app.db import get_db
+from benchmarks.common import app_context, time_ops, summarize, print_table
+
+ROW_LEVEL_TRIGGERS = """
+    DROP TRIGGER IF EXISTS trg_after_insert_round_answers ON round_answers;
+    DROP TRIGGER IF EXISTS trg_after_insert_round_answers_cat ON round_answers;
+    DROP TRIGGER IF EXISTS trg_outbox_answers ON round_answers;
+    DROP TRIGGER trg_count_round_answers_insert ON round_answers;
+
+    CREATE FUNCTION pg_temp.legacy_user_stats() RETURNS TRIGGER AS $$
+    BEGIN
+        UPDATE user_stats
+        SET
+            total_answers = user_stats.total_answers + 1,
+            correct_answers = user_stats.correct_answers + CASE WHEN NEW.is_correct THEN 1 ELSE 0 END,
+            total_points = user_stats.total_points + NEW.points_earned,
+            average_response_time_ms =
+                (COALESCE(user_stats.average_response_time_ms, 0) * user_stats.total_answers + NEW.response_time_ms) / (user_stats.total_answers + 1),
+            stats_updated_at = NOW()
+        WHERE user_id = NEW.user_id;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE FUNCTION pg_temp.legacy_category_stats() RETURNS TRIGGER AS $$
+    DECLARE
+        v_category_id INTEGER;
+    BEGIN
+        SELECT gr.category_id INTO v_category_id
+        FROM game_round_questions grq
+        JOIN game_rounds gr ON gr.id = grq.game_round_id
+        WHERE grq.id = NEW.game_round_question_id;
+
+        INSERT INTO user_category_stats (user_id, category_id, games_played, correct_answers, total_answers, total_points)
+        VALUES (NEW.user_id, v_category_id, 0, CASE WHEN NEW.is_correct THEN 1 ELSE 0 END, 1, NEW.points_earned)
+        ON CONFLICT (user_id, category_id) DO UPDATE
+        SET
+            correct_answers = user_category_stats.correct_answers + EXCLUDED.correct_answers,
+            total_answers   = user_category_stats.total_answers + EXCLUDED.total_answers,
+            total_points    = user_category_stats.total_points + EXCLUDED.total_points;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE FUNCTION pg_temp.legacy_count_answers() RETURNS TRIGGER AS $$
+    BEGIN
+        UPDATE game_rounds SET answer_count = answer_count + 1
+        WHERE id = (SELECT game_round_id FROM game_round_questions WHERE id = NEW.game_round_question_id);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER legacy_user_stats AFTER INSERT ON round_answers
+    FOR EACH ROW EXECUTE FUNCTION pg_temp.legacy_user_stats();
+    CREATE TRIGGER legacy_category_stats AFTER INSERT ON round_answers
+    FOR EACH ROW EXECUTE FUNCTION pg_temp.legacy_category_stats();
+    CREATE TRIGGER legacy_count_answers AFTER INSERT ON round_answers
+    FOR EACH ROW EXECUTE FUNCTION pg_temp.legacy_count_answers();
+"""
+
+INSERT_ANSWERS = """
+    INSERT INTO round_answers
+      (game_round_question_id, user_id, choice_id, is_correct, points_earned, response_time_ms)
+    SELECT grq.id, u.id, qc.id, qc.is_correct, CASE WHEN qc.is_correct THEN 100 ELSE 0 END, 1000 + u.id %% 5000
+    FROM game_round_questions grq
+    CROSS JOIN unnest(%s::bigint[]) AS u(id)
+    JOIN LATERAL (
+        SELECT id, is_correct FROM question_choices
+        WHERE question_id = grq.question_id
+        ORDER BY id
+        OFFSET u.id %% 4 LIMIT 1
+    ) qc ON TRUE
+    WHERE grq.game_round_id = %s
+"""
+
+
+def create_round(cur, user_ids, category_id, questions):
+    """An active round of ``questions`` questions whose players are ``user_ids``; returns its id"""
+    cur.execute("INSERT INTO games (game_type_id, status) VALUES (1, 'active') RETURNING id")
+    game_id = cur.fetchone()['id']
+    cur.execute("""
+        INSERT INTO game_participants (game_id, user_id)
+        SELECT %s, uid FROM unnest(%s::bigint[]) AS uid
+    """, (game_id, user_ids))
+    cur.execute("INSERT INTO user_stats (user_id) SELECT unnest(%s::bigint[]) ON CONFLICT DO NOTHING", (user_ids,))
+    cur.execute("""
+        INSERT INTO game_rounds (game_id, round_number, category_id, status)
+        VALUES (%s, 1, %s, 'active') RETURNING id
+    """, (game_id, category_id))
+    round_id = cur.fetchone()['id']
+    cur.execute("""
+        INSERT INTO game_round_questions (game_round_id, question_id)
+        SELECT %s, id FROM questions WHERE category_id = %s ORDER BY random() LIMIT %s
+    """, (round_id, category_id, questions))
+    return round_id
+
+
+@click.command()
+@click.option('--iterations', default=200, show_default=True, help='Inserts per path and batch size')
+@click.option('--players', default=50, show_default=True, help='Players of the batch round')
+@click.option('--questions', default=20, show_default=True, help='Questions of the batch round')
+def main(iterations, players, questions):
+    with app_context():
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM users WHERE username LIKE 'bench\\_user\\_%%' ORDER BY id LIMIT %s", (players,))
+        user_ids = [row['id'] for row in cur.fetchall()]
+        cur.execute("""
+            SELECT category_id FROM questions
+            WHERE category_id IS NOT NULL GROUP BY category_id HAVING COUNT(*) >= %s LIMIT 1
+        """, (questions,))
+        row = cur.fetchone()
+        if len(user_ids) < players or row is None:
+            raise click.ClickException('Not enough users or questions; run `python -m benchmarks.suite seed` first.')
+        category_id = row['category_id']
+
+        results = []
+        for label, batch_players, batch_questions in (
+            ('1 answer', 1, 1), (f'{players * questions} answers', players, questions)
+        ):
+            for name, ddl in (('row-level', ROW_LEVEL_TRIGGERS), ('statement-level', None)):
+                def fixture(_=None):
+                    # Untimed: undo the previous run, swap the triggers, create the round
+                    conn.rollback()
+                    if ddl:
+                        cur.execute(ddl)
+                    return create_round(cur, user_ids[:batch_players], category_id, batch_questions)
+
+                samples = time_ops(
+                    lambda round_id: cur.execute(INSERT_ANSWERS, (user_ids[:batch_players], round_id)),
+                    iterations, setup=fixture
+                )
+                results.append(summarize(f"{name} ({label})", samples))
+        conn.rollback()
+        cur.close()
+
+    print_table(results)
+    for i in range(0, len(results), 2):
+        if results[i + 1]['mean_ms']:
+            print(f"{results[i]['name']} -> statement-level: {results[i]['mean_ms'] / results[i + 1]['mean_ms']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
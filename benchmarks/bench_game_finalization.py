@@ -0,0 +1,145 @@
+"""
+Finishing a game with 2 and with 50 players, before and after set-based finalization.
+
+The previous finalization issued one ``UPDATE users SET total_xp`` per
+participant, and the stats trigger on games looped over the participants and,
+for each of them, over the game's categories (migration 0002). Now the XP of
+all participants is one ``UPDATE ... FROM`` and the statistics are two
+statements (fn_record_game_stats, migration 0012).
+
+Both paths run against the same fixture game (participants with stats rows,
+rounds in several categories) and leave the game's status alone, so only the
+finalization work is timed. Each run is rolled back (untimed).
+
+    python -m benchmarks.bench_game_finalization --iterations 200
+"""
+
+import random
+
+import click
+
+from app.db import get_db
+from benchmarks.common import app_context, time_ops, summarize, print_table
+
+# The loops of fn_update_stats_after_game_complete before migration 0012
+CREATE_LEGACY_STATS = """
+    CREATE OR REPLACE FUNCTION pg_temp.legacy_game_stats(p_game_id BIGINT, p_winner_id BIGINT) RETURNS VOID AS $$
+    DECLARE
+        v_participant RECORD;
+        v_game_category RECORD;
+    BEGIN
+        FOR v_participant IN SELECT user_id, score FROM game_participants WHERE game_id = p_game_id LOOP
+            IF v_participant.user_id = p_winner_id THEN
+                UPDATE user_stats SET
+                    games_won = games_won + 1,
+                    games_played = games_played + 1,
+                    current_streak = current_streak + 1,
+                    best_streak = GREATEST(best_streak, current_streak + 1),
+                    highest_score = GREATEST(highest_score, v_participant.score),
+                    last_played_at = NOW(),
+                    stats_updated_at = NOW()
+                WHERE user_id = v_participant.user_id;
+            ELSE
+                UPDATE user_stats SET
+                    games_played = games_played + 1,
+                    current_streak = 0,
+                    highest_score = GREATEST(highest_score, v_participant.score),
+                    last_played_at = NOW(),
+                    stats_updated_at = NOW()
+                WHERE user_id = v_participant.user_id;
+            END IF;
+            FOR v_game_category IN SELECT DISTINCT category_id FROM game_rounds
+                                   WHERE game_id = p_game_id AND category_id IS NOT NULL LOOP
+                INSERT INTO user_category_stats (user_id, category_id, games_played, correct_answers, total_answers, total_points)
+                VALUES (v_participant.user_id, v_game_category.category_id, 1, 0, 0, 0)
+                ON CONFLICT (user_id, category_id) DO UPDATE SET games_played = user_category_stats.games_played + 1;
+            END LOOP;
+        END LOOP;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+FINISH_ROW = """
+    UPDATE games SET end_time = NOW(), winner_id = %s, state_version = state_version + 1 WHERE id = %s
+"""
+
+
+def create_fixture(cur, user_ids, category_ids, rounds=5):
+    """An active game of ``user_ids`` with completed rounds; returns (game_id, winner_id)"""
+    cur.execute("INSERT INTO games (game_type_id, status) VALUES (1, 'active') RETURNING id")
+    game_id = cur.fetchone()['id']
+    cur.execute("""
+        INSERT INTO game_participants (game_id, user_id, score)
+        SELECT %s, uid, (random() * 1000)::int FROM unnest(%s::bigint[]) AS uid
+    """, (game_id, user_ids))
+    cur.execute("""
+        INSERT INTO game_rounds (game_id, round_number, category_id, status)
+        SELECT %s, r, (%s::int[])[1 + (r - 1) %% cardinality(%s::int[])], 'completed'
+        FROM generate_series(1, %s) AS r
+    """, (game_id, category_ids, category_ids, rounds))
+    cur.execute("INSERT INTO user_stats (user_id) SELECT unnest(%s::bigint[]) ON CONFLICT DO NOTHING", (user_ids,))
+    cur.execute("""
+        SELECT user_id FROM game_participants WHERE game_id = %s ORDER BY score DESC, join_time LIMIT 1
+    """, (game_id,))
+    return game_id, cur.fetchone()['user_id']
+
+
+def _previous_path(cur, game_id, winner_id):
+    cur.execute(FINISH_ROW, (winner_id, game_id))
+    cur.execute("SELECT user_id, score FROM game_participants WHERE game_id = %s", (game_id,))
+    for p in cur.fetchall():
+        bonus = int(p['score'] * 0.2) if p['user_id'] == winner_id else 0
+        cur.execute("UPDATE users SET total_xp = COALESCE(total_xp, 0) + %s WHERE id = %s",
+                    (p['score'] + bonus, p['user_id']))
+    cur.execute("SELECT pg_temp.legacy_game_stats(%s, %s)", (game_id, winner_id))
+
+
+def _set_based(cur, game_id, winner_id):
+    cur.execute(FINISH_ROW, (winner_id, game_id))
+    cur.execute("""
+        UPDATE users u
+        SET total_xp = COALESCE(u.total_xp, 0) + gp.score
+                       + CASE WHEN gp.user_id = %s THEN gp.score * 2 / 10 ELSE 0 END
+        FROM game_participants gp
+        WHERE gp.game_id = %s AND u.id = gp.user_id
+    """, (winner_id, game_id))
+    cur.execute("SELECT fn_record_game_stats(%s, %s)", (game_id, winner_id))
+
+
+@click.command()
+@click.option('--iterations', default=200, show_default=True, help='Finalizations per path and game size')
+@click.option('--players', multiple=True, type=int, default=(2, 50), show_default=True)
+def main(iterations, players):
+    with app_context():
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute(CREATE_LEGACY_STATS)
+        conn.commit()
+        cur.execute("SELECT id FROM users ORDER BY id LIMIT %s", (max(players),))
+        all_users = [row['id'] for row in cur.fetchall()]
+        cur.execute("SELECT id FROM categories ORDER BY id LIMIT 5")
+        category_ids = [row['id'] for row in cur.fetchall()]
+        if len(all_users) < max(players) or not category_ids:
+            raise click.ClickException('Not enough users or categories; run `python -m benchmarks.suite seed` first.')
+
+        results = []
+        for count in players:
+            def fixture(_=None):
+                # Untimed: undo the previous run and create a fresh game
+                conn.rollback()
+                return create_fixture(cur, random.sample(all_users, count), category_ids)
+
+            for name, path in (('previous path', _previous_path), ('set-based', _set_based)):
+                samples = time_ops(lambda game: path(cur, *game), iterations, setup=fixture)
+                results.append(summarize(f"{name} ({count} players)", samples))
+        conn.rollback()
+        cur.close()
+
+    print_table(results)
+    for i in range(0, len(results), 2):
+        if results[i + 1]['mean_ms']:
+            print(f"{results[i]['name']} -> set-based: {results[i]['mean_ms'] / results[i + 1]['mean_ms']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+The all-time leaderboard at 1M users: full rebuild vs incremental upsert, and
+the cost of computing ranks when reading.
+
+The previous trigger deleted the whole board and re-inserted every user_stats
+row with a ROW_NUMBER() on each completed game (migration 0002). Now a
+completed game upserts its participants' rows (fn_update_alltime_leaderboard,
+migration 0013) and the endpoints rank by score when reading.
+
+The users (``bench_user_<n>``), their user_stats and the board are created on
+the first run and kept; that takes a few minutes at 1M users. Every write is
+rolled back (untimed).
+
+    python -m benchmarks.bench_leaderboard --users 1000000 --iterations 200
+"""
+
+import random
+
+import click
+
+from app.db import get_db
+from benchmarks.common import app_context, time_calls, time_ops, summarize, print_table
+from benchmarks.seed import seed_users
+
+# fn_refresh_alltime_leaderboard before migration 0013
+FULL_REFRESH = """
+    DELETE FROM leaderboards WHERE scope = 'alltime' AND category_id IS NULL;
+    WITH ranked AS (
+        SELECT user_id, ROW_NUMBER() OVER (ORDER BY total_points DESC) AS new_rank, total_points
+        FROM user_stats
+    )
+    INSERT INTO leaderboards (user_id, scope, category_id, rank, score, generated_at)
+    SELECT user_id, 'alltime', NULL, new_rank, total_points, NOW() FROM ranked;
+"""
+
+
+def seed_board(conn, users):
+    """Users with user_stats and all-time rows; returns the user ids"""
+    with conn.cursor() as cur:
+        user_ids = seed_users(cur, users)
+        cur.execute("""
+            INSERT INTO user_stats (user_id, total_points)
+            SELECT id, (random() * 50000)::bigint FROM unnest(%s::bigint[]) AS id
+            ON CONFLICT DO NOTHING
+        """, (user_ids,))
+        cur.execute("""
+            INSERT INTO leaderboards (user_id, scope, category_id, score)
+            SELECT user_id, 'alltime', NULL, total_points FROM user_stats
+            ON CONFLICT (user_id) WHERE scope = 'alltime' AND category_id IS NULL DO NOTHING
+        """)
+    conn.commit()
+    with conn.cursor() as cur:
+        cur.execute("ANALYZE user_stats")
+        cur.execute("ANALYZE leaderboards")
+    conn.commit()
+    return user_ids
+
+
+@click.command()
+@click.option('--users', default=1_000_000, show_default=True)
+@click.option('--iterations', default=200, show_default=True, help='Incremental updates and reads')
+@click.option('--full-iterations', default=3, show_default=True, help='Full rebuilds (seconds each at 1M users)')
+def main(users, iterations, full_iterations):
+    with app_context() as app:
+        conn = get_db()
+        click.echo(f"Seeding {users} users (kept between runs)...")
+        user_ids = seed_board(conn, users)
+        cur = conn.cursor()
+        client = app.test_client()
+
+        def game_of_two(_=None):
+            # Untimed: undo the previous run, then a game whose two players just scored
+            conn.rollback()
+            pair = random.sample(user_ids, 2)
+            cur.execute("INSERT INTO games (game_type_id, status) VALUES (1, 'active') RETURNING id")
+            game_id = cur.fetchone()['id']
+            cur.execute("""
+                INSERT INTO game_participants (game_id, user_id, score)
+                SELECT %s, uid, 300 FROM unnest(%s::bigint[]) AS uid
+            """, (game_id, pair))
+            cur.execute("UPDATE user_stats SET total_points = total_points + 300 WHERE user_id = ANY(%s)", (pair,))
+            return game_id
+
+        results = [
+            summarize('full rebuild (per game)', time_ops(
+                lambda _: cur.execute(FULL_REFRESH), full_iterations, setup=game_of_two, warmup=1
+            )),
+            summarize('incremental upsert (per game)', time_ops(
+                lambda game_id: cur.execute("SELECT fn_update_alltime_leaderboard(%s)", (game_id,)),
+                iterations, setup=game_of_two
+            )),
+        ]
+        conn.rollback()
+        cur.close()
+
+        results.append(summarize('GET /leaderboards?limit=10', time_calls(
+            lambda: client.get('/leaderboards?limit=10'), iterations
+        )))
+        results.append(summarize('GET /leaderboards/user/<id>', time_calls(
+            lambda: client.get(f'/leaderboards/user/{random.choice(user_ids)}'), iterations
+        )))
+
+    print_table(results)
+    if results[1]['mean_ms']:
+        print(f"incremental upsert vs full rebuild: {results[0]['mean_ms'] / results[1]['mean_ms']:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark of the answer path with and without server-side prepared statements.
+
+Runs the read queries of POST /games/<id>/rounds/<n>/answer against an existing
+round question, once as plain SQL and once through the prepared-statement
+registry, and reports latency plus the planner time reported by EXPLAIN.
+
+    python -m benchmarks.bench_prepared_statements --iterations 2000
+"""
+
+import re
+
+import click
+
+from app.db import get_db, execute_prepared, _prepared_statements
+from app.routes.games import GAME_STATUS
+from benchmarks.bench_submit_answer import (
+    ANSWER_ROUND, ANSWER_ACTIVE_PARTICIPANT, ANSWER_ROUND_QUESTION,
+    ANSWER_DUPLICATE, ANSWER_CHOICE, ANSWER_CORRECT_CHOICE
+)
+from benchmarks.common import app_context, time_calls, summarize, print_table
+
+
+def _find_answer_target(cur):
+    """An existing (game, round, question, choice, user) to run the answer checks against"""
+    cur.execute("""
+        SELECT gr.game_id, gr.round_number, grq.id AS grq_id, grq.question_id,
+               qc.id AS choice_id, gp.user_id
+        FROM game_round_questions grq
+        JOIN game_rounds gr ON gr.id = grq.game_round_id
+        JOIN game_participants gp ON gp.game_id = gr.game_id
+        JOIN question_choices qc ON qc.question_id = grq.question_id
+        LIMIT 1
+    """)
+    return cur.fetchone()
+
+
+def _answer_checks(cur, t):
+    execute_prepared(cur, GAME_STATUS, (t['game_id'],)); cur.fetchall()
+    execute_prepared(cur, ANSWER_ROUND, (t['game_id'], t['round_number'])); cur.fetchall()
+    execute_prepared(cur, ANSWER_ACTIVE_PARTICIPANT, (t['game_id'], t['user_id'])); cur.fetchall()
+    execute_prepared(cur, ANSWER_ROUND_QUESTION, (t['game_id'], t['round_number'], t['question_id'])); cur.fetchall()
+    execute_prepared(cur, ANSWER_DUPLICATE, (t['grq_id'], t['user_id'])); cur.fetchall()
+    execute_prepared(cur, ANSWER_CHOICE, (t['choice_id'], t['question_id'])); cur.fetchall()
+    execute_prepared(cur, ANSWER_CORRECT_CHOICE, (t['question_id'],)); cur.fetchall()
+
+
+def _planning_time_ms(cur, sql):
+    cur.execute(f"EXPLAIN (ANALYZE, SUMMARY) {sql}")
+    for row in cur.fetchall():
+        match = re.search(r'Planning Time: ([\d.]+) ms', row['QUERY PLAN'])
+        if match:
+            return float(match.group(1))
+    return 0.0
+
+
+def _planning_comparison(cur, t):
+    """Planner time of the round-question lookup as plain SQL vs EXECUTE of the prepared plan"""
+    args = (t['game_id'], t['round_number'], t['question_id'])
+    plain_sql = re.sub(r'\$(\d+)', lambda m: str(args[int(m.group(1)) - 1]), _prepared_statements[ANSWER_ROUND_QUESTION])
+    plain = [_planning_time_ms(cur, plain_sql) for _ in range(20)]
+    # After five executions PostgreSQL switches to the cached generic plan
+    prepared = [_planning_time_ms(cur, f"EXECUTE {ANSWER_ROUND_QUESTION} ({', '.join(map(str, args))})") for _ in range(20)]
+    return sum(plain[5:]) / 15, sum(prepared[5:]) / 15
+
+
+@click.command()
+@click.option('--iterations', default=1000, show_default=True, help='Answer-path runs per mode')
+def main(iterations):
+    with app_context() as app:
+        conn = get_db()
+        cur = conn.cursor()
+        target = _find_answer_target(cur)
+        if not target:
+            raise click.ClickException('No game round questions found; play a game or load seed data first.')
+
+        results = []
+        for mode, enabled in (('answer checks (plain SQL)', False), ('answer checks (prepared)', True)):
+            app.config['DB_PREPARED_STATEMENTS'] = enabled
+            samples = time_calls(lambda: _answer_checks(cur, target), iterations)
+            conn.rollback()
+            results.append(summarize(mode, samples))
+        print_table(results)
+
+        plain_ms, prepared_ms = _planning_comparison(cur, target)
+        conn.rollback()
+        print(f"\nPlanning time per statement: plain {plain_ms:.3f} ms, prepared {prepared_ms:.3f} ms")
+        speedup = results[0]['mean_ms'] / results[1]['mean_ms'] if results[1]['mean_ms'] else 0
+        print(f"Answer path speedup: {speedup:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Question sampling benchmark: drawing a round's questions from one category.
+
+Compares ``ORDER BY RANDOM() LIMIT k`` (emulated in Python by sorting the
+category on random keys, as PostgreSQL does) with the in-memory sampler in
+app/question_sampler.py. No database is needed; with ``--db`` the real query
+also runs against the largest category of the configured database.
+
+    python -m benchmarks.bench_question_sampler --questions 50000 --categories 10
+"""
+
+import random
+
+import click
+
+from app.question_sampler import QuestionSampler, DIFFICULTIES
+from benchmarks.common import app_context, time_calls, summarize, print_table
+
+
+def make_questions(n, categories):
+    return [
+        {'id': i, 'category_id': i % categories, 'difficulty': DIFFICULTIES[i % len(DIFFICULTIES)]}
+        for i in range(1, n + 1)
+    ]
+
+
+def _order_by_random(questions, category_id, k):
+    matching = [q['id'] for q in questions if q['category_id'] == category_id]
+    return [qid for _, qid in sorted((random.random(), qid) for qid in matching)[:k]]
+
+
+@click.command()
+@click.option('--questions', default=50000, show_default=True)
+@click.option('--categories', default=10, show_default=True)
+@click.option('--k', default=3, show_default=True, help='Questions per pick')
+@click.option('--iterations', default=200, show_default=True)
+@click.option('--db', is_flag=True, help='Also time the SQL query against the configured database')
+def main(questions, categories, k, iterations, db):
+    rows = make_questions(questions, categories)
+    sampler = QuestionSampler()
+    load_ms = time_calls(lambda: sampler.load(rows), 1, warmup=0)[0]
+
+    cases = [
+        ('ORDER BY RANDOM() (python emulation)', lambda: _order_by_random(rows, 1, k)),
+        ('QuestionSampler.sample', lambda: sampler.sample(1, k)),
+        ('QuestionSampler.sample (difficulty)', lambda: sampler.sample(1, k, 'hard')),
+    ]
+    results = [summarize(name, time_calls(fn, iterations)) for name, fn in cases]
+
+    if db:
+        with app_context():
+            from app.db import get_db
+            cur = get_db().cursor()
+            cur.execute("""
+                SELECT category_id, COUNT(*) AS n FROM questions WHERE is_verified = TRUE
+                GROUP BY category_id ORDER BY n DESC LIMIT 1
+            """)
+            top = cur.fetchone()
+            if top:
+                def sql_pick():
+                    cur.execute("""
+                        SELECT id FROM questions WHERE category_id = %s AND is_verified = TRUE
+                        ORDER BY RANDOM() LIMIT %s
+                    """, (top['category_id'], k))
+                    cur.fetchall()
+                results.append(summarize(
+                    f"SQL ORDER BY RANDOM() ({top['n']} questions)", time_calls(sql_pick, iterations)
+                ))
+            cur.close()
+
+    print_table(results)
+    print(f"\n{questions} questions in {categories} categories; sampler load took {load_ms:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
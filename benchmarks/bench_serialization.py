@@ -0,0 +1,73 @@
+"""
+Serialization benchmark on a 10k-row leaderboard payload.
+
+Compares the previous path (copy every row through a Decimal->float helper,
+then Flask's default provider) with the provider in app/serialization.py.
+No database is needed: rows are RealDictRow objects shaped like the
+/leaderboards response.
+
+    python -m benchmarks.bench_serialization --rows 10000
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import click
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from psycopg2.extras import RealDictRow
+
+from app import serialization
+from benchmarks.common import time_calls, summarize, print_table
+
+
+def make_leaderboard_rows(n):
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    rows = []
+    for i in range(n):
+        row = RealDictRow()
+        row.update({
+            'id': i + 1,
+            'user_id': 1000 + i,
+            'username': f'player_{i}',
+            'avatar': f'/static/avatars/{i % 50}.png',
+            'scope': 'alltime',
+            'category_id': None,
+            'rank': i + 1,
+            'score': 100000 - i * 7,
+            'win_rate': Decimal(f'{(i % 1000) / 10:.2f}'),
+            'generated_at': now - timedelta(seconds=i),
+        })
+        rows.append(row)
+    return rows
+
+
+def _convert_decimal(row):
+    return {k: (float(v) if isinstance(v, Decimal) else v) for k, v in row.items()}
+
+
+@click.command()
+@click.option('--rows', default=10000, show_default=True)
+@click.option('--iterations', default=50, show_default=True)
+def main(rows, iterations):
+    data = make_leaderboard_rows(rows)
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = serialization.FastJSONProvider(app)
+
+    with app.app_context():
+        cases = [
+            ('flask default + _convert_decimal',
+             lambda: default_provider.response([_convert_decimal(r) for r in data]).get_data()),
+            (f'fast provider ({"orjson" if serialization.orjson else "stdlib"})',
+             lambda: fast_provider.response(data).get_data()),
+            ('socket.io payload (SocketIOJSON.dumps)',
+             lambda: serialization.SocketIOJSON.dumps(data)),
+        ]
+        results = [summarize(name, time_calls(fn, iterations, warmup=3)) for name, fn in cases]
+    print_table(results)
+    print(f"\nPayload: {rows} rows, {len(fast_provider.response(data).get_data()) / 1024:.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Answers/sec of POST /games/<id>/rounds/<n>/answer, before and after fn_submit_answer.
+
+The previous path ran its checks as separate prepared statements (game status,
+round, participant, round question, duplicate, choice, correct choice) and then
+the insert, score update and state version bump: ten round trips. The
+current path is one call of fn_submit_answer (migration 0009). Each answer is
+rolled back (untimed), so both paths always record a fresh answer.
+
+    python -m benchmarks.bench_submit_answer --iterations 2000
+"""
+
+from datetime import datetime
+
+import click
+
+from app.db import get_db, prepare_statement, execute_prepared
+from app.routes.games import GAME_STATUS, SUBMIT_ANSWER, ANSWER_GRACE_SECONDS
+from app.game_engine import BUMP_STATE_VERSION
+from benchmarks.common import app_context, time_ops, summarize, print_table
+
+# Statements of the previous answer path (also used by bench_prepared_statements)
+ANSWER_ROUND = prepare_statement("answer_round", """
+    SELECT id, status, points_possible, start_time, time_limit_seconds
+    FROM game_rounds
+    WHERE game_id = $1 AND round_number = $2
+""")
+ANSWER_ACTIVE_PARTICIPANT = prepare_statement("answer_active_participant", """
+    SELECT 1
+    FROM game_participants
+    WHERE game_id = $1 AND user_id = $2 AND status = 'active'
+""")
+ANSWER_ROUND_QUESTION = prepare_statement("answer_round_question", """
+    SELECT grq.id
+    FROM game_round_questions grq
+    JOIN game_rounds gr ON grq.game_round_id = gr.id
+    WHERE gr.game_id = $1 AND gr.round_number = $2 AND grq.question_id = $3
+""")
+ANSWER_DUPLICATE = prepare_statement("answer_duplicate", """
+    SELECT 1
+    FROM round_answers
+    WHERE game_round_question_id = $1 AND user_id = $2
+""")
+ANSWER_CHOICE = prepare_statement("answer_choice", """
+    SELECT is_correct
+    FROM question_choices
+    WHERE id = $1 AND question_id = $2
+""")
+ANSWER_CORRECT_CHOICE = prepare_statement("answer_correct_choice", """
+    SELECT id FROM question_choices
+    WHERE question_id = $1 AND is_correct = TRUE
+    LIMIT 1
+""")
+ANSWER_INSERT = prepare_statement("answer_insert", """
+    INSERT INTO round_answers
+      (game_round_question_id, user_id, choice_id, is_correct, points_earned, response_time_ms)
+    VALUES ($1, $2, $3, $4, $5, $6)
+""")
+ANSWER_ADD_SCORE = prepare_statement("answer_add_score", """
+    UPDATE game_participants
+    SET score = score + $1
+    WHERE game_id = $2 AND user_id = $3
+    RETURNING score
+""")
+
+
+def find_answer_target(cur):
+    """An active round question with a participant who has not answered it yet"""
+    cur.execute("""
+        SELECT gr.id AS round_id, gr.game_id, gr.round_number, grq.id AS grq_id, grq.question_id,
+               qc.id AS choice_id, gp.user_id
+        FROM game_round_questions grq
+        JOIN game_rounds gr ON gr.id = grq.game_round_id
+        JOIN games g ON g.id = gr.game_id AND g.status = 'active'
+        JOIN game_participants gp ON gp.game_id = gr.game_id AND gp.status = 'active'
+        JOIN question_choices qc ON qc.question_id = grq.question_id
+        WHERE gr.status = 'active'
+          AND NOT EXISTS (SELECT 1 FROM round_answers ra
+                          WHERE ra.game_round_question_id = grq.id AND ra.user_id = gp.user_id)
+        LIMIT 1
+    """)
+    return cur.fetchone()
+
+
+def _previous_path(cur, t):
+    execute_prepared(cur, GAME_STATUS, (t['game_id'],)); cur.fetchone()
+    execute_prepared(cur, ANSWER_ROUND, (t['game_id'], t['round_number']))
+    rnd = cur.fetchone()
+    execute_prepared(cur, ANSWER_ACTIVE_PARTICIPANT, (t['game_id'], t['user_id'])); cur.fetchone()
+    execute_prepared(cur, ANSWER_ROUND_QUESTION, (t['game_id'], t['round_number'], t['question_id'])); cur.fetchone()
+    execute_prepared(cur, ANSWER_DUPLICATE, (t['grq_id'], t['user_id'])); cur.fetchone()
+    execute_prepared(cur, ANSWER_CHOICE, (t['choice_id'], t['question_id']))
+    is_correct = cur.fetchone()['is_correct']
+    execute_prepared(cur, ANSWER_CORRECT_CHOICE, (t['question_id'],)); cur.fetchone()
+    points = rnd['points_possible'] if is_correct else 0
+    execute_prepared(cur, ANSWER_INSERT, (t['grq_id'], t['user_id'], t['choice_id'], is_correct, points, None))
+    execute_prepared(cur, ANSWER_ADD_SCORE, (points, t['game_id'], t['user_id'])); cur.fetchone()
+    execute_prepared(cur, BUMP_STATE_VERSION, (t['game_id'],)); cur.fetchone()
+
+
+def _single_call(cur, t):
+    execute_prepared(cur, SUBMIT_ANSWER, (
+        t['game_id'], t['round_number'], t['user_id'], t['question_id'], t['choice_id'], None, ANSWER_GRACE_SECONDS,
+        datetime.now()
+    ))
+    result = cur.fetchone()['result']
+    assert result['status'] == 'ok', result
+
+
+@click.command()
+@click.option('--iterations', default=2000, show_default=True, help='Answers per path')
+def main(iterations):
+    with app_context():
+        conn = get_db()
+        cur = conn.cursor()
+        target = find_answer_target(cur)
+        if not target:
+            raise click.ClickException('No open round question found; run `python -m benchmarks.suite seed` first.')
+
+        def fresh_round(_=None):
+            # Untimed: drop the previous answer and keep the round inside its time limit
+            conn.rollback()
+            cur.execute("UPDATE game_rounds SET start_time = LOCALTIMESTAMP WHERE id = %s", (target['round_id'],))
+
+        results = []
+        for name, path in (('previous path (10 round trips)', _previous_path),
+                           ('fn_submit_answer (1 round trip)', _single_call)):
+            results.append(summarize(name, time_ops(lambda _: path(cur, target), iterations, setup=fresh_round)))
+        conn.rollback()
+        cur.close()
+
+    print_table(results)
+    if results[1]['mean_ms']:
+        print(f"\nSpeedup: {results[0]['mean_ms'] / results[1]['mean_ms']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Helpers shared by the benchmark scripts: app/DB setup and timing summaries.
+"""
+
+import statistics
+import time
+from contextlib import contextmanager
+
+from app import create_app
+from config import Config
+
+
+class BenchmarkConfig(Config):
+    """
+    Config without the background loops: the tick matcher, the round timer and
+    the stats worker would run alongside the timed code, and with the matcher
+    on, a duel enqueue waits for its tick instead of claiming an opponent.
+    """
+    MATCHMAKER_ENABLED = False
+    ROUND_TIMER_ENABLED = False
+    STATS_WORKER_ENABLED = False
+
+
+@contextmanager
+def app_context(config_class=BenchmarkConfig):
+    """Yield an app context of a fresh app, so get_db() and the pool work as in a request"""
+    app, _ = create_app(config_class)
+    with app.app_context():
+        yield app
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def time_calls(fn, iterations, warmup=10):
+    """Call ``fn`` repeatedly and return per-call latencies in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def time_ops(op, iterations, setup=None, warmup=3):
+    """
+    Like time_calls, but ``setup()`` runs untimed before every call and its
+    return value is passed to ``op``
+    """
+    for _ in range(warmup):
+        op(setup() if setup else None)
+    samples = []
+    for _ in range(iterations):
+        arg = setup() if setup else None
+        started = time.perf_counter()
+        op(arg)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summarize(name, samples):
+    """Summary dict (ops/s, mean, p50, p99 in ms) for a list of latencies"""
+    total_s = sum(samples) / 1000
+    return {
+        'name': name,
+        'iterations': len(samples),
+        'ops_per_sec': round(len(samples) / total_s, 1) if total_s else 0.0,
+        'mean_ms': round(statistics.fmean(samples), 4) if samples else 0.0,
+        'p50_ms': round(percentile(samples, 50), 4),
+        'p99_ms': round(percentile(samples, 99), 4),
+    }
+
+
+def print_table(rows):
+    """Print summaries as an aligned table"""
+    print(f"{'benchmark':<40} {'ops/s':>10} {'mean ms':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for row in rows:
+        print(f"{row['name']:<40} {row['ops_per_sec']:>10} {row['mean_ms']:>10} "
+              f"{row['p50_ms']:>10} {row['p99_ms']:>10}")
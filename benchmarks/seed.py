@@ -0,0 +1,136 @@
+"""
+Seed a benchmark database with realistic volumes.
+
+Everything created here is prefixed with ``bench_`` so it can be told apart
+from real data and the seed can be re-run (existing rows are kept):
+
+- users            ``bench_user_<n>``
+- categories       ``bench_category_<n>``, each with verified 4-choice questions
+- finished games   two-player games with one answered round each, so the
+                   round_answers / stats tables are not empty when measuring
+"""
+
+import random
+
+from psycopg2.extras import execute_values
+
+
+def seed_users(cur, count):
+    cur.execute("""
+        INSERT INTO users (username, email, password_hash)
+        SELECT 'bench_user_' || n, 'bench_user_' || n || '@bench.local', 'bench'
+        FROM generate_series(1, %s) AS n
+        ON CONFLICT DO NOTHING
+    """, (count,))
+    cur.execute("SELECT id FROM users WHERE username LIKE 'bench\\_user\\_%%' ORDER BY id")
+    return [row['id'] for row in cur.fetchall()]
+
+
+def seed_questions(cur, categories, questions_per_category):
+    cur.execute("""
+        INSERT INTO categories (name, description)
+        SELECT 'bench_category_' || n, 'Benchmark category ' || n
+        FROM generate_series(1, %s) AS n
+        ON CONFLICT DO NOTHING
+    """, (categories,))
+    cur.execute("SELECT id FROM categories WHERE name LIKE 'bench\\_category\\_%%' ORDER BY id")
+    category_ids = [row['id'] for row in cur.fetchall()]
+
+    # Top up every category to the requested number of questions
+    cur.execute("""
+        INSERT INTO questions (text, category_id, difficulty, is_verified)
+        SELECT 'Bench question ' || c.id || '-' || n,
+               c.id,
+               (ARRAY['easy','medium','hard'])[1 + n % 3],
+               TRUE
+        FROM unnest(%s::int[]) AS c(id)
+        CROSS JOIN LATERAL generate_series(
+            1 + (SELECT COUNT(*) FROM questions q WHERE q.category_id = c.id),
+            %s
+        ) AS n
+    """, (category_ids, questions_per_category))
+    cur.execute("""
+        INSERT INTO question_choices (question_id, choice_text, is_correct, position)
+        SELECT q.id, 'Choice ' || p, p = 'A', p
+        FROM questions q
+        CROSS JOIN unnest(ARRAY['A','B','C','D']) AS p
+        WHERE q.category_id = ANY(%s)
+          AND NOT EXISTS (SELECT 1 FROM question_choices qc WHERE qc.question_id = q.id)
+    """, (category_ids,))
+    return category_ids
+
+
+def seed_finished_games(cur, user_ids, category_ids, count, game_type_id=1):
+    """Completed two-player games with one answered three-question round each"""
+    if count <= 0:
+        return
+    rng = random.Random(42)
+    cur.execute("""
+        INSERT INTO games (game_type_id, status, start_time, end_time)
+        SELECT %s, 'completed', NOW() - (n || ' minutes')::interval, NOW() - (n || ' minutes')::interval + interval '5 minutes'
+        FROM generate_series(1, %s) AS n
+        RETURNING id
+    """, (game_type_id, count))
+    game_ids = [row['id'] for row in cur.fetchall()]
+
+    players = {game_id: rng.sample(user_ids, 2) for game_id in game_ids}
+    execute_values(cur, "INSERT INTO game_participants (game_id, user_id, score) VALUES %s",
+                   [(g, u, 0) for g, pair in players.items() for u in pair])
+
+    categories = {game_id: rng.choice(category_ids) for game_id in game_ids}
+    rounds = execute_values(cur, """
+        INSERT INTO game_rounds (game_id, round_number, category_id, status, points_possible)
+        VALUES %s RETURNING id, game_id, category_id
+    """, [(g, 1, categories[g], 'completed', 100) for g in game_ids], fetch=True)
+
+    cur.execute("""
+        SELECT category_id, array_agg(id ORDER BY id) AS ids
+        FROM questions WHERE category_id = ANY(%s) GROUP BY category_id
+    """, (category_ids,))
+    questions_by_category = {row['category_id']: row['ids'] for row in cur.fetchall()}
+
+    grq_rows = []
+    for rnd in rounds:
+        for qid in rng.sample(questions_by_category[rnd['category_id']], 3):
+            grq_rows.append((rnd['id'], qid))
+    grqs = execute_values(cur, """
+        INSERT INTO game_round_questions (game_round_id, question_id) VALUES %s
+        RETURNING id, game_round_id, question_id
+    """, grq_rows, fetch=True)
+
+    cur.execute("""
+        SELECT question_id, array_agg(id ORDER BY position) AS ids
+        FROM question_choices WHERE question_id = ANY(%s) GROUP BY question_id
+    """, (list({g['question_id'] for g in grqs}),))
+    choices = {row['question_id']: row['ids'] for row in cur.fetchall()}
+
+    game_of_round = {rnd['id']: rnd['game_id'] for rnd in rounds}
+    answers = []
+    for grq in grqs:
+        for user_id in players[game_of_round[grq['game_round_id']]]:
+            choice_index = rng.randrange(4)
+            correct = choice_index == 0
+            answers.append((grq['id'], user_id, choices[grq['question_id']][choice_index],
+                            correct, 100 if correct else 0, rng.randint(800, 9000)))
+    execute_values(cur, """
+        INSERT INTO round_answers
+          (game_round_question_id, user_id, choice_id, is_correct, points_earned, response_time_ms)
+        VALUES %s
+    """, answers, page_size=1000)
+
+
+def seed(conn, users=2000, categories=20, questions_per_category=250, finished_games=2000):
+    """Create the benchmark data set and return (user_ids, category_ids)"""
+    with conn.cursor() as cur:
+        user_ids = seed_users(cur, users)
+        category_ids = seed_questions(cur, categories, questions_per_category)
+        cur.execute("""
+            SELECT COUNT(*) FROM games g
+            JOIN game_participants gp ON gp.game_id = g.id
+            JOIN users u ON u.id = gp.user_id
+            WHERE u.username LIKE 'bench\\_user\\_%%' AND g.status = 'completed'
+        """)
+        existing = cur.fetchone()['count'] // 2
+        seed_finished_games(cur, user_ids, category_ids, finished_games - existing)
+    conn.commit()
+    return user_ids, category_ids
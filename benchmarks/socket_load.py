@@ -0,0 +1,96 @@
+"""
+Socket.IO load test: how many concurrent game sockets one worker keeps responsive.
+
+Opens ``--clients`` Socket.IO connections to a running server, has each join
+the room of ``--game-id`` and measures the time until its ``game_update``
+arrives (one DB-backed state build per join). With blocking psycopg2 every
+state build holds a worker thread; with green DB calls the worker keeps
+serving other sockets while queries are in flight.
+
+Run it once against a server started with ASYNC_MODE=threading and once with
+ASYNC_MODE=eventlet (or gevent), then compare the two result files:
+
+    ASYNC_MODE=eventlet python wsgi.py
+    python -m benchmarks.socket_load --url http://localhost:5000 --game-id 1 \
+        --clients 500 --label eventlet --output eventlet.json
+
+Requires the Socket.IO client extras: pip install "python-socketio[client]"
+"""
+
+import json
+import threading
+import time
+
+import click
+
+from benchmarks.common import percentile
+
+
+def _run_client(url, game_id, timeout, hold, results):
+    import socketio
+
+    client = socketio.Client(reconnection=False)
+    updated = threading.Event()
+    client.on('game_update', lambda data: updated.set())
+
+    started = time.perf_counter()
+    try:
+        client.connect(url, transports=['websocket'], wait_timeout=timeout)
+    except Exception as e:
+        results['errors'].append(f'connect: {e}')
+        return
+    connected = time.perf_counter()
+    results['connect_ms'].append((connected - started) * 1000)
+
+    client.emit('join_game', {'game_id': game_id})
+    if updated.wait(timeout):
+        results['update_ms'].append((time.perf_counter() - connected) * 1000)
+    else:
+        results['errors'].append('game_update timeout')
+
+    time.sleep(hold)
+    client.disconnect()
+
+
+@click.command()
+@click.option('--url', default='http://localhost:5000', show_default=True)
+@click.option('--game-id', type=int, required=True, help='Existing game whose room the clients join')
+@click.option('--clients', default=200, show_default=True, help='Concurrent socket connections')
+@click.option('--timeout', default=10.0, show_default=True, help='Seconds to wait for connect / game_update')
+@click.option('--hold', default=5.0, show_default=True, help='Seconds each client stays connected')
+@click.option('--label', default='run', show_default=True, help='Name stored in the result (e.g. threading)')
+@click.option('--output', type=click.Path(), default=None, help='Write results as JSON')
+def main(url, game_id, clients, timeout, hold, label, output):
+    results = {'connect_ms': [], 'update_ms': [], 'errors': []}
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=_run_client, args=(url, game_id, timeout, hold, results))
+        for _ in range(clients)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    summary = {
+        'label': label,
+        'clients': clients,
+        'connected': len(results['connect_ms']),
+        'responsive': len(results['update_ms']),
+        'errors': len(results['errors']),
+        'connect_p50_ms': round(percentile(results['connect_ms'], 50), 1),
+        'connect_p99_ms': round(percentile(results['connect_ms'], 99), 1),
+        'update_p50_ms': round(percentile(results['update_ms'], 50), 1),
+        'update_p99_ms': round(percentile(results['update_ms'], 99), 1),
+        'elapsed_s': round(elapsed, 2),
+    }
+    for key, value in summary.items():
+        print(f"{key:<16} {value}")
+    if output:
+        with open(output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+"""
+Benchmark suite for the game engine hot paths.
+
+Drives the real endpoints through the Flask test client against a seeded
+PostgreSQL database (point DB_* at a dedicated benchmark database), and
+reports ops/s and p50/p99 latency per operation.
+
+    python -m benchmarks.suite seed                       # migrate + seed (idempotent)
+    python -m benchmarks.suite run --output results/base.json
+    python -m benchmarks.suite run --output results/new.json --baseline results/base.json --threshold 15
+    python -m benchmarks.suite compare results/base.json results/new.json --threshold 15
+
+``--threshold`` is the allowed slowdown in percent (p50 latency up or ops/s
+down); the command exits with status 1 when any benchmark regresses more.
+"""
+
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import click
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from app.migrations import upgrade
+from app.routes.games import get_full_game_state_data, _build_game_state
+from benchmarks.common import app_context, time_calls, time_ops, summarize, print_table
+from benchmarks.seed import seed as seed_database
+from config import Config
+
+BENCHMARKS = (
+    'get_full_game_state_data', 'build_game_state', 'enqueue_for_duel', 'pick_category_for_round',
+    'submit_answer', 'complete_round', 'complete_duel_game',
+)
+
+
+def _connect():
+    return psycopg2.connect(
+        host=Config.DB_HOST, port=Config.DB_PORT, dbname=Config.DB_NAME,
+        user=Config.DB_USER, password=Config.DB_PASSWORD, cursor_factory=RealDictCursor
+    )
+
+
+def _check(response, *expected):
+    if response.status_code not in expected:
+        raise click.ClickException(
+            f"{response.request.method} {response.request.path} returned {response.status_code}: "
+            f"{response.get_data(as_text=True)[:200]}"
+        )
+    return response.get_json()
+
+
+class GameDriver:
+    """Creates games in the states each benchmark needs (untimed setup)"""
+
+    def __init__(self, client, conn, user_ids, category_ids, game_type_id=1):
+        self.client = client
+        self.conn = conn
+        self.category_ids = category_ids
+        self.game_type_id = game_type_id
+        self._users = itertools.cycle(user_ids)
+        self._rng = random.Random(7)
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM match_queue WHERE user_id = ANY(%s)", (user_ids,))
+        conn.commit()
+
+    def _query(self, sql, args=()):
+        with self.conn.cursor() as cur:
+            cur.execute(sql, args)
+            rows = cur.fetchall() if cur.description else None
+        self.conn.commit()
+        return rows
+
+    def next_user(self):
+        return next(self._users)
+
+    def enqueue(self, user_id):
+        return self.client.post('/games/queue', json={'user_id': user_id, 'game_type_id': self.game_type_id})
+
+    def new_game(self):
+        _check(self.enqueue(self.next_user()), 200)
+        return _check(self.enqueue(self.next_user()), 201)['game_id']
+
+    def picker(self, game_id, round_number=1):
+        return self._query(
+            "SELECT category_picker_id FROM game_rounds WHERE game_id = %s AND round_number = %s",
+            (game_id, round_number)
+        )[0]['category_picker_id']
+
+    def pick_request(self, game_id, round_number=1):
+        offer = self._query(
+            "SELECT category_options FROM game_rounds WHERE game_id = %s AND round_number = %s",
+            (game_id, round_number)
+        )[0]['category_options']
+        return self.client.post(
+            f'/games/{game_id}/rounds/{round_number}/pick_category',
+            json={'user_id': self.picker(game_id, round_number),
+                  'category_id': self._rng.choice(offer or self.category_ids)}
+        )
+
+    def pending_answers(self, game_id, round_number=1):
+        """(user_id, question_id, choice_id) for every answer still to give in the round"""
+        rows = self._query("""
+            SELECT gp.user_id, grq.question_id,
+                   (SELECT id FROM question_choices qc WHERE qc.question_id = grq.question_id
+                    ORDER BY random() LIMIT 1) AS choice_id
+            FROM game_rounds gr
+            JOIN game_round_questions grq ON grq.game_round_id = gr.id
+            JOIN game_participants gp ON gp.game_id = gr.game_id
+            WHERE gr.game_id = %s AND gr.round_number = %s
+              AND NOT EXISTS (SELECT 1 FROM round_answers ra
+                              WHERE ra.game_round_question_id = grq.id AND ra.user_id = gp.user_id)
+        """, (game_id, round_number))
+        return [(r['user_id'], r['question_id'], r['choice_id']) for r in rows]
+
+    def answer_request(self, game_id, answer, round_number=1):
+        user_id, question_id, choice_id = answer
+        return self.client.post(
+            f'/games/{game_id}/rounds/{round_number}/answer',
+            json={'user_id': user_id, 'question_id': question_id, 'choice_id': choice_id,
+                  'response_time_ms': self._rng.randint(800, 9000)}
+        )
+
+    def game_with_picked_round(self):
+        game_id = self.new_game()
+        _check(self.pick_request(game_id), 200)
+        return game_id
+
+    def game_with_answered_round(self):
+        game_id = self.game_with_picked_round()
+        for answer in self.pending_answers(game_id):
+            _check(self.answer_request(game_id, answer), 200)
+        return game_id
+
+    def game_with_rounds_completed(self):
+        game_id = self.game_with_answered_round()
+        self._query("UPDATE game_rounds SET status = 'completed' WHERE game_id = %s", (game_id,))
+        return game_id
+
+
+def run_benchmarks(app, driver, iterations, only=None):
+    client = driver.client
+    results = {}
+
+    def bench(name, samples):
+        if only and name not in only:
+            return
+        results[name] = summarize(name, samples)
+        print(f"  {name}: {results[name]['ops_per_sec']} ops/s")
+
+    if not only or 'get_full_game_state_data' in only:
+        game_id = driver.game_with_picked_round()
+        with app.test_request_context():
+            bench('get_full_game_state_data', time_calls(lambda: get_full_game_state_data(game_id), iterations))
+
+    # The same state without the version cache (what every read cost before it)
+    if not only or 'build_game_state' in only:
+        game_id = driver.game_with_picked_round()
+        with app.test_request_context():
+            bench('build_game_state', time_calls(lambda: _build_game_state(game_id), iterations))
+
+    if not only or 'enqueue_for_duel' in only:
+        bench('enqueue_for_duel', time_ops(
+            lambda user_id: _check(driver.enqueue(user_id), 200, 201),
+            iterations, setup=driver.next_user
+        ))
+
+    if not only or 'pick_category_for_round' in only:
+        bench('pick_category_for_round', time_ops(
+            lambda game_id: _check(driver.pick_request(game_id), 200),
+            iterations, setup=driver.new_game
+        ))
+
+    if not only or 'submit_answer' in only:
+        pending = []
+
+        def next_answer():
+            if not pending:
+                game_id = driver.game_with_picked_round()
+                pending.extend((game_id, a) for a in driver.pending_answers(game_id))
+            return pending.pop()
+        bench('submit_answer', time_ops(
+            lambda item: _check(driver.answer_request(*item), 200),
+            iterations, setup=next_answer
+        ))
+
+    if not only or 'complete_round' in only:
+        bench('complete_round', time_ops(
+            lambda game_id: _check(client.post(f'/games/{game_id}/rounds/1/complete'), 200),
+            iterations, setup=driver.game_with_answered_round
+        ))
+
+    if not only or 'complete_duel_game' in only:
+        bench('complete_duel_game', time_ops(
+            lambda game_id: _check(client.post(f'/games/{game_id}/complete'), 200),
+            iterations, setup=driver.game_with_rounds_completed
+        ))
+
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(baseline, current, threshold):
+    """Print per-benchmark deltas; return the names that regressed by more than ``threshold`` percent"""
+    regressions = []
+    print(f"{'benchmark':<28} {'base p50':>10} {'new p50':>10} {'Δ p50':>8} {'base ops/s':>11} {'new ops/s':>10} {'Δ ops':>8}")
+    for name, new in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<28} {'-':>10} {new['p50_ms']:>10} (new)")
+            continue
+        d_p50 = (new['p50_ms'] - base['p50_ms']) / base['p50_ms'] * 100 if base['p50_ms'] else 0.0
+        d_ops = (new['ops_per_sec'] - base['ops_per_sec']) / base['ops_per_sec'] * 100 if base['ops_per_sec'] else 0.0
+        regressed = d_p50 > threshold or -d_ops > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<28} {base['p50_ms']:>10} {new['p50_ms']:>10} {d_p50:>+7.1f}% "
+              f"{base['ops_per_sec']:>11} {new['ops_per_sec']:>10} {d_ops:>+7.1f}%{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+@click.group()
+def cli():
+    """Game engine benchmark suite."""
+
+
+@cli.command()
+@click.option('--users', default=2000, show_default=True)
+@click.option('--categories', default=20, show_default=True)
+@click.option('--questions-per-category', default=250, show_default=True)
+@click.option('--finished-games', default=2000, show_default=True, help='Historical games with answers')
+def seed(users, categories, questions_per_category, finished_games):
+    """Apply migrations and seed the benchmark data set."""
+    conn = _connect()
+    try:
+        upgrade(conn)
+        user_ids, category_ids = seed_database(conn, users, categories, questions_per_category, finished_games)
+    finally:
+        conn.close()
+    click.echo(f"Seeded {len(user_ids)} users, {len(category_ids)} categories.")
+
+
+@cli.command()
+@click.option('--iterations', default=200, show_default=True, help='Timed operations per benchmark')
+@click.option('--only', multiple=True, type=click.Choice(BENCHMARKS), help='Run only these benchmarks')
+@click.option('--output', type=click.Path(), default=None, help='Write results as JSON')
+@click.option('--baseline', type=click.Path(exists=True), default=None, help='Compare with a previous results file')
+@click.option('--threshold', default=10.0, show_default=True, help='Allowed regression in percent')
+def run(iterations, only, output, baseline, threshold):
+    """Run the benchmarks against the seeded database."""
+    conn = _connect()
+    with conn.cursor() as cur:
+        cur.execute("SELECT array_agg(id ORDER BY id) AS ids FROM users WHERE username LIKE 'bench\\_user\\_%%'")
+        user_ids = cur.fetchone()['ids']
+        cur.execute("SELECT array_agg(id ORDER BY id) AS ids FROM categories WHERE name LIKE 'bench\\_category\\_%%'")
+        category_ids = cur.fetchone()['ids']
+    if not user_ids or not category_ids:
+        raise click.ClickException("No benchmark data found; run 'python -m benchmarks.suite seed' first.")
+
+    with app_context() as app:
+        driver = GameDriver(app.test_client(), conn, user_ids, category_ids)
+        results = run_benchmarks(app, driver, iterations, only=set(only))
+    conn.close()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'iterations': iterations,
+            'users': len(user_ids),
+        },
+        'results': results,
+    }
+    print()
+    print_table(results.values())
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        click.echo(f"\nResults written to {output}")
+
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare_results(json.load(f), report, threshold)
+        if regressions:
+            sys.exit(1)
+
+
+@cli.command()
+@click.argument('baseline', type=click.Path(exists=True))
+@click.argument('current', type=click.Path(exists=True))
+@click.option('--threshold', default=10.0, show_default=True, help='Allowed regression in percent')
+def compare(baseline, current, threshold):
+    """Compare two results files; exit 1 on regression."""
+    with open(baseline) as f:
+        base = json.load(f)
+    with open(current) as f:
+        new = json.load(f)
+    if compare_results(base, new, threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    cli()
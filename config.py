@@ -13,10 +13,78 @@ class Config:
     DB_NAME = os.getenv("DB_NAME", "quizdb")
     DB_USER = os.getenv("DB_USER", "postgres")
     DB_PASSWORD = os.getenv("DB_PASSWORD", "your_password")
+
+    # Connection pool
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "0"))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))                 # seconds to wait for a free connection
+    DB_POOL_VALIDATE_AFTER = float(os.getenv("DB_POOL_VALIDATE_AFTER", "30"))  # ping connections idle longer than this
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+    # Named server-side prepared statements for hot queries (disable behind pgbouncer transaction pooling)
+    DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() == "true"
+
+    # Query instrumentation: log statements slower than this, and flag a fingerprint
+    # repeated this many times in one request/socket event as a suspected N+1
+    DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+    DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "5"))
+
+    # Read replicas: comma-separated libpq DSNs, e.g. "host=replica1 dbname=quizdb user=postgres"
+    DB_REPLICA_DSNS = [dsn.strip() for dsn in os.getenv("DB_REPLICA_DSNS", "").split(",") if dsn.strip()]
+    DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))  # reads stay on the primary after a write
+
+    # Apply pending migrations on startup (otherwise run `flask db upgrade`)
+    DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "false").lower() == "true"
     
 
+    # Background matchmaker (app/matcher.py): pairs queued players by rating every tick.
+    # The search window (rating points) widens with the time a player has waited.
+    MATCHMAKER_ENABLED = os.getenv("MATCHMAKER_ENABLED", "true").lower() == "true"
+    MATCHMAKER_TICK_SECONDS = float(os.getenv("MATCHMAKER_TICK_SECONDS", "1"))
+    MATCHMAKER_BASE_WINDOW = int(os.getenv("MATCHMAKER_BASE_WINDOW", "100"))
+    MATCHMAKER_WINDOW_GROWTH = float(os.getenv("MATCHMAKER_WINDOW_GROWTH", "25"))  # points per second waited
+    MATCHMAKER_MAX_WINDOW = int(os.getenv("MATCHMAKER_MAX_WINDOW", "800"))
+    RATING_K_FACTOR = int(os.getenv("RATING_K_FACTOR", "32"))
+
+    # Built game states kept per worker (app/game_cache.py); finished games are evicted first
+    GAME_STATE_CACHE_SIZE = int(os.getenv("GAME_STATE_CACHE_SIZE", "1000"))
+
+    # In-memory question sampler (app/question_sampler.py): full reload interval, for
+    # questions changed by other workers or import_questions.py
+    QUESTION_SAMPLER_REFRESH_SECONDS = float(os.getenv("QUESTION_SAMPLER_REFRESH_SECONDS", "300"))
+
+    # Write-behind answer ingest (app/answer_ingest.py) for tournament peaks: answers are
+    # validated in memory, logged to ANSWER_INGEST_DIR and written to Postgres in batches
+    ANSWER_INGEST_ENABLED = os.getenv("ANSWER_INGEST_ENABLED", "false").lower() == "true"
+    ANSWER_INGEST_DIR = os.getenv("ANSWER_INGEST_DIR", os.path.join(basedir, "var", "answer_log"))
+    ANSWER_INGEST_FSYNC = os.getenv("ANSWER_INGEST_FSYNC", "true").lower() == "true"
+    ANSWER_INGEST_BATCH_SIZE = int(os.getenv("ANSWER_INGEST_BATCH_SIZE", "500"))
+    ANSWER_INGEST_FLUSH_SECONDS = float(os.getenv("ANSWER_INGEST_FLUSH_SECONDS", "0.2"))
+
+    # Rounds: the server completes an active round once its time limit plus the answer
+    # grace period has passed (app/round_timer.py), whether or not every answer is in.
+    # A round waiting for its category gets one of the offered categories once
+    # ROUND_PICK_TIME_LIMIT_SECONDS have passed without a pick.
+    # Every worker re-reads the active rounds every ROUND_TIMER_RELOAD_SECONDS.
+    ROUND_TIME_LIMIT_SECONDS = int(os.getenv("ROUND_TIME_LIMIT_SECONDS", "120"))
+    ROUND_PICK_TIME_LIMIT_SECONDS = int(os.getenv("ROUND_PICK_TIME_LIMIT_SECONDS", "30"))
+    ROUND_TIMER_ENABLED = os.getenv("ROUND_TIMER_ENABLED", "true").lower() == "true"
+    ROUND_TIMER_RELOAD_SECONDS = float(os.getenv("ROUND_TIMER_RELOAD_SECONDS", "30"))
+
+    # User/category stats and the all-time leaderboard are applied from stats_outbox by a
+    # background worker (app/stats_worker.py), woken by NOTIFY or every STATS_WORKER_POLL_SECONDS.
+    # With the worker off, run `flask stats drain` to apply them.
+    STATS_WORKER_ENABLED = os.getenv("STATS_WORKER_ENABLED", "true").lower() == "true"
+    STATS_WORKER_BATCH_SIZE = int(os.getenv("STATS_WORKER_BATCH_SIZE", "500"))
+    STATS_WORKER_POLL_SECONDS = float(os.getenv("STATS_WORKER_POLL_SECONDS", "1"))
+    STATS_OUTBOX_RETENTION_HOURS = int(os.getenv("STATS_OUTBOX_RETENTION_HOURS", "24"))
+
     SECRET_KEY = os.getenv("SECRET_KEY", "a-very-secret-key")
 
+    # Socket.IO worker type: threading, eventlet or gevent (see app/green.py).
+    # Green modes serve many sockets per worker, so size DB_POOL_MAX_SIZE accordingly.
+    ASYNC_MODE = os.getenv("ASYNC_MODE") or None
+
     # SESSION_COOKIE_SAMESITE = "None"
     # SESSION_COOKIE_SECURE = False
     # SESSION_COOKIE_HTTPONLY = False
@@ -31,3 +99,11 @@ class TestConfig(Config):
     # Application secret key
     SECRET_KEY = os.getenv("TEST_SECRET_KEY", "test-T-key")
     WTF_CSRF_ENABLED = False
+    DB_AUTO_MIGRATE = True
+    # Pair at enqueue time so tests see matches immediately
+    MATCHMAKER_ENABLED = False
+    # Tests drive round completion themselves (and use rounds with 1-second limits)
+    ROUND_TIMER_ENABLED = False
+    # Tests apply the stats outbox themselves (stats_worker.drain)
+    STATS_WORKER_ENABLED = False
+    DB_REPLICA_DSNS = [dsn.strip() for dsn in os.getenv("TEST_DB_REPLICA_DSNS", "").split(",") if dsn.strip()]
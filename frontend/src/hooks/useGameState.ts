@@ -1,10 +1,30 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useParams } from 'react-router-dom';
 import { gameSocket } from '../services/socket';
-import { gamesAPI } from '../services/api';
-import { LiveGameState } from '../types';
+import { LiveGameState, GameSnapshot, GameUpdate, GameUpdateOp } from '../types';
 import { useAuth } from '../contexts/AuthContext';
 
+// Apply game_update ops to the previous state (mirrors apply_ops in app/game_events.py)
+const applyOps = (state: LiveGameState, ops: GameUpdateOp[]): LiveGameState => {
+    let next: any = { ...state };
+    for (const op of ops) {
+        if (op.op === 'score') {
+            next = {
+                ...next,
+                scores: { ...(next.scores || {}), [op.user_id]: op.score },
+                participants: next.participants.map((p: any) =>
+                    p.user_id === op.user_id ? { ...p, score: op.score } : p
+                ),
+            };
+        } else if (op.op === 'status') {
+            next = { ...next, game_status: op.status, game: { ...(next.game || {}), status: op.status } };
+        } else if (op.op === 'round') {
+            next = { ...next, current_round: op.round };
+        }
+    }
+    return next;
+};
+
 export const useGameState = () => {
     const { gameId } = useParams<{ gameId: string }>();
     const { user } = useAuth();
@@ -12,48 +32,26 @@ export const useGameState = () => {
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
     const [isConnected, setIsConnected] = useState(gameSocket.connected);
-
-    const fetchInitialState = useCallback(async () => {
-        if (!gameId || !user) return;
-        try {
-            setLoading(true);
-            const response = await gamesAPI.getGameState(parseInt(gameId), user.id);
-            setGameState(response.data);
-            setError(null);
-        } catch (err: any) {
-            setError(err.response?.data?.error || 'No game data found.');
-        } finally {
-            setLoading(false);
-        }
-    }, [gameId, user]);
+    // state_version of gameState; null until the first snapshot arrives
+    const versionRef = useRef<number | null>(null);
+    const resyncPendingRef = useRef(false);
 
     useEffect(() => {
-        fetchInitialState();
-    }, [fetchInitialState]);
+        if (!gameId || !user) return;
 
-    // Polling fallback for game state updates
-    useEffect(() => {
-        if (!gameId || !user || !isConnected) return;
-        
-        const pollInterval = setInterval(async () => {
-            try {
-                const response = await gamesAPI.getGameState(parseInt(gameId), user.id);
-                setGameState(response.data);
-            } catch (err) {
-                console.error('Polling failed:', err);
-            }
-        }, 5000); // Poll every 5 seconds
-        
-        return () => clearInterval(pollInterval);
-    }, [gameId, user, isConnected, setGameState]);
+        versionRef.current = null;
 
-    useEffect(() => {
-        if (!gameId) return;
+        const requestResync = () => {
+            if (resyncPendingRef.current) return;
+            resyncPendingRef.current = true;
+            gameSocket.emit('request_resync', { game_id: gameId });
+        };
 
         const handleConnect = () => {
             console.log('Game socket connected');
             setIsConnected(true);
             console.log('Joining game room:', gameId);
+            // The server answers with a game_snapshot for this socket only
             gameSocket.emit('join_game', { game_id: gameId });
         };
 
@@ -62,19 +60,36 @@ export const useGameState = () => {
             setIsConnected(false);
         };
 
-        const handleGameUpdate = (data: LiveGameState) => {
-            console.log('Game state updated via socket:', data);
-            console.log('Current round:', data.current_round);
-            setGameState(data);
+        const handleSnapshot = (data: GameSnapshot) => {
+            if (String(data.game_id) !== gameId) return;
+            resyncPendingRef.current = false;
+            versionRef.current = data.version;
+            setGameState(data.state);
+            setError(null);
+            setLoading(false);
+        };
+
+        const handleGameUpdate = (data: GameUpdate) => {
+            if (String(data.game_id) !== gameId || versionRef.current === null) return;
+            if (data.version <= versionRef.current) return;  // already included in our state
+            if (data.version !== versionRef.current + 1) {
+                // We missed an update: ask for a new snapshot instead of applying out of order
+                requestResync();
+                return;
+            }
+            versionRef.current = data.version;
+            setGameState(prev => (prev ? applyOps(prev, data.ops) : prev));
         };
         
         const handleGameError = (data: { error: string }) => {
             console.error('Game error from server:', data.error);
             setError(data.error);
+            setLoading(false);
         };
 
         gameSocket.on('connect', handleConnect);
         gameSocket.on('disconnect', handleDisconnect);
+        gameSocket.on('game_snapshot', handleSnapshot);
         gameSocket.on('game_update', handleGameUpdate);
         gameSocket.on('game_error', handleGameError);
         
@@ -87,11 +102,12 @@ export const useGameState = () => {
             gameSocket.emit('leave_game', { game_id: gameId });
             gameSocket.off('connect', handleConnect);
             gameSocket.off('disconnect', handleDisconnect);
+            gameSocket.off('game_snapshot', handleSnapshot);
             gameSocket.off('game_update', handleGameUpdate);
             gameSocket.off('game_error', handleGameError);
             gameSocket.disconnect();
         };
-    }, [gameId]);
+    }, [gameId, user]);
 
     return { gameState, loading, error, isConnected, setGameState };
-}; 
\ No newline at end of file
+};
@@ -136,22 +136,12 @@ const GamePage: React.FC = () => {
         user.id, 
         categoryId
       );
-      
-      // Fallback: if socket doesn't work, fetch game state after a delay
-      setTimeout(async () => {
-        try {
-          const response = await gamesAPI.getGameState(parseInt(gameId), user.id);
-          setGameState(response.data);
-        } catch (err) {
-          console.error('[GamePage] Fallback fetch failed:', err);
-        }
-      }, 2000);
-      
+      // The picked round arrives as a game_update on the game socket
     } catch (err: any) {
       // Error will be handled by the hook
       console.error(err);
     }
-  }, [gameId, user, gameState, setGameState]);
+  }, [gameId, user, gameState]);
 
   // --- Timers ---
   useEffect(() => {
@@ -6,6 +6,7 @@ import Button from '../components/UI/Button';
 import Modal from '../components/UI/Modal';
 import LoadingSpinner from '../components/UI/LoadingSpinner';
 import { gameTypesAPI, gamesAPI, categoriesAPI } from '../services/api';
+import { gameSocket } from '../services/socket';
 import { PlayIcon, UsersIcon, SwordIcon, ClockIcon, StarIcon } from 'lucide-react';
 
 const PlayPage: React.FC = () => {
@@ -20,26 +21,44 @@ const PlayPage: React.FC = () => {
   const [modalOpen, setModalOpen] = useState(false);
   const [selectedGameType, setSelectedGameType] = useState<any>(null);
   const [queueMessage, setQueueMessage] = useState('');
-  const pollingRef = useRef<ReturnType<typeof setInterval> | null>(null);
 
   useEffect(() => {
     loadGameData();
   }, []);
 
+  // The server pushes match_found / game_started to our user room; on every
+  // (re)connect we also look up an open game once, in case we missed the push.
   useEffect(() => {
     if (!user) return;
-    const checkForActiveGame = async () => {
+    const goToGame = (gameId: number) => {
+      setQueueing(false);
+      setQueueMessage('Opponent found!');
+      navigate(`/game/${gameId}`);
+    };
+    const handleConnect = async () => {
+      gameSocket.emit('join_user', { user_id: user.id });
       try {
-        const res = await gamesAPI.queueStatus(user.id, 1); // 1: duel game type
-        if (res.data.status === 'matched' && res.data.game_id) {
-          navigate(`/game/${res.data.game_id}`);
-        }
+        const res = await gamesAPI.activeGame(user.id);
+        goToGame(res.data.game_id);
       } catch (e) {
-        // ignore
+        // no open game
       }
     };
-    const interval = setInterval(checkForActiveGame, 2000);
-    return () => clearInterval(interval);
+    const handleGameCreated = (data: { game_id: number }) => goToGame(data.game_id);
+
+    gameSocket.on('connect', handleConnect);
+    gameSocket.on('match_found', handleGameCreated);
+    gameSocket.on('game_started', handleGameCreated);
+    if (gameSocket.connected) {
+      handleConnect();
+    } else {
+      gameSocket.connect();
+    }
+    return () => {
+      gameSocket.off('connect', handleConnect);
+      gameSocket.off('match_found', handleGameCreated);
+      gameSocket.off('game_started', handleGameCreated);
+    };
   }, [user, navigate]);
 
   const loadGameData = async () => {
@@ -69,59 +88,20 @@ const PlayPage: React.FC = () => {
         setGameStarted(true);
         setModalOpen(true);
         setQueueing(false);
-      } else {
-        pollForMatch();
       }
+      // Otherwise we wait for the match_found push
     } catch (error) {
       setQueueMessage('Failed to join the queue.');
       setQueueing(false);
     }
   };
 
-  const pollForMatch = () => {
-    if (!user) return;
-    if (pollingRef.current) clearInterval(pollingRef.current);
-    pollingRef.current = setInterval(async () => {
-      try {
-        const res = await gamesAPI.queueStatus(user.id, 1);
-        if (res.data.status === 'matched') {
-          setCurrentGame({ id: res.data.game_id });
-          setGameStarted(true);
-          setModalOpen(false);
-          setQueueing(false);
-          setQueueMessage('Opponent found!');
-          if (pollingRef.current) clearInterval(pollingRef.current);
-          
-          // Navigate directly to game room (game is already started in backend)
-          navigate(`/game/${res.data.game_id}`);
-        } else if (res.data.status === 'waiting') {
-          setQueueMessage('Searching for an opponent...');
-        } else {
-          setQueueMessage('You are not in the queue.');
-          setQueueing(false);
-          if (pollingRef.current) clearInterval(pollingRef.current);
-        }
-      } catch (e) {
-        setQueueMessage('Error checking queue status.');
-        setQueueing(false);
-        if (pollingRef.current) clearInterval(pollingRef.current);
-      }
-    }, 2000);
-  };
-
   const cancelQueue = () => {
     setQueueing(false);
     setQueueMessage('You have left the queue.');
-    if (pollingRef.current) clearInterval(pollingRef.current);
     // (اختیاری: درخواست به سرور برای حذف از صف)
   };
 
-  useEffect(() => {
-    return () => {
-      if (pollingRef.current) clearInterval(pollingRef.current);
-    };
-  }, []);
-
   const startGroupGame = () => {
     setSelectedGameType(gameTypes.find((gt: any) => gt.name === 'group'));
     setModalOpen(true);
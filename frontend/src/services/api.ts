@@ -117,6 +117,10 @@ export const gamesAPI = {
 
   queueStatus: (userId: number, gameTypeId: number) =>
     api.get('/games/queue/status', { params: { user_id: userId, game_type_id: gameTypeId } }),
+
+  // The user's open game (404 when there is none); used after a socket reconnect
+  activeGame: (userId: number, gameTypeId?: number) =>
+    api.get('/games/active', { params: { user_id: userId, game_type_id: gameTypeId } }),
 };
 
 // Game Types API
@@ -219,6 +219,24 @@ export interface LiveGameState {
   participants: GamePlayer[];
 }
 
+// Versioned game room protocol (see app/game_events.py)
+export interface GameSnapshot {
+  game_id: number;
+  version: number;
+  state: LiveGameState;
+}
+
+export type GameUpdateOp =
+  | { op: 'score'; user_id: number; score: number }
+  | { op: 'status'; status: string }
+  | { op: 'round'; round: LiveGameState['current_round'] | null };
+
+export interface GameUpdate {
+  game_id: number;
+  version: number;
+  ops: GameUpdateOp[];
+}
+
 export interface RevealedAnswer {
   question_id: number;
   correct_choice_id: number;
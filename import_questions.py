@@ -11,9 +11,11 @@ This script will:
 
 import json
 import os
+import random
 import sys
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from app.db import transaction, insert_many, copy_rows
 from config import Config
 import html
 import re
@@ -85,72 +87,68 @@ class QuestionImporter:
             self.categories_cache[category_name] = category_id
             return category_id
     
-    def question_exists(self, question_text: str, category_id: int) -> bool:
-        """Check if question already exists in database"""
-        question_hash = f"{question_text[:100]}_{category_id}"
-        if question_hash in self.imported_questions:
-            return True
-        
-        with self.db.cursor() as cur:
-            cur.execute(
-                "SELECT id FROM questions WHERE text = %s AND category_id = %s",
-                (question_text, category_id)
+    def existing_questions(self, cur, keys: List[Tuple[str, int]]) -> Set[Tuple[str, int]]:
+        """Return the (text, category_id) pairs that are already in the database"""
+        if not keys:
+            return set()
+        cur.execute(
+            """
+            SELECT q.text, q.category_id
+            FROM questions q
+            JOIN unnest(%s::text[], %s::int[]) AS k(text, category_id)
+              ON q.text = k.text AND q.category_id = k.category_id
+            """,
+            ([k[0] for k in keys], [k[1] for k in keys])
+        )
+        return {(row['text'], row['category_id']) for row in cur.fetchall()}
+
+    def build_choices(self, question_data: dict) -> List[Tuple[str, bool, str]]:
+        """Shuffled (choice_text, is_correct, position) tuples for a question"""
+        correct_answer = self.clean_text(question_data['correct_answer'])
+        incorrect_answers = [self.clean_text(ans) for ans in question_data['incorrect_answers']]
+
+        # Combine all answers and shuffle them
+        all_answers = [correct_answer] + incorrect_answers
+        random.shuffle(all_answers)
+
+        positions = ['A', 'B', 'C', 'D']
+        return [(answer, answer == correct_answer, positions[i]) for i, answer in enumerate(all_answers)]
+
+    def insert_questions_with_choices(self, questions: List[Tuple[str, int, dict]]) -> int:
+        """
+        Insert a file's (text, category_id, question_data) questions in one transaction:
+        one duplicate check, one multi-row INSERT for the questions and one COPY for their choices.
+        """
+        # Skip duplicates within the batch and questions imported earlier in this run
+        batch = {}
+        for text, category_id, question_data in questions:
+            key = (text, category_id)
+            if f"{text[:100]}_{category_id}" not in self.imported_questions and key not in batch:
+                batch[key] = question_data
+        if not batch:
+            return 0
+
+        with transaction(self.db) as cur:
+            for key in self.existing_questions(cur, list(batch)):
+                batch.pop(key, None)
+            if not batch:
+                return 0
+
+            inserted = insert_many(
+                cur, 'questions', ('text', 'category_id', 'difficulty', 'is_verified'),
+                [(text, category_id, data['difficulty'], True) for (text, category_id), data in batch.items()],
+                returning='id, text, category_id'
             )
-            return cur.fetchone() is not None
-    
-    def insert_question_with_choices(self, question_data: dict, category_id: int) -> bool:
-        """Insert a question with its choices"""
-        # Clean question text
-        question_text = self.clean_text(question_data['question'])
-        
-        # Check for duplicates
-        if self.question_exists(question_text, category_id):
-            return False
-        
-        try:
-            with self.db.cursor() as cur:
-                # Insert question
-                cur.execute(
-                    """
-                    INSERT INTO questions (text, category_id, difficulty, is_verified)
-                    VALUES (%s, %s, %s, %s)
-                    RETURNING id
-                    """,
-                    (question_text, category_id, question_data['difficulty'], True)
-                )
-                question_id = cur.fetchone()['id']
-                
-                # Prepare choices
-                correct_answer = self.clean_text(question_data['correct_answer'])
-                incorrect_answers = [self.clean_text(ans) for ans in question_data['incorrect_answers']]
-                
-                # Combine all answers and shuffle them
-                all_answers = [correct_answer] + incorrect_answers
-                import random
-                random.shuffle(all_answers)
-                
-                # Insert choices
-                positions = ['A', 'B', 'C', 'D']
-                for i, answer in enumerate(all_answers):
-                    is_correct = answer == correct_answer
-                    cur.execute(
-                        """
-                        INSERT INTO question_choices (question_id, choice_text, is_correct, position)
-                        VALUES (%s, %s, %s, %s)
-                        """,
-                        (question_id, answer, is_correct, positions[i])
-                    )
-                
-                # Mark as imported
-                question_hash = f"{question_text[:100]}_{category_id}"
-                self.imported_questions.add(question_hash)
-                
-                return True
-                
-        except Exception as e:
-            print(f"❌ Error inserting question: {e}")
-            self.db.rollback()
-            return False
+            choices = []
+            for row in inserted:
+                for choice_text, is_correct, position in self.build_choices(batch[(row['text'], row['category_id'])]):
+                    choices.append((row['id'], choice_text, is_correct, position))
+            copy_rows(cur, 'question_choices', ('question_id', 'choice_text', 'is_correct', 'position'), choices)
+
+        # Mark as imported
+        for text, category_id in batch:
+            self.imported_questions.add(f"{text[:100]}_{category_id}")
+        return len(batch)
     
     def process_question_file(self, file_path: str) -> Tuple[int, int]:
         """Process a single question file"""
@@ -165,7 +163,7 @@ class QuestionImporter:
                 return 0, 0
             
             questions_processed = 0
-            questions_imported = 0
+            questions = []
             
             for question_data in data['results']:
                 questions_processed += 1
@@ -177,16 +175,19 @@ class QuestionImporter:
                 # Get or create category
                 category_name = question_data['category']
                 category_id = self.get_or_create_category(category_name)
-                
-                # Insert question
-                if self.insert_question_with_choices(question_data, category_id):
-                    questions_imported += 1
+                questions.append((self.clean_text(question_data['question']), category_id, question_data))
+            
+            # Insert the whole file at once
+            questions_imported = self.insert_questions_with_choices(questions)
             
             print(f"   ✅ Processed: {questions_processed}, Imported: {questions_imported}")
             return questions_processed, questions_imported
             
         except Exception as e:
             print(f"❌ Error processing {file_path}: {e}")
+            self.db.rollback()
+            # Categories created in the rolled back transaction are gone as well
+            self.categories_cache.clear()
             return 0, 0
     
     def import_all_questions(self, data_folder: str = "opentdb_data2"):
@@ -222,7 +223,7 @@ class QuestionImporter:
                 total_processed += processed
                 total_imported += imported
             
-            # Commit after each batch
+            # Each file is committed on its own; this only persists newly created categories
             self.db.commit()
             print(f"💾 Committed batch {i//batch_size + 1}")
         
@@ -5,7 +5,7 @@ from config import TestConfig
 @pytest.fixture
 def app():
     """Create and configure a new app instance for each test."""
-    app = create_app(TestConfig)
+    app, _ = create_app(TestConfig)
     return app
 
 @pytest.fixture
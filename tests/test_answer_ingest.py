@@ -0,0 +1,119 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.answer_ingest import Answer, AnswerIngest, AnswerLog, RoundContext, check_answer
+
+NOW = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def _context(**overrides):
+    fields = dict(
+        round_id=10, status='active', points_possible=100, start_time=NOW - timedelta(seconds=5),
+        time_limit_seconds=30, participants=frozenset({1, 2}),
+        questions={7: (70, {71: False, 72: True}, 72)}, answered=set(), loaded_at=time.monotonic()
+    )
+    fields.update(overrides)
+    return RoundContext(**fields)
+
+
+def _answer(user_id=1, grq_id=70):
+    return Answer(3, user_id, grq_id, 72, True, 100, 900, NOW)
+
+
+def test_check_answer_codes():
+    """Test that in-memory validation returns the same codes as fn_submit_answer."""
+    ctx = _context()
+    ok = check_answer(ctx, 1, 7, 72, NOW, 5)
+    assert ok == {'status': 'ok', 'is_correct': True, 'points_earned': 100,
+                  'correct_choice_id': 72, 'game_round_question_id': 70}
+    assert check_answer(ctx, 1, 7, 71, NOW, 5)['points_earned'] == 0
+    assert check_answer(_context(status='completed'), 1, 7, 72, NOW, 5)['status'] == 'round_not_active'
+    assert check_answer(ctx, 1, 7, 72, NOW + timedelta(seconds=60), 5)['status'] == 'time_limit_exceeded'
+    assert check_answer(ctx, 9, 7, 72, NOW, 5)['status'] == 'not_participant'
+    assert check_answer(ctx, 1, 8, 72, NOW, 5)['status'] == 'question_not_in_round'
+    assert check_answer(ctx, 1, 7, 99, NOW, 5)['status'] == 'invalid_choice'
+    assert check_answer(ctx, 1, 7, 72, NOW, 5, pending_keys={(70, 1)})['status'] == 'already_answered'
+
+
+def test_log_roundtrip_skips_torn_line(tmp_path):
+    """Test that logged answers read back intact and a half-written last line is ignored."""
+    log = AnswerLog(str(tmp_path), fsync=False)
+    log.append(_answer(1))
+    log.append(_answer(2))
+    path, f = log.seal()
+    with open(path, 'a') as torn:
+        torn.write('{"game_id": 3, "user_')
+    assert AnswerLog.read(path) == [_answer(1), _answer(2)]
+    AnswerLog.release((path, f))
+    assert not os.path.exists(path)
+
+
+def test_recovery_skips_segments_held_by_a_live_writer(tmp_path):
+    """Test that only segments whose writer is gone are replayed."""
+    crashed = AnswerLog(str(tmp_path), fsync=False)
+    crashed.append(_answer(1))
+    orphan_path, orphan_file = crashed.seal()
+    orphan_file.close()  # the process died: its lock is gone
+
+    live = AnswerLog(str(tmp_path), fsync=False)
+    live.append(_answer(2))
+
+    segments = AnswerLog(str(tmp_path)).orphaned()
+    assert [path for path, _ in segments] == [orphan_path]
+    for segment in segments:
+        AnswerLog.release(segment)
+
+
+def test_submit_rejects_pending_duplicate_and_flush_retries(tmp_path):
+    """Test that accepted answers block duplicates until flushed and a failed flush keeps its segment."""
+    ingest = AnswerIngest(AnswerLog(str(tmp_path), fsync=False))
+    ingest._contexts[(3, 1)] = _context()
+
+    assert ingest.submit(None, 3, 1, 1, 7, 72, now=NOW)['status'] == 'ok'
+    assert ingest.submit(None, 3, 1, 1, 7, 71, now=NOW)['status'] == 'already_answered'
+
+    written = []
+
+    def failing_write(answers):
+        raise RuntimeError('database down')
+
+    ingest._write = failing_write
+    with pytest.raises(RuntimeError):
+        ingest.flush()
+    assert ingest.stats()['buffered'] == 1
+    assert len(os.listdir(tmp_path)) == 1
+
+    ingest._write = written.extend
+    assert ingest.flush() == 1
+    assert written == [Answer(3, 1, 70, 72, True, 100, None, NOW)]
+    assert os.listdir(tmp_path) == []
+    # Flushed answers stay known as given
+    assert ingest.submit(None, 3, 1, 1, 7, 72, now=NOW)['status'] == 'already_answered'
+
+
+class _ClosedRoundsCursor:
+    def __init__(self, closed):
+        self.closed = closed
+        self.params = None
+
+    def execute(self, query, params):
+        self.params = params
+
+    def fetchall(self):
+        return [{'id': round_id} for round_id in self.closed]
+
+
+def test_drop_closed_rounds_forgets_completed_contexts(tmp_path):
+    """Test that contexts of rounds completed elsewhere are dropped and reloaded on the next answer."""
+    ingest = AnswerIngest(AnswerLog(str(tmp_path), fsync=False))
+    ingest._contexts[(3, 1)] = _context(round_id=10)
+    ingest._contexts[(4, 1)] = _context(round_id=11)
+
+    cur = _ClosedRoundsCursor(closed=[10])
+    assert ingest.drop_closed_rounds(cur) == 1
+    assert sorted(cur.params[0]) == [10, 11]
+    assert list(ingest._contexts) == [(4, 1)]
+    assert AnswerIngest(AnswerLog(str(tmp_path), fsync=False)).drop_closed_rounds(cur) == 0
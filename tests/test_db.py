@@ -1,6 +1,13 @@
 import pytest
-from app.db import get_db, query_db
+from app.db import (
+    get_db, get_read_db, query_db, modify_db, get_pool, ConnectionPool, PoolTimeout,
+    is_read_only_query, mark_primary, prepare_statement, execute_prepared,
+    fingerprint, get_query_stats, transaction, run_in_transaction, copy_rows
+)
+import time
 import psycopg2
+import psycopg2.sql
+from config import TestConfig
 
 def test_get_db(app):
     """Test database connection."""
@@ -46,4 +53,417 @@ def test_db_connection_error():
     
     with app.app_context():
         with pytest.raises(psycopg2.OperationalError):
-            get_db() 
\ No newline at end of file
+            get_db() 
+
+def test_connection_returned_to_pool(app):
+    """Test that the request connection goes back to the pool on teardown."""
+    with app.app_context():
+        db = get_db()
+        assert get_pool().stats()['in_use'] == 1
+    with app.app_context():
+        stats = get_pool().stats()
+        assert stats['in_use'] == 0
+        assert stats['idle'] >= 1
+        # The same physical connection is reused by the next context
+        assert get_db() is db
+
+
+def test_statement_timeout_applied(app):
+    """Test that pooled connections carry the configured statement timeout."""
+    with app.app_context():
+        row = query_db("SHOW statement_timeout", one=True)
+        assert row['statement_timeout'] == f"{app.config['DB_STATEMENT_TIMEOUT_MS']}ms"
+
+
+class _FakeInfo:
+    transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class _FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = 1
+
+    def execute(self, query, args=None):
+        self.connection.executed.append(query)
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.info = _FakeInfo()
+        self.executed = []
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class _FakePool(ConnectionPool):
+    """ConnectionPool that hands out fake connections instead of connecting."""
+
+    def __init__(self, **kwargs):
+        super().__init__({}, **kwargs)
+
+    def _connect(self):
+        return _FakeConnection()
+
+
+def test_pool_is_bounded_and_times_out():
+    """Test that checkout blocks and then fails once the pool is exhausted."""
+    pool = _FakePool(maxconn=2, timeout=0.05)
+    first, second = pool.getconn(), pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    stats = pool.stats()
+    assert stats['in_use'] == 2
+    assert stats['timeouts'] == 1
+
+    pool.putconn(first)
+    assert pool.getconn() is first
+    pool.putconn(second)
+
+
+def test_pool_waiter_gets_returned_connection():
+    """Test that a waiting checkout is served as soon as a connection is returned."""
+    import threading
+    pool = _FakePool(maxconn=1, timeout=2)
+    conn = pool.getconn()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn()))
+    waiter.start()
+    threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+    waiter.join()
+    assert got == [conn]
+    assert pool.stats()['wait_time_max_ms'] > 0
+
+
+def test_pool_discards_dead_connections():
+    """Test that closed connections are dropped instead of being reused."""
+    pool = _FakePool(maxconn=1, validate_after=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.closed = 1
+    fresh = pool.getconn()
+    assert fresh is not conn
+    assert pool.stats()['discarded'] == 1
+
+
+def test_read_only_query_detection():
+    """Test which statements may be routed to a replica."""
+    assert is_read_only_query("SELECT 1")
+    assert is_read_only_query("  -- comment\n WITH t AS (SELECT 1) SELECT * FROM t")
+    assert not is_read_only_query("INSERT INTO tags(name) VALUES ('x') RETURNING id")
+    assert not is_read_only_query("WITH d AS (DELETE FROM tags RETURNING id) SELECT * FROM d")
+    assert not is_read_only_query("SELECT * FROM games WHERE id = %s FOR UPDATE")
+    assert not is_read_only_query("SELECT nextval('games_id_seq')")
+
+
+def _with_fake_replicas(app, count=2):
+    app.config['DB_REPLICA_DSNS'] = ['fake'] * count
+    app.extensions['db_pool'] = _FakePool()
+    app.extensions['db_replica_pools'] = [_FakePool() for _ in range(count)]
+    return app.extensions['db_pool'], app.extensions['db_replica_pools']
+
+
+def test_reads_routed_to_replicas(app):
+    """Test that reads use a replica and are spread round-robin."""
+    primary, replicas = _with_fake_replicas(app)
+    with app.test_request_context():
+        first = get_read_db()
+        assert get_read_db() is first
+        assert replicas[0].stats()['in_use'] + replicas[1].stats()['in_use'] == 1
+        assert primary.stats()['in_use'] == 0
+    with app.test_request_context():
+        get_read_db()
+    assert replicas[0].stats()['checkouts'] == replicas[1].stats()['checkouts'] == 1
+    assert replicas[0].stats()['in_use'] == replicas[1].stats()['in_use'] == 0
+
+
+def test_reads_after_write_stay_on_primary(app):
+    """Test read-your-writes within a request and across the session."""
+    primary, replicas = _with_fake_replicas(app)
+    with app.test_request_context():
+        mark_primary()
+        assert get_read_db() is get_db()
+    assert sum(r.stats()['checkouts'] for r in replicas) == 0
+
+    with app.test_request_context() as ctx:
+        ctx.session['_db_primary_until'] = time.time() + 60
+        assert get_read_db() is get_db()
+        ctx.session['_db_primary_until'] = 0
+        assert get_read_db() is not get_db()
+
+
+def test_write_after_replica_read_moves_reads_to_primary(app):
+    """Test that a replica taken before a write is released and later reads use the primary."""
+    primary, replicas = _with_fake_replicas(app)
+    with app.test_request_context():
+        replica = get_read_db()
+        assert replica is not get_db()
+        mark_primary()
+        assert get_read_db() is get_db()
+        assert sum(r.stats()['in_use'] for r in replicas) == 0
+        assert get_read_db() is not replica
+
+
+def test_writes_in_read_only_blueprint_go_to_primary(app):
+    """Test that modify_db and transaction() write on the primary although get_db() is the replica."""
+    from flask import g
+    primary, replicas = _with_fake_replicas(app, count=1)
+    with app.test_request_context():
+        g.db_read_only = True
+        replica = get_db()
+        assert replica is not g.get('db')
+        modify_db("UPDATE tags SET name = name")
+        with transaction() as cur:
+            cur.execute("DELETE FROM tags WHERE false")
+        assert replica.executed == []
+        assert g.db.executed == ["UPDATE tags SET name = name", "DELETE FROM tags WHERE false"]
+        # Later reads of the request see the writes
+        assert get_db() is g.db
+        assert replicas[0].stats()['in_use'] == 0
+
+
+def test_commit_on_primary_marks_write(app):
+    """Test that a raw commit on the primary pins the request's reads like the helpers do."""
+    from flask import g
+    with app.test_request_context():
+        conn = get_db()
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        assert not g.get('db_wrote')
+        conn.commit()
+        assert g.db_wrote
+
+
+def test_write_marks_session_sticky(client):
+    """Test that a write request pins the following reads of the session to the primary."""
+    app = client.application
+    _with_fake_replicas(app)
+
+    @app.route('/_test_write', methods=['POST'])
+    def _test_write():
+        mark_primary()
+        return 'ok'
+
+    client.post('/_test_write')
+    with client.session_transaction() as sess:
+        assert sess['_db_primary_until'] > time.time()
+
+
+def test_replica_down_falls_back_to_primary(app):
+    """Test that reads are served by the primary when no replica is reachable."""
+    primary, replicas = _with_fake_replicas(app, count=1)
+
+    def _refuse():
+        raise psycopg2.OperationalError("replica down")
+    replicas[0]._connect = _refuse
+
+    with app.test_request_context():
+        assert get_read_db() is get_db()
+    assert primary.stats()['checkouts'] == 1
+
+
+@pytest.mark.skipif(not TestConfig.DB_REPLICA_DSNS,
+                    reason="TEST_DB_REPLICA_DSNS not set")
+def test_query_db_uses_replica(app):
+    """Test against a real second database: SELECTs go to it, writes and later reads do not."""
+    with app.test_request_context():
+        replica_db = query_db("SELECT current_database() AS name", one=True)['name']
+        assert replica_db != app.config['DB_NAME']
+        modify_db("SELECT 1")
+        assert query_db("SELECT current_database() AS name", one=True)['name'] == app.config['DB_NAME']
+
+
+class _RecordingCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.executed = []
+
+    def execute(self, sql, args=None):
+        self.executed.append((sql, args))
+
+
+def test_statement_prepared_once_per_connection(app):
+    """Test that a registered statement is PREPAREd once and then only EXECUTEd."""
+    name = prepare_statement("test_user_by_id", "SELECT id FROM users WHERE id = $1 AND username <> $2")
+    conn = _FakeConnection()
+    conn.prepared = set()
+    cur = _RecordingCursor(conn)
+    with app.app_context():
+        execute_prepared(cur, name, (1, 'bob'))
+        execute_prepared(cur, name, (2, 'amy'))
+    assert [sql for sql, _ in cur.executed] == [
+        "PREPARE test_user_by_id AS SELECT id FROM users WHERE id = $1 AND username <> $2",
+        "EXECUTE test_user_by_id (%s, %s)",
+        "EXECUTE test_user_by_id (%s, %s)",
+    ]
+    assert cur.executed[2][1] == (2, 'amy')
+
+    # A different pooled connection prepares its own copy
+    other = _RecordingCursor(_FakeConnection())
+    other.connection.prepared = set()
+    with app.app_context():
+        execute_prepared(other, name, (3, 'x'))
+    assert other.executed[0][0].startswith("PREPARE test_user_by_id")
+
+
+def test_prepared_statements_can_be_disabled(app):
+    """Test the plain-SQL fallback used when prepared statements are turned off."""
+    name = prepare_statement("test_like", "SELECT id FROM users WHERE username LIKE 'a%' AND id = $2 OR id = $1")
+    conn = _FakeConnection()
+    conn.prepared = set()
+    cur = _RecordingCursor(conn)
+    app.config['DB_PREPARED_STATEMENTS'] = False
+    with app.app_context():
+        execute_prepared(cur, name, (1, 2))
+    assert cur.executed == [(
+        "SELECT id FROM users WHERE username LIKE 'a%%' AND id = %(p2)s OR id = %(p1)s",
+        {'p1': 1, 'p2': 2}
+    )]
+    assert conn.prepared == set()
+
+
+def test_prepared_statement_names_are_unique():
+    """Test that one name cannot be registered for two different statements."""
+    prepare_statement("test_unique", "SELECT 1")
+    prepare_statement("test_unique", "SELECT 1")
+    with pytest.raises(ValueError):
+        prepare_statement("test_unique", "SELECT 2")
+
+
+def test_fingerprint_normalises_literals():
+    """Test that statements differing only in values share a fingerprint."""
+    assert fingerprint("SELECT * FROM users WHERE id = 5") == fingerprint("SELECT *\n FROM users WHERE id = 17")
+    assert fingerprint("SELECT 1 FROM users WHERE id = %s") == "SELECT ? FROM users WHERE id = ?"
+    assert fingerprint("SELECT * FROM t WHERE name = 'it''s' AND id IN (1, 2, 3)") == \
+        "SELECT * FROM t WHERE name = ? AND id IN (...)"
+    assert fingerprint("SELECT a FROM t2 WHERE b = $1 -- note") == "SELECT a FROM t2 WHERE b = $1"
+
+
+def test_query_stats_in_server_timing_header(client):
+    """Test that recorded statements are reported through Server-Timing."""
+    app = client.application
+
+    @app.route('/_test_queries')
+    def _test_queries():
+        stats = get_query_stats()
+        stats.record("SELECT 1 FROM users WHERE id = 1", 2.0)
+        stats.record("SELECT 1 FROM users WHERE id = 2", 3.0)
+        return 'ok'
+
+    response = client.get('/_test_queries')
+    header = response.headers['Server-Timing']
+    assert 'db;dur=5.00;desc="2 queries"' in header
+    assert 'db-slowest;dur=3.00' in header
+
+
+def test_repeated_fingerprint_flagged_as_n_plus_one(client, caplog):
+    """Test that one fingerprint repeated within a request is logged as a suspected N+1."""
+    app = client.application
+    app.config['DB_N_PLUS_ONE_THRESHOLD'] = 3
+
+    @app.route('/_test_n_plus_one')
+    def _test_n_plus_one():
+        stats = get_query_stats()
+        for user_id in range(4):
+            stats.record(f"SELECT * FROM users WHERE id = {user_id}", 1.0)
+        stats.record("SELECT COUNT(*) FROM games", 1.0)
+        return 'ok'
+
+    with caplog.at_level('WARNING'):
+        client.get('/_test_n_plus_one')
+    messages = [r.getMessage() for r in caplog.records if 'N+1' in r.getMessage()]
+    assert len(messages) == 1
+    assert 'GET /_test_n_plus_one: 4 executions of SELECT * FROM users WHERE id = ?' in messages[0]
+
+
+class _TxConnection(_FakeConnection):
+    """Fake connection that counts commits/rollbacks and hands out recording cursors."""
+
+    def __init__(self):
+        super().__init__()
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        cur = _RecordingCursor(self)
+        cur.close = lambda: None
+        return cur
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class _SerializationFailure(psycopg2.OperationalError):
+    pgcode = '40001'
+
+
+def test_transaction_commits_or_rolls_back(app):
+    """Test that the transaction block commits on success and rolls back on error."""
+    conn = _TxConnection()
+    with app.app_context():
+        with transaction(conn) as cur:
+            cur.execute("UPDATE games SET status = 'active' WHERE id = %s", (1,))
+        assert (conn.commits, conn.rollbacks) == (1, 0)
+
+        with pytest.raises(ValueError):
+            with transaction(conn):
+                raise ValueError("boom")
+        assert (conn.commits, conn.rollbacks) == (1, 1)
+
+
+def test_run_in_transaction_retries_serialization_failures(app):
+    """Test that serialization failures re-run the whole transaction and other errors do not."""
+    conn = _TxConnection()
+    attempts = []
+
+    def flaky(cur):
+        attempts.append(cur)
+        if len(attempts) < 3:
+            raise _SerializationFailure("could not serialize access")
+        return 'done'
+
+    with app.app_context():
+        assert run_in_transaction(flaky, conn=conn, backoff=0) == 'done'
+        assert len(attempts) == 3
+        assert (conn.commits, conn.rollbacks) == (1, 2)
+
+        def broken(cur):
+            raise psycopg2.IntegrityError("duplicate key")
+        with pytest.raises(psycopg2.IntegrityError):
+            run_in_transaction(broken, conn=conn, backoff=0)
+        assert conn.rollbacks == 3
+
+
+def test_copy_rows_formats_text_rows(monkeypatch):
+    """Test the COPY text format: NULLs, booleans and escaped tabs/newlines."""
+    class _CopyCursor:
+        rowcount = 2
+
+        def copy_expert(self, query, file):
+            self.query, self.data = query, file.read()
+
+    # Composing identifiers needs a live connection; the quoting itself is psycopg2's business
+    monkeypatch.setattr(psycopg2.sql.Composed, 'as_string', lambda self, context: 'COPY question_choices FROM STDIN')
+    cur = _CopyCursor()
+    assert copy_rows(cur, 'question_choices', ('question_id', 'choice_text', 'is_correct'), [
+        (1, 'a\tb', True), (2, None, False)
+    ]) == 2
+    assert cur.data == "1\ta\\tb\tt\n2\t\\N\tf\n"
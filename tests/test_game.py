@@ -4,6 +4,7 @@ import pytest
 import json
 import time
 from app.db import get_db
+from app import stats_worker
 from werkzeug.security import generate_password_hash
 
 
@@ -435,6 +436,36 @@ def test_enqueue_and_match_duel(client):
     assert count['count'] == 0
 
 
+def test_matched_game_created_with_initial_state(client):
+    """fn_create_game creates the active game, both participants and all rounds with alternating pickers"""
+    client.post("/games/queue", data=json.dumps({"user_id": user_ids["alice"], "game_type_id": 1}),
+                content_type="application/json")
+    response = client.post("/games/queue", data=json.dumps({"user_id": user_ids["bob"], "game_type_id": 1}),
+                           content_type="application/json")
+    assert response.status_code == 201
+    data = response.get_json()
+    state = data["game_state"]
+    assert state["game"]["id"] == data["game_id"]
+    assert state["game_status"] == "active"
+    assert {p["user_id"] for p in state["participants"]} == {user_ids["alice"], user_ids["bob"]}
+    assert state["current_round"]["round_number"] == 1
+    assert state["current_round"]["category_picker_id"] in (user_ids["alice"], user_ids["bob"])
+
+    with client.application.app_context():
+        cur = get_db().cursor()
+        cur.execute(
+            "SELECT round_number, category_picker_id, status FROM game_rounds WHERE game_id = %s ORDER BY round_number",
+            (data["game_id"],)
+        )
+        rounds = cur.fetchall()
+        cur.close()
+    assert len(rounds) == state["total_rounds"]
+    assert all(r["status"] == "pending" for r in rounds)
+    pickers = [r["category_picker_id"] for r in rounds]
+    assert pickers[0] == state["current_round"]["category_picker_id"]
+    assert all(a != b for a, b in zip(pickers, pickers[1:]))
+
+
 def test_send_and_accept_invitation(client):
     # Alice invites Carol
     response1 = client.post(
@@ -557,6 +588,78 @@ def test_pick_category_and_assign_questions_for_round(client):
         cur.close()
 
 
+def test_category_offer_persisted_and_enforced(client):
+    """The offered categories are stored with the round: reads agree and only offered ones can be picked"""
+    with client.application.app_context():
+        db = get_db()
+        cur = db.cursor()
+        cur.execute("INSERT INTO games (game_type_id, status) VALUES (1, 'active') RETURNING id;")
+        game_id = cur.fetchone()['id']
+        cur.execute("INSERT INTO game_participants (game_id, user_id) VALUES (%s, %s), (%s, %s);",
+                    (game_id, user_ids["alice"], game_id, user_ids["bob"]))
+        cur.execute("""
+            INSERT INTO game_rounds (game_id, round_number, category_picker_id, status, category_options)
+            VALUES (%s, 1, %s, 'pending', %s);
+        """, (game_id, user_ids["alice"], [category_ids["History"]]))
+        db.commit()
+        cur.close()
+
+    first = client.get(f"/games/{game_id}/state").get_json()["current_round"]["category_options"]
+    second = client.get(f"/games/{game_id}/state").get_json()["current_round"]["category_options"]
+    assert [c["id"] for c in first] == [category_ids["History"]]
+    assert first == second
+
+    response = client.post(
+        f"/games/{game_id}/rounds/1/pick_category",
+        data=json.dumps({"user_id": user_ids["alice"], "category_id": category_ids["Science"]}),
+        content_type="application/json"
+    )
+    assert response.status_code == 400
+    assert "not offered" in response.get_json()["error"]
+
+
+def test_concurrent_picks_assign_one_category(client):
+    """Two picks of the same round at once (a double click): one wins, the other gets 400"""
+    import threading
+    with client.application.app_context():
+        db = get_db()
+        cur = db.cursor()
+        cur.execute("INSERT INTO games (game_type_id, status) VALUES (1, 'active') RETURNING id;")
+        game_id = cur.fetchone()['id']
+        cur.execute("INSERT INTO game_participants (game_id, user_id) VALUES (%s, %s), (%s, %s);",
+                    (game_id, user_ids["alice"], game_id, user_ids["bob"]))
+        cur.execute("""
+            INSERT INTO game_rounds (game_id, round_number, category_picker_id, status)
+            VALUES (%s, 1, %s, 'pending') RETURNING id;
+        """, (game_id, user_ids["alice"]))
+        round_id = cur.fetchone()['id']
+        db.commit()
+        cur.close()
+
+    codes = []
+
+    def pick(category):
+        response = client.application.test_client().post(
+            f"/games/{game_id}/rounds/1/pick_category",
+            data=json.dumps({"user_id": user_ids["alice"], "category_id": category_ids[category]}),
+            content_type="application/json"
+        )
+        codes.append(response.status_code)
+
+    threads = [threading.Thread(target=pick, args=(c,)) for c in ("History", "Science")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(codes) == [200, 400]
+
+    with client.application.app_context():
+        cur = get_db().cursor()
+        cur.execute("SELECT COUNT(*) AS n FROM game_round_questions WHERE game_round_id = %s;", (round_id,))
+        assert cur.fetchone()['n'] <= 3
+        cur.close()
+
+
 def test_submit_answer_and_complete_round_and_game_duel(client):
     # Setup: create game, participants, and one active round with 3 questions
     with client.application.app_context():
@@ -679,6 +782,13 @@ def test_create_and_complete_group_game(client):
     total_rounds = data["total_rounds"]
     assert total_rounds == 10
 
+    # Created unrated by fn_create_game itself
+    with client.application.app_context():
+        cur = get_db().cursor()
+        cur.execute("SELECT rated FROM games WHERE id = %s;", (game_id,))
+        assert cur.fetchone()["rated"] is False
+        cur.close()
+
     # with client.application.app_context():
     #     db = get_db()
     #     cur = db.cursor()
@@ -952,6 +1062,129 @@ def test_answer_timeout(client):
     assert "time limit" in data["error"].lower()
 
 
+def test_expired_round_completed_by_timer(client):
+    """Test that an expired round is completed once and the game finishes after its last round"""
+    from app.db import transaction
+    from app.game_engine import expire_round
+
+    with client.application.app_context():
+        db = get_db()
+        cur = db.cursor()
+        cur.execute("INSERT INTO games (game_type_id, status) VALUES (1, 'active') RETURNING id;")
+        game_id = cur.fetchone()["id"]
+        cur.execute("INSERT INTO game_participants (game_id, user_id, score) VALUES (%s, %s, 100), (%s, %s, 0);",
+                    (game_id, user_ids["alice"], game_id, user_ids["bob"]))
+        cur.execute("""
+            INSERT INTO game_rounds (game_id, round_number, category_id, status, time_limit_seconds)
+            VALUES (%s, 1, %s, 'active', 1), (%s, 2, NULL, 'pending', 1) RETURNING id;
+        """, (game_id, category_ids["History"], game_id))
+        first_id, second_id = [row["id"] for row in cur.fetchall()]
+        db.commit()
+        cur.close()
+
+        # Not due yet: time limit plus grace period
+        with transaction(db) as tx:
+            assert expire_round(tx, first_id, grace_seconds=5) is None
+
+        time.sleep(2)
+        with transaction(db) as tx:
+            result = expire_round(tx, first_id, grace_seconds=0)
+        assert result.game_id == game_id
+        assert result.ops[0]["round"]["round_number"] == 2
+        # Another worker firing the same deadline finds nothing to do
+        with transaction(db) as tx:
+            assert expire_round(tx, first_id, grace_seconds=0) is None
+
+        with transaction(db) as tx:
+            tx.execute("""
+                UPDATE game_rounds SET category_id = %s, status = 'active', start_time = NOW() - INTERVAL '5 seconds'
+                WHERE id = %s
+            """, (category_ids["History"], second_id))
+            result = expire_round(tx, second_id, grace_seconds=0)
+        assert result.ops == [{"op": "round", "round": None}, {"op": "status", "status": "completed"}]
+
+        cur = db.cursor()
+        cur.execute("SELECT status, winner_id FROM games WHERE id = %s", (game_id,))
+        game = cur.fetchone()
+        cur.close()
+    assert game["status"] == "completed"
+    assert game["winner_id"] == user_ids["alice"]
+
+
+def test_unpicked_round_picked_after_pick_time(client):
+    """Test that a round nobody picks gets its first offered category and becomes active"""
+    from app.db import transaction
+    from app.game_engine import expire_round
+
+    with client.application.app_context():
+        db = get_db()
+        cur = db.cursor()
+        cur.execute("INSERT INTO games (game_type_id, status) VALUES (1, 'active') RETURNING id;")
+        game_id = cur.fetchone()["id"]
+        cur.execute("INSERT INTO game_participants (game_id, user_id) VALUES (%s, %s), (%s, %s);",
+                    (game_id, user_ids["alice"], game_id, user_ids["bob"]))
+        cur.execute("""
+            INSERT INTO game_rounds (game_id, round_number, category_picker_id, status, category_options, start_time)
+            VALUES (%s, 1, %s, 'pending', %s, NOW() - INTERVAL '10 seconds'),
+                   (%s, 2, %s, 'pending', %s, NOW() - INTERVAL '10 seconds')
+            RETURNING id;
+        """, (game_id, user_ids["alice"], [category_ids["History"], category_ids["Science"]],
+              game_id, user_ids["bob"], [category_ids["Science"]]))
+        first_id, second_id = [row["id"] for row in cur.fetchall()]
+        db.commit()
+        cur.close()
+
+        with transaction(db) as tx:
+            # Not due yet, and the second round is not being picked
+            assert expire_round(tx, first_id, grace_seconds=5, pick_seconds=60) is None
+            assert expire_round(tx, second_id, grace_seconds=5, pick_seconds=1) is None
+            result = expire_round(tx, first_id, grace_seconds=5, pick_seconds=1)
+        assert result.ops[0]["round"]["status"] == "active"
+        assert result.ops[0]["round"]["category_id"] == category_ids["History"]
+        with transaction(db) as tx:
+            assert expire_round(tx, first_id, grace_seconds=5, pick_seconds=1) is None
+
+        cur = db.cursor()
+        cur.execute("SELECT status, category_id FROM game_rounds WHERE id = %s", (first_id,))
+        rnd = cur.fetchone()
+        cur.close()
+    assert rnd["status"] == "active"
+    assert rnd["category_id"] == category_ids["History"]
+
+
+def test_group_round_not_picked_by_timer(client):
+    """Test that group rounds (no picker) wait for assign_categories, which runs only once"""
+    from app.db import transaction
+    from app.game_engine import expire_round
+
+    response = client.post("/games", data=json.dumps({
+        "game_type_id": 2, "creator_id": user_ids["alice"],
+        "participant_ids": [user_ids["alice"], user_ids["bob"], user_ids["carol"]]
+    }), content_type="application/json")
+    assert response.status_code == 201
+    game_id = response.get_json()["game_id"]
+
+    with client.application.app_context():
+        db = get_db()
+        cur = db.cursor()
+        cur.execute("SELECT id FROM game_rounds WHERE game_id = %s AND round_number = 1", (game_id,))
+        first_id = cur.fetchone()["id"]
+        cur.close()
+        with transaction(db) as tx:
+            assert expire_round(tx, first_id, grace_seconds=5, pick_seconds=0) is None
+
+    assert client.post(f"/games/{game_id}/assign_categories").status_code == 200
+    again = client.post(f"/games/{game_id}/assign_categories")
+    assert again.status_code == 400
+    assert "already assigned" in again.get_json()["error"]
+
+    with client.application.app_context():
+        cur = get_db().cursor()
+        cur.execute("SELECT COUNT(*) AS n FROM game_round_questions WHERE game_round_id = %s", (first_id,))
+        assert cur.fetchone()["n"] == 1
+        cur.close()
+
+
 def test_double_answer_attempt(client):
     """Test that user cannot answer same question twice"""
     # Setup game and round with question
@@ -1032,6 +1265,187 @@ def test_complete_round_early(client):
     assert "not all answers submitted" in data["error"].lower()
 
 
+def test_last_round_completion_finishes_game(client):
+    """Completing the last round finishes the game in the same call; repeats change nothing"""
+    with client.application.app_context():
+        db = get_db()
+        cur = db.cursor()
+        cur.execute("INSERT INTO games (game_type_id, status) VALUES (1, 'active') RETURNING id;")
+        game_id = cur.fetchone()["id"]
+        cur.execute("INSERT INTO game_participants (game_id, user_id) VALUES (%s, %s), (%s, %s);",
+                    (game_id, user_ids["alice"], game_id, user_ids["bob"]))
+        cur.execute("""
+            INSERT INTO game_rounds (game_id, round_number, category_id, status, time_limit_seconds)
+            VALUES (%s, 1, %s, 'active', 30) RETURNING id;
+        """, (game_id, category_ids["History"]))
+        round_id = cur.fetchone()["id"]
+        cur.execute("INSERT INTO game_round_questions (game_round_id, question_id) VALUES (%s, %s);",
+                    (round_id, question_ids["q1"]))
+        db.commit()
+        cur.close()
+
+    for user, choice in ((user_ids["alice"], choice_ids["q1_cA"]), (user_ids["bob"], choice_ids["q1_cB"])):
+        response = client.post(
+            f"/games/{game_id}/rounds/1/answer",
+            data=json.dumps({"user_id": user, "question_id": question_ids["q1"], "choice_id": choice}),
+            content_type="application/json"
+        )
+        assert response.status_code == 200
+
+    response = client.post(f"/games/{game_id}/rounds/1/complete")
+    assert response.status_code == 200
+    assert response.get_json()["game_completed"] is True
+
+    response = client.post(f"/games/{game_id}/rounds/1/complete")
+    assert response.status_code == 200
+    assert "already completed" in response.get_json()["message"]
+
+    with client.application.app_context():
+        cur = get_db().cursor()
+        cur.execute("SELECT status, winner_id, open_rounds, participant_count FROM games WHERE id = %s", (game_id,))
+        game = cur.fetchone()
+        cur.close()
+    assert game["status"] == "completed"
+    assert game["open_rounds"] == 0 and game["participant_count"] == 2
+
+    # Clients that still call /complete get the stored result
+    response = client.post(f"/games/{game_id}/complete")
+    assert response.status_code == 200
+    assert response.get_json()["winner_id"] == game["winner_id"]
+
+
+def test_batch_answer_insert_updates_stats_per_statement(client):
+    """A multi-row answer insert counts and, once the outbox is applied, adds up as the answers one by one would"""
+    with client.application.app_context():
+        db = get_db()
+        cur = db.cursor()
+        cur.execute("INSERT INTO games (game_type_id, status) VALUES (1, 'active') RETURNING id;")
+        game_id = cur.fetchone()["id"]
+        cur.execute("INSERT INTO game_participants (game_id, user_id) VALUES (%s, %s), (%s, %s);",
+                    (game_id, user_ids["alice"], game_id, user_ids["bob"]))
+        cur.execute("""
+            INSERT INTO game_rounds (game_id, round_number, category_id, status)
+            VALUES (%s, 1, %s, 'active') RETURNING id;
+        """, (game_id, category_ids["History"]))
+        round_id = cur.fetchone()["id"]
+        cur.execute("""
+            INSERT INTO game_round_questions (game_round_id, question_id)
+            VALUES (%s, %s), (%s, %s) RETURNING id, question_id;
+        """, (round_id, question_ids["q1"], round_id, question_ids["q2"]))
+        grq = {row["question_id"]: row["id"] for row in cur.fetchall()}
+        cur.execute("INSERT INTO user_stats (user_id) VALUES (%s), (%s) ON CONFLICT DO NOTHING;",
+                    (user_ids["alice"], user_ids["bob"]))
+
+        answers = [
+            (grq[question_ids["q1"]], user_ids["alice"], choice_ids["q1_cA"], True, 100, 1000),
+            (grq[question_ids["q2"]], user_ids["alice"], choice_ids["q2_cA"], True, 100, 3000),
+            (grq[question_ids["q1"]], user_ids["bob"], choice_ids["q1_cB"], False, 0, 2000),
+            (grq[question_ids["q2"]], user_ids["bob"], choice_ids["q2_cA"], True, 100, 4000),
+        ]
+        cur.execute(
+            """
+            INSERT INTO round_answers
+              (game_round_question_id, user_id, choice_id, is_correct, points_earned, response_time_ms)
+            VALUES """ + ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(answers)),
+            [value for answer in answers for value in answer]
+        )
+        # A repeated answer is skipped and counts nothing
+        cur.execute("""
+            INSERT INTO round_answers
+              (game_round_question_id, user_id, choice_id, is_correct, points_earned, response_time_ms)
+            VALUES (%s, %s, %s, TRUE, 100, 500)
+            ON CONFLICT (game_round_question_id, user_id) DO NOTHING;
+        """, (grq[question_ids["q1"]], user_ids["bob"], choice_ids["q1_cA"]))
+        db.commit()
+
+        cur.execute("SELECT answer_count FROM game_rounds WHERE id = %s;", (round_id,))
+        assert cur.fetchone()["answer_count"] == 4
+        stats_worker.drain(db)
+        cur.execute("""
+            SELECT user_id, total_answers, correct_answers, total_points, average_response_time_ms
+            FROM user_stats WHERE user_id IN (%s, %s);
+        """, (user_ids["alice"], user_ids["bob"]))
+        stats = {row["user_id"]: row for row in cur.fetchall()}
+        cur.execute("""
+            SELECT user_id, total_answers, correct_answers, total_points
+            FROM user_category_stats WHERE category_id = %s;
+        """, (category_ids["History"],))
+        category_stats = {row["user_id"]: row for row in cur.fetchall()}
+
+        cur.execute("DELETE FROM round_answers WHERE user_id = %s;", (user_ids["bob"],))
+        db.commit()
+        cur.execute("SELECT answer_count FROM game_rounds WHERE id = %s;", (round_id,))
+        assert cur.fetchone()["answer_count"] == 2
+        cur.close()
+
+    alice, bob = stats[user_ids["alice"]], stats[user_ids["bob"]]
+    assert (alice["total_answers"], alice["correct_answers"], alice["total_points"]) == (2, 2, 200)
+    assert (bob["total_answers"], bob["correct_answers"], bob["total_points"]) == (2, 1, 100)
+    assert alice["average_response_time_ms"] == 2000 and bob["average_response_time_ms"] == 3000
+    assert (category_stats[user_ids["alice"]]["total_answers"], category_stats[user_ids["alice"]]["total_points"]) == (2, 200)
+    assert (category_stats[user_ids["bob"]]["correct_answers"], category_stats[user_ids["bob"]]["total_points"]) == (1, 100)
+
+
+def test_stats_outbox_applied_once(client):
+    """Game stats reach user_stats and the leaderboard through the outbox, and draining again changes nothing"""
+    with client.application.app_context():
+        db = get_db()
+        cur = db.cursor()
+        cur.execute("INSERT INTO user_stats (user_id) VALUES (%s), (%s) ON CONFLICT DO NOTHING;",
+                    (user_ids["alice"], user_ids["bob"]))
+        cur.execute("INSERT INTO games (game_type_id, status) VALUES (1, 'active') RETURNING id;")
+        game_id = cur.fetchone()["id"]
+        cur.execute("INSERT INTO game_participants (game_id, user_id) VALUES (%s, %s), (%s, %s);",
+                    (game_id, user_ids["alice"], game_id, user_ids["bob"]))
+        cur.execute("""
+            INSERT INTO game_rounds (game_id, round_number, category_id, status)
+            VALUES (%s, 1, %s, 'active') RETURNING id;
+        """, (game_id, category_ids["History"]))
+        round_id = cur.fetchone()["id"]
+        cur.execute("INSERT INTO game_round_questions (game_round_id, question_id) VALUES (%s, %s);",
+                    (round_id, question_ids["q1"]))
+        db.commit()
+        cur.close()
+
+    for user, choice in ((user_ids["alice"], choice_ids["q1_cA"]), (user_ids["bob"], choice_ids["q1_cB"])):
+        response = client.post(
+            f"/games/{game_id}/rounds/1/answer",
+            data=json.dumps({"user_id": user, "question_id": question_ids["q1"], "choice_id": choice}),
+            content_type="application/json"
+        )
+        assert response.status_code == 200
+    response = client.post(f"/games/{game_id}/rounds/1/complete")
+    assert response.get_json()["game_completed"] is True
+
+    with client.application.app_context():
+        db = get_db()
+        cur = db.cursor()
+        cur.execute("SELECT games_played FROM user_stats WHERE user_id = %s;", (user_ids["alice"],))
+        assert cur.fetchone()["games_played"] == 0
+        assert stats_worker.lag(db)["events"] >= 3
+
+        assert stats_worker.drain(db) >= 3
+        assert stats_worker.drain(db) == 0
+        assert stats_worker.lag(db)["events"] == 0
+
+        cur.execute("""
+            SELECT user_id, games_played, games_won, total_answers, total_points
+            FROM user_stats WHERE user_id IN (%s, %s);
+        """, (user_ids["alice"], user_ids["bob"]))
+        stats = {row["user_id"]: row for row in cur.fetchall()}
+        cur.execute("""
+            SELECT user_id, score FROM leaderboards
+            WHERE scope = 'alltime' AND category_id IS NULL AND user_id IN (%s, %s);
+        """, (user_ids["alice"], user_ids["bob"]))
+        board = {row["user_id"]: row["score"] for row in cur.fetchall()}
+        cur.close()
+
+    alice, bob = stats[user_ids["alice"]], stats[user_ids["bob"]]
+    assert (alice["games_played"], alice["games_won"], alice["total_answers"]) == (1, 1, 1)
+    assert (bob["games_played"], bob["games_won"], bob["total_answers"]) == (1, 0, 1)
+    assert board == {user_ids["alice"]: alice["total_points"], user_ids["bob"]: 0}
+
+
 def test_complete_game_with_pending_rounds(client):
     """Test completing game with pending rounds"""
     # Setup game with pending rounds
@@ -1062,6 +1476,92 @@ def test_complete_game_with_pending_rounds(client):
 # Additional tests to catch edge cases / bugs
 # ==============================================
 
+def test_active_game_lookup(client):
+    """/games/active returns the open game of a matched player and 404 otherwise"""
+    response = client.get("/games/active", query_string={"user_id": user_ids["alice"]})
+    assert response.status_code == 404
+
+    client.post("/games/queue", data=json.dumps({"user_id": user_ids["alice"], "game_type_id": 1}),
+                content_type="application/json")
+    matched = client.post("/games/queue", data=json.dumps({"user_id": user_ids["bob"], "game_type_id": 1}),
+                          content_type="application/json").get_json()
+
+    for name in ("alice", "bob"):
+        response = client.get("/games/active", query_string={"user_id": user_ids[name]})
+        assert response.status_code == 200
+        assert response.get_json()["game_id"] == matched["game_id"]
+        assert response.get_json()["game_status"] == "active"
+    assert client.get("/games/active").status_code == 400
+
+
+def test_waiting_player_claimed_only_once(client):
+    """Two concurrent claims for the same waiting player: SKIP LOCKED lets only one pair them"""
+    from app import matchmaking
+    from app.db import get_pool
+
+    alice = client.post("/games/queue", data=json.dumps({"user_id": user_ids["alice"], "game_type_id": 1}),
+                        content_type="application/json").get_json()
+
+    with client.application.app_context():
+        pool = get_pool()
+        conn_bob, conn_carol = pool.getconn(), pool.getconn()
+        try:
+            cur_bob, cur_carol = conn_bob.cursor(), conn_carol.cursor()
+            for cur, name in ((cur_bob, "bob"), (cur_carol, "carol")):
+                cur.execute("INSERT INTO match_queue (user_id, game_type_id) VALUES (%s, 1) RETURNING id",
+                            (user_ids[name],))
+            bob_queue_id = cur_bob.fetchone()["id"]
+            carol_queue_id = cur_carol.fetchone()["id"]
+
+            # Bob's transaction holds Alice's row; Carol skips it instead of waiting
+            assert matchmaking.claim_opponent(cur_bob, bob_queue_id, user_ids["bob"], 1) == user_ids["alice"]
+            assert matchmaking.claim_opponent(cur_carol, carol_queue_id, user_ids["carol"], 1) is None
+            conn_bob.commit()
+            conn_carol.commit()
+        finally:
+            pool.putconn(conn_bob)
+            pool.putconn(conn_carol)
+
+        cur = get_db().cursor()
+        cur.execute("SELECT user_id FROM match_queue")
+        waiting = [row["user_id"] for row in cur.fetchall()]
+        cur.close()
+    assert alice["message"] == "Enqueued for matching"
+    assert waiting == [user_ids["carol"]]
+
+
+def test_simultaneous_enqueues_are_paired(client):
+    """Two players enqueuing at the same moment on two connections end up in one game"""
+    import threading
+    from app import matchmaking
+
+    app = client.application
+    for attempt in range(5):
+        barrier = threading.Barrier(2)
+        results = {}
+
+        def enqueue(name):
+            with app.app_context():
+                conn = get_db()
+                barrier.wait()
+                results[name] = matchmaking.enqueue(conn, user_ids[name], 1, on_match=lambda cur, ids: ids)
+
+        threads = [threading.Thread(target=enqueue, args=(name,)) for name in ("alice", "bob")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        matches = [r.match for r in results.values() if r.match is not None]
+        assert len(matches) == 1, f"attempt {attempt}: {results}"
+        assert sorted(matches[0]) == sorted([user_ids["alice"], user_ids["bob"]])
+        with app.app_context():
+            cur = get_db().cursor()
+            cur.execute("SELECT COUNT(*) AS n FROM match_queue")
+            assert cur.fetchone()["n"] == 0
+            cur.close()
+
+
 def test_enqueue_missing_fields(client):
     """Test enqueue endpoint with missing user_id or game_type_id"""
     # Missing both
@@ -0,0 +1,76 @@
+import threading
+import time
+
+from app.game_cache import GameStateCache
+
+
+def _state(status='active', **extra):
+    return dict(game_status=status, **extra)
+
+
+def test_state_built_once_per_version():
+    """Test that readers share one build per version and a new version rebuilds."""
+    cache = GameStateCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return _state(n=len(builds))
+
+    first = cache.get(1, 0, build)
+    assert cache.get(1, 0, build) is first
+    assert first.payload == b'{"game_status":"active","n":1}'
+    assert cache.get(1, 1, build).state['n'] == 2
+    assert len(builds) == 2
+    assert cache.stats()['hits'] == 1
+
+
+def test_missing_game_not_cached():
+    """Test that a build returning None (unknown game) is passed through and not stored."""
+    cache = GameStateCache()
+    assert cache.get(5, 0, lambda: None) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_concurrent_misses_share_one_build():
+    """Test single-flight: concurrent readers of a new version wait for one rebuild."""
+    cache = GameStateCache()
+    builds = []
+    started = threading.Event()
+
+    def slow_build():
+        builds.append(1)
+        started.set()
+        time.sleep(0.05)
+        return _state()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(1, 3, slow_build))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(builds) == 1
+    assert len({id(r) for r in results}) == 1
+
+
+def test_older_version_does_not_replace_newer():
+    """Test that a slow build of an old version cannot overwrite a newer cached state."""
+    cache = GameStateCache()
+    cache.get(1, 5, lambda: _state(v=5))
+    assert cache.get(1, 4, lambda: _state(v=4)).state['v'] == 4
+    assert cache.get(1, 5, lambda: _state(v='rebuilt')).state['v'] == 5
+
+
+def test_finished_games_evicted_first():
+    """Test LRU eviction that prefers finished games over active ones."""
+    cache = GameStateCache(max_entries=2)
+    cache.get(1, 0, lambda: _state())
+    cache.get(2, 0, lambda: _state('completed'))
+    cache.get(3, 0, lambda: _state())
+    assert cache.stats()['evictions'] == 1
+    assert cache.get(1, 0, lambda: _state(rebuilt=True)).state.get('rebuilt') is None
+
+    # Without finished games the least recently used one goes
+    cache.get(4, 0, lambda: _state())
+    assert cache.get(3, 0, lambda: _state(rebuilt=True)).state.get('rebuilt') is True
@@ -0,0 +1,52 @@
+from app.game_events import (
+    notify_game_created, send_game_update, apply_ops, score_op, status_op, round_op,
+    user_room, game_room, MATCH_FOUND, GAME_UPDATE
+)
+
+
+class _RecordingSocketIO:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, room=None):
+        self.emitted.append((event, data, room))
+
+
+def test_game_created_pushed_to_each_participant():
+    """Test that every participant's user room gets the event with the initial state."""
+    socketio = _RecordingSocketIO()
+    state = {'game': {'id': 7}, 'participants': [{'user_id': 1}, {'user_id': 2}]}
+    notify_game_created(socketio, MATCH_FOUND, state)
+    assert [(event, room) for event, _, room in socketio.emitted] == [
+        ('match_found', user_room(1)), ('match_found', user_room(2))
+    ]
+    assert socketio.emitted[0][1] == {'game_id': 7, 'game_state': state}
+
+
+def test_game_update_sent_to_game_room_with_version():
+    """Test that a game update carries the new state version and only its ops."""
+    socketio = _RecordingSocketIO()
+    send_game_update(socketio, 7, 4, [score_op(1, 100)])
+    assert socketio.emitted == [
+        (GAME_UPDATE, {'game_id': 7, 'version': 4, 'ops': [{'op': 'score', 'user_id': 1, 'score': 100}]}, game_room(7))
+    ]
+
+
+def test_apply_ops_matches_rebuilt_state():
+    """Test that applying ops to the previous state gives the next state without touching the original."""
+    state = {
+        'game': {'id': 7, 'status': 'active'},
+        'game_status': 'active',
+        'participants': [{'user_id': 1, 'score': 0}, {'user_id': 2, 'score': 0}],
+        'scores': {1: 0, 2: 0},
+        'current_round': {'round_number': 3, 'status': 'active'},
+    }
+    updated = apply_ops(state, [score_op(2, 100), round_op(None), status_op('completed')])
+    assert updated == {
+        'game': {'id': 7, 'status': 'completed'},
+        'game_status': 'completed',
+        'participants': [{'user_id': 1, 'score': 0}, {'user_id': 2, 'score': 100}],
+        'scores': {1: 0, 2: 100},
+        'current_round': None,
+    }
+    assert state['scores'] == {1: 0, 2: 0} and state['current_round']['round_number'] == 3
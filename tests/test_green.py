@@ -0,0 +1,33 @@
+import pytest
+from app import green
+
+
+def test_threading_mode_is_not_patched(monkeypatch):
+    """Test that the default/threading mode leaves the process untouched."""
+    import psycopg2.extensions
+    from config import Config
+    monkeypatch.setattr(Config, "ASYNC_MODE", "threading")
+    assert green.async_mode() == "threading"
+    assert green.patch() == "threading"
+    assert psycopg2.extensions.get_wait_callback() is None
+
+
+def test_missing_green_package_reported(monkeypatch):
+    """Test that selecting a green mode without its package fails clearly."""
+    import builtins
+    real_import = builtins.__import__
+
+    def fake_import(name, *args, **kwargs):
+        if name.split('.')[0] in green.GREEN_MODES:
+            raise ImportError(f"No module named '{name}'")
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, '__import__', fake_import)
+    with pytest.raises(RuntimeError, match="ASYNC_MODE=gevent"):
+        green.patch("gevent")
+
+
+def test_async_mode_passed_to_socketio(app):
+    """Test that the configured async mode reaches Flask-SocketIO."""
+    from app import socketio
+    assert socketio.async_mode == (app.config['ASYNC_MODE'] or 'threading')
@@ -172,6 +172,43 @@ def test_list_leaderboards_default_scope(client):
     assert data[1]["rank"] == 2
     assert data[1]["score"] == 120
 
+def test_list_leaderboards_ties_share_rank(client):
+    """
+    Ranks are computed from the scores: a third alltime entry with bob's score
+    shares his rank, and the entry after a tie skips the shared places.
+    """
+    with client.application.app_context():
+        db = get_db()
+        cur = db.cursor()
+        entries = []
+        for username, score in (("carol", 120), ("dave", 90)):
+            cur.execute(
+                """
+                INSERT INTO users (username, email, password_hash)
+                VALUES (%s, %s, %s)
+                RETURNING id;
+                """,
+                (username, f"{username}@example.com", generate_password_hash("password"))
+            )
+            uid = cur.fetchone()['id']
+            cur.execute(
+                """
+                INSERT INTO leaderboards (user_id, scope, category_id, score)
+                VALUES (%s, 'alltime', NULL, %s);
+                """,
+                (uid, score)
+            )
+            entries.append(uid)
+        db.commit()
+        cur.close()
+
+    response = client.get("/leaderboards")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [row["rank"] for row in data] == [1, 2, 2, 4]
+    assert [row["score"] for row in data] == [150, 120, 120, 90]
+    assert data[3]["user_id"] == entries[1]
+
 def test_list_leaderboards_invalid_scope(client):
     """
     Invalid scope parameter should return 400.
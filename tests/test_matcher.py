@@ -0,0 +1,71 @@
+import pytest
+from app.matcher import Waiting, pair_players, search_window, MatcherStats
+from app.rating import elo_deltas, expected_score
+
+
+def _players(*specs):
+    """(rating, wait_seconds) tuples -> Waiting players with queue/user ids 1..n"""
+    return [Waiting(i, 100 + i, rating, wait) for i, (rating, wait) in enumerate(specs, start=1)]
+
+
+def _user_pairs(pairs):
+    return {frozenset((a.user_id, b.user_id)) for a, b in pairs}
+
+
+def test_closest_ratings_are_paired():
+    """Test that players are paired with the closest rating instead of first-come-first-served."""
+    players = _players((1500, 10), (1000, 9), (1510, 1), (1020, 1))
+    assert _user_pairs(pair_players(players)) == {frozenset((101, 103)), frozenset((102, 104))}
+
+
+def test_window_widens_with_wait_time():
+    """Test that a far-apart pair is only matched once the longer waiter's window is wide enough."""
+    assert search_window(0, 100, 25, 800) == 100
+    assert search_window(10, 100, 25, 800) == 350
+    assert search_window(1000, 100, 25, 800) == 800
+
+    fresh = _players((1000, 0), (1300, 0))
+    assert pair_players(fresh, base_window=100, window_growth=25) == []
+    waited = _players((1000, 12), (1300, 0))
+    assert len(pair_players(waited, base_window=100, window_growth=25)) == 1
+
+
+def test_longest_waiting_player_served_first():
+    """Test that the longest waiter gets the closest opponent when two players compete for it."""
+    players = _players((1200, 1), (1250, 30), (1230, 2))
+    pairs = pair_players(players)
+    assert len(pairs) == 1
+    assert {pairs[0][0].user_id, pairs[0][1].user_id} == {102, 103}
+
+
+def test_every_player_paired_at_most_once():
+    """Test a large queue: no player appears in two pairs and an even queue pairs everyone."""
+    players = _players(*[(1000 + (i * 37) % 600, i % 20) for i in range(1000)])
+    pairs = pair_players(players, base_window=10_000, max_window=10_000)
+    seen = [p.queue_id for pair in pairs for p in pair]
+    assert len(seen) == len(set(seen)) == 1000
+
+
+def test_matcher_stats_percentiles():
+    """Test matches per tick and wait percentiles reported by the matcher."""
+    stats = MatcherStats()
+    stats.record(2, 5, [1.0, 2.0, 3.0, 4.0], 3.5)
+    stats.record(0, 1, [], 1.0)
+    snapshot = stats.snapshot()
+    assert snapshot['ticks'] == 2
+    assert snapshot['matches_total'] == 2
+    assert snapshot['matches_per_tick'] == 1.0
+    assert snapshot['wait_p50_s'] == 2.0
+    assert snapshot['wait_p99_s'] == 4.0
+    assert snapshot['last_tick'] == {'matches': 0, 'waiting': 1, 'duration_ms': 1.0}
+
+
+def test_elo_deltas():
+    """Test Elo updates: even match, upset and draw."""
+    assert expected_score(1200, 1200) == pytest.approx(0.5)
+    assert elo_deltas(1200, 1200, 1) == (16, -16)
+    # The underdog gains more for a win than the favourite would
+    underdog_win, _ = elo_deltas(1000, 1400, 1)
+    favourite_win, _ = elo_deltas(1400, 1000, 1)
+    assert underdog_win > favourite_win > 0
+    assert elo_deltas(1200, 1200, 0.5) == (0, 0)
@@ -0,0 +1,70 @@
+import pytest
+from app.db import get_db
+from app.migrations import (
+    load_migrations, latest_version, verify_checksums, upgrade, current_version, MigrationError
+)
+
+
+def _write(directory, filename, sql, newline='\n'):
+    with open(directory / filename, 'w', encoding='utf8', newline=newline) as f:
+        f.write(sql)
+
+
+def test_migrations_loaded_in_version_order(tmp_path):
+    """Test that migration files are ordered by version and other files are ignored."""
+    _write(tmp_path, '0002_second.sql', 'SELECT 2;')
+    _write(tmp_path, '0001_first.sql', 'SELECT 1;')
+    _write(tmp_path, 'seed.sql', 'SELECT 0;')
+
+    migrations = load_migrations(str(tmp_path))
+    assert [(m.version, m.name) for m in migrations] == [(1, 'first'), (2, 'second')]
+    assert latest_version(str(tmp_path)) == 2
+
+
+def test_checksum_ignores_line_endings(tmp_path):
+    """Test that CRLF and LF checkouts of the same file hash identically."""
+    lf, crlf = tmp_path / 'lf', tmp_path / 'crlf'
+    lf.mkdir()
+    crlf.mkdir()
+    _write(lf, '0001_init.sql', 'CREATE TABLE t (id INT);\nSELECT 1;\n')
+    _write(crlf, '0001_init.sql', 'CREATE TABLE t (id INT);\nSELECT 1;\n', newline='\r\n')
+
+    assert load_migrations(str(lf))[0].checksum == load_migrations(str(crlf))[0].checksum
+
+
+def test_duplicate_versions_rejected(tmp_path):
+    """Test that two files with the same version number are an error."""
+    _write(tmp_path, '0001_a.sql', 'SELECT 1;')
+    _write(tmp_path, '0001_b.sql', 'SELECT 1;')
+    with pytest.raises(MigrationError):
+        load_migrations(str(tmp_path))
+
+
+def test_modified_migration_detected(tmp_path):
+    """Test that editing an applied migration is reported instead of ignored."""
+    _write(tmp_path, '0001_init.sql', 'SELECT 1;')
+    migrations = load_migrations(str(tmp_path))
+    applied = {1: {'name': 'init', 'checksum': migrations[0].checksum}}
+    verify_checksums(applied, migrations)
+
+    _write(tmp_path, '0001_init.sql', 'SELECT 2;')
+    with pytest.raises(MigrationError):
+        verify_checksums(applied, load_migrations(str(tmp_path)))
+
+    with pytest.raises(MigrationError):
+        verify_checksums({2: {'name': 'gone', 'checksum': 'x'}}, migrations)
+
+
+def test_bundled_migrations_are_well_formed():
+    """Test that the shipped migrations are numbered without gaps."""
+    versions = [m.version for m in load_migrations()]
+    assert versions == list(range(1, len(versions) + 1))
+
+
+def test_upgrade_is_idempotent(app):
+    """Test that a second upgrade applies nothing and the version is current."""
+    with app.app_context():
+        conn = get_db()
+        upgrade(conn)
+        assert upgrade(conn) == []
+        assert current_version(conn) == latest_version()
@@ -0,0 +1,51 @@
+import random
+
+from app.question_sampler import QuestionSampler
+
+
+def _rows(n, categories=3):
+    difficulties = ('easy', 'medium', 'hard')
+    return [{'id': i, 'category_id': i % categories, 'difficulty': difficulties[i % 7 % 3]} for i in range(1, n + 1)]
+
+
+def test_sample_distinct_ids_of_category():
+    """Test that a sample has k distinct ids, all from the requested category and difficulty."""
+    rows = _rows(3000)
+    sampler = QuestionSampler(rng=random.Random(1))
+    sampler.load(rows)
+    by_id = {r['id']: r for r in rows}
+
+    ids = sampler.sample(1, 3)
+    assert len(ids) == len(set(ids)) == 3
+    assert all(by_id[i]['category_id'] == 1 for i in ids)
+
+    hard = sampler.sample(2, 50, difficulty='hard')
+    assert len(set(hard)) == 50
+    assert all(by_id[i]['category_id'] == 2 and by_id[i]['difficulty'] == 'hard' for i in hard)
+
+
+def test_small_or_unknown_category():
+    """Test that a category with fewer than k questions returns all of them, an unknown one none."""
+    sampler = QuestionSampler()
+    sampler.load([{'id': 1, 'category_id': 9, 'difficulty': 'easy'}, {'id': 2, 'category_id': 9, 'difficulty': 'hard'}])
+    assert sorted(sampler.sample(9, 3)) == [1, 2]
+    assert sampler.sample(4, 3) == []
+
+
+def test_incremental_changes():
+    """Test that verify, re-categorize, unverify and delete update the buckets in place."""
+    sampler = QuestionSampler()
+    sampler.load(_rows(30))
+    assert sampler.count(0) == 10
+
+    sampler.update({'id': 100, 'category_id': 0, 'difficulty': 'easy', 'is_verified': True})
+    assert sampler.count(0) == 11 and sampler.count(0, 'easy') >= 1
+    sampler.update({'id': 100, 'category_id': 1, 'difficulty': 'easy', 'is_verified': True})
+    assert sampler.count(0) == 10 and sampler.count(1) == 11
+    sampler.update({'id': 3, 'category_id': 0, 'difficulty': 'easy', 'is_verified': False})
+    sampler.remove(6)
+    sampler.remove(6)
+    assert sampler.count(0) == 8
+    remaining = {i for i in range(3, 31, 3)} - {3, 6}
+    assert set(sampler.sample(0, 100)) == remaining
+    assert len(sampler) == 29
@@ -0,0 +1,59 @@
+from app.round_timer import RoundTimer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_deadlines_fire_in_order():
+    """Test that only due deadlines are popped, earliest first, and each once."""
+    clock = FakeClock()
+    timer = RoundTimer(clock=clock)
+    timer.schedule(1, 10, 1, 30)
+    timer.schedule(2, 11, 1, 10)
+    timer.schedule(3, 12, 2, 20)
+    assert timer.next_due() == 110.0
+
+    clock.now = 125.0
+    assert [d.round_id for d in timer.pop_expired()] == [2, 3]
+    assert timer.pop_expired() == []
+    assert len(timer) == 1
+
+    clock.now = 130.0
+    assert [(d.round_id, d.game_id, d.round_number) for d in timer.pop_expired()] == [(1, 10, 1)]
+    assert timer.next_due() is None
+
+
+def test_reschedule_and_cancel():
+    """Test that rescheduling replaces a round's deadline and cancelling drops it."""
+    clock = FakeClock()
+    timer = RoundTimer(clock=clock)
+    timer.schedule(1, 10, 1, 5)
+    timer.schedule(1, 10, 1, 50)
+    timer.schedule(2, 10, 2, 8)
+    timer.cancel(2)
+
+    clock.now = 120.0
+    assert timer.pop_expired() == []
+    assert timer.next_due() == 150.0
+    assert len(timer) == 1
+
+
+def test_load_replaces_deadlines_but_keeps_newer_schedules():
+    """Test that a reload drops rounds no longer active but keeps rounds scheduled during the query."""
+    clock = FakeClock()
+    timer = RoundTimer(clock=clock)
+    timer.schedule(1, 10, 1, 30)        # completed elsewhere: not in the reload
+    started = clock.now = 101.0
+    clock.now = 102.0
+    timer.schedule(2, 11, 1, 60)        # activated while the reload query ran
+    timer.load([{'id': 3, 'game_id': 12, 'round_number': 4, 'remaining': 7.5}], started)
+
+    assert len(timer) == 2
+    assert timer.next_due() == 109.5
+    clock.now = 200.0
+    assert sorted(d.round_id for d in timer.pop_expired()) == [2, 3]
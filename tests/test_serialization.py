@@ -0,0 +1,51 @@
+import json
+from datetime import datetime, date
+from decimal import Decimal
+
+from psycopg2.extras import RealDictRow
+
+from app import serialization
+
+
+def _row(**values):
+    row = RealDictRow()
+    row.update(values)
+    return row
+
+
+def test_query_rows_serialized_natively():
+    """Test that RealDictRow, Decimal and datetimes need no per-row conversion."""
+    row = _row(id=1, win_rate=Decimal('52.50'), created_at=datetime(2024, 5, 1, 8, 30, 15), day=date(2024, 5, 1))
+    assert json.loads(serialization.dumps([row])) == [{
+        'id': 1,
+        'win_rate': 52.5,
+        'created_at': '2024-05-01T08:30:15',
+        'day': '2024-05-01',
+    }]
+
+
+def test_non_string_keys():
+    """Test that score maps keyed by user id serialize like the stdlib would."""
+    assert json.loads(serialization.dumps({'scores': {7: 10, 9: 0}})) == {'scores': {'7': 10, '9': 0}}
+
+
+def test_socketio_json_accepts_packet_kwargs():
+    """Test that the Socket.IO json replacement tolerates the server's formatting kwargs."""
+    payload = {'sent_at': datetime(2024, 1, 2, 3, 4, 5)}
+    encoded = serialization.SocketIOJSON.dumps(payload, separators=(',', ':'))
+    assert serialization.SocketIOJSON.loads(encoded) == {'sent_at': '2024-01-02T03:04:05'}
+
+
+def test_jsonify_uses_fast_provider(client):
+    """Test that jsonify responses go through the fast provider."""
+    app = client.application
+    assert isinstance(app.json, serialization.FastJSONProvider)
+
+    @app.route('/_test_json')
+    def _test_json():
+        from flask import jsonify
+        return jsonify(_row(score=Decimal('1.5'), at=datetime(2024, 1, 1)))
+
+    response = client.get('/_test_json')
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == {'score': 1.5, 'at': '2024-01-01T00:00:00'}